@@ -1,56 +1,66 @@
 import sys
 import pandas as pd
+import numpy as np
 import sqlite3
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QComboBox, QLabel, QTableView,
     QFrame, QScrollArea, QGridLayout, QDialog, QMessageBox, QHeaderView,
-    QLineEdit, QAbstractItemView, QCheckBox
+    QLineEdit, QCheckBox
 )
 from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
 from PyQt6.QtGui import QFont, QPixmap
 import logging
 import os
+from utils.display_format import FormattedColumnCache, format_column, estimate_text_width
+from utils.incremental_fetch import IncrementalFetchMixin
+from utils.crm_store import CRMStore
+from .pivot.freeze_table_widget import FreezeTableWidget
 # Setup logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-class CRMTableModel(QAbstractTableModel):
-    """Custom model for QTableView to display CRM data efficiently."""
+class CRMTableModel(IncrementalFetchMixin, QAbstractTableModel):
+    """Custom model for QTableView to display CRM data efficiently; rows are fetched in batches."""
     def __init__(self, crm_tab, df=None, decimal_places=2):
         super().__init__()
         self.crm_tab = crm_tab
         self._df = df if df is not None else pd.DataFrame()
         self.decimal_places = decimal_places
         self.column_widths = {}
+        self._version = 0
+        self._formatted = FormattedColumnCache()
+        self._formatted.bind((self._version, self.decimal_places))
+        self.reset_fetch(self._df.shape[0])
 
     def set_data(self, df):
         self.beginResetModel()
         self._df = df.copy()
+        self._version += 1
+        self._formatted.bind((self._version, self.decimal_places))
+        self.reset_fetch(self._df.shape[0])
         self.endResetModel()
 
+    def _format_column(self, col):
+        values = self._df.iloc[:, col].to_numpy(dtype=object)
+        if self._df.columns[col] == 'CRM ID':
+            return format_column(values, self.decimal_places, numeric=np.full(len(values), np.nan))
+        return format_column(values, self.decimal_places)
+
     def rowCount(self, parent=QModelIndex()):
-        return self._df.shape[0]
+        return self._fetched
 
     def columnCount(self, parent=QModelIndex()):
         return self._df.shape[1]
 
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
-        if not index.isValid() or not (0 <= index.row() < self._df.shape[0] and 0 <= index.column() < self._df.shape[1]):
+        if not index.isValid() or not (0 <= index.row() < self._fetched and 0 <= index.column() < self._df.shape[1]):
             return None
 
-        value = self._df.iloc[index.row(), index.column()]
-        col_name = self._df.columns[index.column()]
-
         if role == Qt.ItemDataRole.DisplayRole:
-            dec = self.decimal_places
-            if col_name != 'CRM ID' and pd.notna(value):
-                try:
-                    return f"{float(value):.{dec}f}"
-                except (ValueError, TypeError):
-                    return "" if pd.isna(value) else str(value)
-            return str(value) if pd.notna(value) else ""
-        
+            return self._formatted.get(index.column(), self._format_column)[index.row()]
+
         elif role == Qt.ItemDataRole.TextAlignmentRole:
+            col_name = self._df.columns[index.column()]
             return Qt.AlignmentFlag.AlignLeft if col_name == 'CRM ID' else Qt.AlignmentFlag.AlignCenter
 
         return None
@@ -62,92 +72,6 @@ class CRMTableModel(QAbstractTableModel):
             return str(section + 1)
         return None
 
-class FreezeTableWidget(QTableView):
-    """Custom QTableView with a frozen first column."""
-    def __init__(self, model, parent=None):
-        super().__init__(parent)
-        self.frozenTableView = QTableView(self)
-        self.setModel(model)
-        self.frozenTableView.setModel(model)
-        self.init()
-
-        self.horizontalHeader().sectionResized.connect(self.updateSectionWidth)
-        self.verticalHeader().sectionResized.connect(self.updateSectionHeight)
-        self.frozenTableView.verticalScrollBar().valueChanged.connect(self.frozenVerticalScroll)
-        self.verticalScrollBar().valueChanged.connect(self.mainVerticalScroll)
-        self.model().modelReset.connect(self.resetFrozenTable)
-
-    def init(self):
-        self.frozenTableView.setFocusPolicy(Qt.FocusPolicy.NoFocus)
-        self.frozenTableView.verticalHeader().hide()
-        self.frozenTableView.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
-        self.viewport().stackUnder(self.frozenTableView)
-        self.frozenTableView.setSelectionModel(self.selectionModel())
-        
-        self.updateFrozenColumns()
-        self.frozenTableView.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.frozenTableView.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.setHorizontalScrollMode(QAbstractItemView.ScrollMode.ScrollPerItem)
-        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerItem)
-        self.frozenTableView.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerItem)
-        self.updateFrozenTableGeometry()
-        self.frozenTableView.show()
-
-    def updateFrozenColumns(self):
-        """Ensure only the first column is visible in the frozen table."""
-        for col in range(self.model().columnCount()):
-            self.frozenTableView.setColumnHidden(col, col != 0)
-        if self.model().columnCount() > 0:
-            self.frozenTableView.setColumnWidth(0, self.columnWidth(0) or 100)
-
-    def resetFrozenTable(self):
-        """Handle model reset to ensure frozen table is correctly updated."""
-        self.updateFrozenColumns()
-        self.updateFrozenTableGeometry()
-
-    def updateSectionWidth(self, logicalIndex, oldSize, newSize):
-        if logicalIndex == 0:
-            self.frozenTableView.setColumnWidth(0, newSize)
-            self.updateFrozenTableGeometry()
-
-    def updateSectionHeight(self, logicalIndex, oldSize, newSize):
-        self.frozenTableView.setRowHeight(logicalIndex, newSize)
-
-    def frozenVerticalScroll(self, value):
-        self.verticalScrollBar().setValue(value)
-        self.viewport().update()
-
-    def mainVerticalScroll(self, value):
-        self.frozenTableView.verticalScrollBar().setValue(value)
-        self.viewport().update()
-
-    def updateFrozenTableGeometry(self):
-        """Update the geometry of the frozen table."""
-        if self.model().columnCount() > 0:
-            self.frozenTableView.setGeometry(
-                self.verticalHeader().width() + self.frameWidth(),
-                self.frameWidth(),
-                self.columnWidth(0),
-                self.viewport().height() + self.horizontalHeader().height()
-            )
-
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        self.updateFrozenTableGeometry()
-
-    def moveCursor(self, cursorAction, modifiers):
-        current = super().moveCursor(cursorAction, modifiers)
-        if cursorAction == QAbstractItemView.CursorAction.MoveLeft and current.column() > 0:
-            visual_x = self.visualRect(current).topLeft().x()
-            if visual_x < self.frozenTableView.columnWidth(0):
-                new_value = self.horizontalScrollBar().value() + visual_x - self.frozenTableView.columnWidth(0)
-                self.horizontalScrollBar().setValue(int(new_value))
-        return current
-
-    def scrollTo(self, index, hint=QAbstractItemView.ScrollHint.EnsureVisible):
-        if index.column() > 0:
-            super().scrollTo(index, hint)
-
 class CRMTab(QWidget):
     """CRMTab for managing pivoted CRM data with SQLite."""
     def __init__(self, app, parent_frame):
@@ -155,6 +79,7 @@ class CRMTab(QWidget):
         self.app = app
         self.parent_frame = parent_frame
         self.conn = None
+        self._crm_store = None
         self.pivot_data = None
         self.table_view = None
         self.search_var = QLineEdit()
@@ -314,6 +239,16 @@ class CRMTab(QWidget):
             logger.error(f"Failed to connect to SQLite database: {str(e)}")
             QMessageBox.warning(self, "Error", f"Failed to connect to database:\n{str(e)}")
 
+    def crm_store(self):
+        """In-memory CRMStore of pivot_crm, read on first use and after every edit; None without a database."""
+        if self._crm_store is None:
+            if self.conn is None:
+                self.init_db()
+            if self.conn is None:
+                return None
+            self._crm_store = CRMStore.load(self.conn)
+        return self._crm_store
+
     def load_and_display(self):
         """Load data from SQLite and display pivot table."""
         if self.conn is None:
@@ -408,19 +343,12 @@ class CRMTab(QWidget):
             self.pivot_data = df
             model = CRMTableModel(self, df, decimal_places=int(self.decimal_places.currentText()))
             self.table_view.setModel(model)
-            self.table_view.frozenTableView.setModel(model)
-            self.table_view.updateFrozenColumns()
             
             for col_idx, col in enumerate(df.columns):
-                max_width = max([len(str(x)) for x in df[col].dropna()] + [len(str(col))], default=10)
+                max_width = estimate_text_width(df[col].dropna().to_numpy(dtype=object), col)
                 pixel_width = min(max_width * 9, 150)
                 self.column_widths[col] = pixel_width
                 self.table_view.setColumnWidth(col_idx, pixel_width)
-                if col_idx == 0:
-                    self.table_view.frozenTableView.setColumnWidth(0, pixel_width)
-
-            self.table_view.model().layoutChanged.emit()
-            self.table_view.frozenTableView.model().layoutChanged.emit()
 
         except Exception as e:
             logger.error(f"Failed to update display: {str(e)}")
@@ -508,6 +436,7 @@ class CRMTab(QWidget):
             cursor.execute(query, values)
             self.conn.commit()
             logger.info("Added new record to pivot_crm table")
+            self._crm_store = None
             self.update_display()
             QMessageBox.information(dialog, "Success", "Record added successfully!")
             dialog.accept()
@@ -591,6 +520,7 @@ class CRMTab(QWidget):
             cursor.execute(query, update_values)
             self.conn.commit()
             logger.info(f"Updated record with CRM ID = {id_value}")
+            self._crm_store = None
             self.update_display()
             QMessageBox.information(dialog, "Success", "Record updated successfully!")
             dialog.accept()
@@ -620,6 +550,7 @@ class CRMTab(QWidget):
                 cursor.execute(f"DELETE FROM pivot_crm WHERE [{id_col}] = ?", (id_value,))
                 logger.info(f"Deleted record with {id_col} = {id_value}")
             self.conn.commit()
+            self._crm_store = None
             self.update_display()
             QMessageBox.information(self, "Success", "Selected records deleted successfully!")
         except Exception as e:
@@ -632,6 +563,7 @@ class CRMTab(QWidget):
             self.conn.close()
             logger.info("SQLite database connection closed")
         self.conn = None
+        self._crm_store = None
         self.pivot_data = None
         self.column_widths = {}
         self.search_var.clear()
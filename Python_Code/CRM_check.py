@@ -101,6 +101,7 @@ global_style = """
 
 class CrmCheck(QWidget):
     data_changed = pyqtSignal()
+    cell_edited = pyqtSignal(object, str)  # (Solution Label, column) of an in-place table edit
 
     def __init__(self, app, results_frame, parent=None):
         super().__init__(parent)
@@ -116,7 +117,9 @@ class CrmCheck(QWidget):
         self.crm_diff_max = QLineEdit("12")
         self.current_plot_window = None
         self.setup_ui()
-        self.results_frame.app.notify_data_changed = self.on_data_changed
+        self.cell_edited.connect(self.results_frame.on_cell_edited)
+        self.cell_edited.connect(self.on_cell_edited)
+        self.results_frame.pivot_rebuilt.connect(self.on_data_changed)
         if hasattr(self.results_frame, 'decimal_combo') and self.results_frame.decimal_combo is not None:
             self.results_frame.decimal_combo.currentTextChanged.connect(self.update_pivot_display)
         else:
@@ -242,10 +245,24 @@ class CrmCheck(QWidget):
         self.data_changed.emit()
 
     def on_data_changed(self):
-        """Update pivot table when data in ResultsFrame changes."""
+        """Update pivot table when ResultsFrame has rebuilt its pivot."""
         logger.debug("Data changed in ResultsFrame, updating pivot display")
         self.update_pivot_display()
 
+    def on_cell_edited(self, solution_label, column):
+        """Recompute the edited label's inline CRM and Diff rows in place; redisplay if they cannot be patched."""
+        if column == 'Solution Label' or solution_label not in self._inline_crm_rows_display:
+            return
+        pivot_data = self.results_frame.last_filtered_data
+        rows = self.crm_manager._build_crm_row_lists_for_columns(list(pivot_data.columns), labels={solution_label})
+        model = self.table_view.model()
+        if solution_label in rows:
+            self._inline_crm_rows_display[solution_label] = rows[solution_label]
+            if isinstance(model, PivotTableModel) and model.replace_inline_rows(solution_label, rows[solution_label]):
+                return
+        logger.debug(f"Inline CRM rows of {solution_label} changed layout, redisplaying")
+        self.update_pivot_display()
+
     def validate_crm_diff_range(self):
         """Validate CRM difference range inputs and update display."""
         try:
@@ -269,7 +286,6 @@ class CrmCheck(QWidget):
         if pivot_data is None or pivot_data.empty:
             logger.warning("No data loaded for pivot display")
             self.table_view.setModel(None)
-            self.table_view.frozenTableView.setModel(None)
             return
 
         logger.debug(f"Current view data shape: {pivot_data.shape}")
@@ -281,10 +297,6 @@ class CrmCheck(QWidget):
 
         model = PivotTableModel(self, pivot_data, combined_rows)
         self.table_view.setModel(model)
-        self.table_view.frozenTableView.setModel(model)
-        self.table_view.updateFrozenColumns()
-        self.table_view.model().layoutChanged.emit()
-        self.table_view.frozenTableView.model().layoutChanged.emit()
         self.table_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
         for col, width in self.column_widths.items():
             if col < len(pivot_data.columns):
@@ -328,6 +340,7 @@ class CrmCheck(QWidget):
         """Restore a column from backup."""
         if column in self.results_frame.column_backups:
             self.results_frame.last_filtered_data[column] = self.results_frame.column_backups[column].copy()
+            self.results_frame.column_stats.invalidate(column)
             self.update_pivot_display()
             logger.debug(f"Restored column: {column}")
             del self.results_frame.column_backups[column]
@@ -1,47 +1,32 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel, QLineEdit, QPushButton, QTableView, QHeaderView, QGroupBox, QMessageBox, QProgressDialog, QCheckBox
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QItemSelectionModel, QItemSelection, QItemSelectionRange
-from PyQt6.QtGui import QStandardItemModel, QStandardItem, QColor
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel, QLineEdit, QPushButton, QTableView, QHeaderView, QGroupBox, QMessageBox, QCheckBox
+from PyQt6.QtCore import Qt, QItemSelectionModel, QItemSelection, QItemSelectionRange
+from PyQt6.QtGui import QStandardItemModel, QColor
+from utils.array_table_model import ArrayTableModel, ArrayColumn
+from utils.sample_correction import first_rows_per_label
 import pandas as pd
-import re
+import numpy as np
 import time
 import logging
-from collections import deque
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-class DFCorrectionThread(QThread):
-    """Thread for applying DF corrections in the background."""
-    progress = pyqtSignal(int)
-    finished = pyqtSignal(str, int)
-    error = pyqtSignal(str)
+# DF written in the Solution Label, e.g. "S12 D10" or "S12-D10-2"
+DF_LABEL_PATTERN = r'D(\d+)(?:-|\b|$)'
 
-    def __init__(self, df, solution_labels, new_df):
-        super().__init__()
-        self.df = df.copy()
-        self.solution_labels = solution_labels
-        self.new_df = new_df
+def expected_dfs(labels, default):
+    """Expected DF of every row: the number after 'D' in its Solution Label, else default.
 
-    def run(self):
-        try:
-            corrected_rows = 0
-            total_rows = len(self.solution_labels)
-            for i, solution_label in enumerate(self.solution_labels):
-                mask = (self.df['Solution Label'] == solution_label) & (self.df['Type'] == 'Samp')
-                matching_rows = self.df[mask]
-                if not matching_rows.empty:
-                    self.df.loc[mask, 'DF'] = self.new_df
-                    corrected_rows += len(matching_rows)
-                if total_rows > 10:
-                    self.progress.emit(int((i + 1) / total_rows * 100))
-            self.finished.emit(self.df.to_json(), corrected_rows)
-        except Exception as e:
-            self.error.emit(str(e))
+    The pattern runs once per unique label (labels repeat once per element) and is mapped back by code.
+    """
+    codes, uniques = pd.factorize(pd.Series(labels))
+    found = pd.Series(uniques, dtype=object).str.extract(DF_LABEL_PATTERN, expand=False)
+    per_label = pd.to_numeric(found, errors='coerce').fillna(default).to_numpy(dtype=float)
+    # missing labels have code -1, which picks the trailing default
+    return np.append(per_label, default)[codes]
 
 class DFCheckFrame(QWidget):
-    data_changed = pyqtSignal()  # Signal to notify data changes
-
     def __init__(self, app, results_frame, parent=None):
         super().__init__(parent)
         self.app = app
@@ -54,7 +39,6 @@ class DFCheckFrame(QWidget):
         self.included_samples = set()
         self.df_value = 1.0
         self.new_df = 1.0
-        self.undo_stack = deque()
         self.is_select_all_processing = False
 
         # CRITICAL: Connect this instance to app (مثل WeightCheckFrame)
@@ -169,10 +153,11 @@ class DFCheckFrame(QWidget):
         check_button.clicked.connect(self.check_df_values)
         input_layout.addWidget(check_button)
 
-        undo_button = QPushButton("Undo Last Change")
-        undo_button.setToolTip("Undo the last DF correction")
-        undo_button.clicked.connect(self.undo_last_change)
-        input_layout.addWidget(undo_button)
+        self.undo_button = QPushButton("Undo Last Change")
+        self.undo_button.setToolTip("Undo the last correction (weight, volume, DF or drift)")
+        self.undo_button.clicked.connect(self.undo_last_change)
+        self.undo_button.setEnabled(False)
+        input_layout.addWidget(self.undo_button)
 
         input_layout.addStretch()
         main_layout.addWidget(input_group)
@@ -259,28 +244,22 @@ class DFCheckFrame(QWidget):
         selection = QItemSelection()
         deselection = QItemSelection()
 
+        labels = [str(label) for label in model.column_values(1)] if isinstance(model, ArrayTableModel) else []
+        all_rows = QItemSelectionRange(model.index(0, 0), model.index(model.rowCount() - 1, model.columnCount() - 1)) if labels else None
         if state == 2:  # Qt.CheckState.Checked
             logger.debug(f"Processing Select All: Checking all rows")
-            for row in range(model.rowCount()):
-                index = model.index(row, 0)
-                selection.append(QItemSelectionRange(index, model.index(row, model.columnCount() - 1)))
-                include_item = model.item(row, 0)
-                if include_item:
-                    include_item.setCheckState(Qt.CheckState.Checked)
-                    solution_label = model.data(model.index(row, 1))
-                    self.included_samples.add(solution_label)
-            self.selected_solution_labels = [model.data(model.index(row, 1)) for row in range(model.rowCount())]
-            logger.debug(f"Select All: Selected {len(self.selected_solution_labels)} rows, included: {self.included_samples}")
+            if all_rows is not None:
+                selection.append(all_rows)
+                model.set_all_checked(True)
+            self.included_samples.update(labels)
+            self.selected_solution_labels = labels
+            logger.debug(f"Select All: Selected {len(self.selected_solution_labels)} rows, included: {len(self.included_samples)}")
         else:  # Qt.CheckState.Unchecked
             logger.debug(f"Processing Select All: Unchecking all rows")
-            for row in range(model.rowCount()):
-                index = model.index(row, 0)
-                deselection.append(QItemSelectionRange(index, model.index(row, model.columnCount() - 1)))
-                include_item = model.item(row, 0)
-                if include_item:
-                    include_item.setCheckState(Qt.CheckState.Unchecked)
-                    solution_label = model.data(model.index(row, 1))
-                    self.included_samples.discard(solution_label)
+            if all_rows is not None:
+                deselection.append(all_rows)
+                model.set_all_checked(False)
+            self.included_samples.difference_update(labels)
             self.selected_solution_labels = []
             logger.debug("Select All: Cleared selections and checkboxes")
 
@@ -311,22 +290,12 @@ class DFCheckFrame(QWidget):
             QMessageBox.warning(self, "Warning", "No data loaded!")
             return
 
-        sample_data = df[df['Type'] == 'Samp'].copy()
-        if sample_data.empty:
+        if not (df['Type'] == 'Samp').any():
             QMessageBox.warning(self, "Warning", "No sample data found!")
             return
 
-        # Extract expected DF from Solution Label or use input
-        def get_expected_df(label):
-            match = re.search(r'D(\d+)(?:-|\b|$)', label)
-            return int(match.group(1)) if match else self.df_value
-
         data_filter_start = time.time()
-        sample_data['Expected DF'] = sample_data['Solution Label'].apply(get_expected_df)
-        sample_data['DF'] = pd.to_numeric(sample_data['DF'], errors='coerce')
-        self.bad_dfs = sample_data[
-            (sample_data['DF'] != sample_data['Expected DF'])
-        ][['Solution Label', 'DF', 'Expected DF']].drop_duplicates(subset=['Solution Label'])
+        self.recalculate_bad_dfs()
         
         # Always update original_bad_dfs to include new data (مثل original_bad_weights)
         self.original_bad_dfs = self.bad_dfs.copy()
@@ -341,35 +310,30 @@ class DFCheckFrame(QWidget):
     def update_correction_table(self):
         """Update the correction table with bad DFs and preserve corrected DFs (مثل Weight)."""
         start_time = time.time()
-        model = QStandardItemModel()
-        model.setHorizontalHeaderLabels(["Include", "Solution Label", "Old DF", "New DF"])
+        headers = ["Include", "Solution Label", "Old DF", "New DF"]
+        columns = [ArrayColumn(header, []) for header in headers]
+        checked = None
 
         if self.bad_dfs is not None and not self.bad_dfs.empty:
-            for _, row in self.bad_dfs.iterrows():  # Use bad_dfs (مثل bad_weights)
-                solution_label = row['Solution Label']
-                old_df = float(row['DF'])
-
-                include_item = QStandardItem()
-                include_item.setCheckable(True)
-                include_item.setCheckState(Qt.CheckState.Checked if solution_label in self.included_samples else Qt.CheckState.Unchecked)
-
-                label_item = QStandardItem(str(solution_label))
-                label_item.setEditable(False)
-
-                old_df_item = QStandardItem(f"{old_df:.3f}")
-                old_df_item.setEditable(False)
-                old_df_item.setBackground(QColor("#FFE0B2"))
-
-                # Use corrected DFs if available, otherwise use original DF (مثل corrected_weights)
-                new_df_value = self.corrected_dfs.get(solution_label, {}).get('new_df', old_df)
-                new_df_item = QStandardItem(f"{new_df_value:.3f}")
-                new_df_item.setEditable(False)
-                new_df_item.setBackground(QColor("#C8E6C9"))
-
-                model.appendRow([include_item, label_item, old_df_item, new_df_item])
-
-            model.itemChanged.connect(self.toggle_include)
-
+            labels = self.bad_dfs['Solution Label'].to_numpy(dtype=object)
+            old_dfs = self.bad_dfs['DF'].astype(float).to_numpy()
+            # Use corrected DFs if available, otherwise use original DF (مثل corrected_weights)
+            corrected = pd.DataFrame.from_dict(self.corrected_dfs, orient='index')
+            label_series = pd.Series(labels)
+            new_dfs = old_dfs.copy()
+            if not corrected.empty:
+                new_dfs = label_series.map(corrected['new_df']).fillna(pd.Series(old_dfs)).to_numpy(dtype=float)
+            checked = label_series.isin(self.included_samples).to_numpy()
+
+            columns = [
+                ArrayColumn("Include", np.full(len(labels), "", dtype=object)),
+                ArrayColumn("Solution Label", labels),
+                ArrayColumn("Old DF", old_dfs, decimals=3, background=QColor("#FFE0B2")),
+                ArrayColumn("New DF", new_dfs, decimals=3, background=QColor("#C8E6C9")),
+            ]
+
+        model = ArrayTableModel(columns, check_column=0, checked=checked)
+        model.check_toggled.connect(self.toggle_include)
         self.correction_table.setModel(model)
         # Connect selectionChanged signal after setting the model
         if self.correction_table.selectionModel():
@@ -388,28 +352,22 @@ class DFCheckFrame(QWidget):
 
         logger.debug(f"Updating correction table took {time.time() - start_time:.3f} seconds")
 
-    def toggle_include(self, item):
+    def toggle_include(self, row, checked):
         """Toggle inclusion of a sample and select/deselect the row."""
-        if item.column() == 0:
-            model = self.correction_table.model()
-            solution_label = model.data(model.index(item.row(), 1))
-            new_state = item.checkState()
-            selection_model = self.correction_table.selectionModel()
-            row_index = model.index(item.row(), 0)
-
-            if new_state == Qt.CheckState.Checked:
-                self.included_samples.add(solution_label)
-                selection = QItemSelection(row_index, model.index(item.row(), model.columnCount() - 1))
-                selection_model.select(selection, QItemSelectionModel.SelectionFlag.Select | QItemSelectionModel.SelectionFlag.Rows)
-                self.selected_solution_labels.append(solution_label)
-            else:
-                self.included_samples.discard(solution_label)
-                deselection = QItemSelection(row_index, model.index(item.row(), model.columnCount() - 1))
-                selection_model.select(deselection, QItemSelectionModel.SelectionFlag.Deselect | QItemSelectionModel.SelectionFlag.Rows)
-                if solution_label in self.selected_solution_labels:
-                    self.selected_solution_labels.remove(solution_label)
-
-            logger.debug(f"Toggled include for {solution_label} to {'Checked' if new_state == Qt.CheckState.Checked else 'Unchecked'}, selected labels: {self.selected_solution_labels}")
+        model = self.correction_table.model()
+        solution_label = model.data(model.index(row, 1))
+        selection_model = self.correction_table.selectionModel()
+        row_selection = QItemSelection(model.index(row, 0), model.index(row, model.columnCount() - 1))
+
+        if checked:
+            self.included_samples.add(solution_label)
+            selection_model.select(row_selection, QItemSelectionModel.SelectionFlag.Select | QItemSelectionModel.SelectionFlag.Rows)
+            self.selected_solution_labels.append(solution_label)
+        else:
+            self.included_samples.discard(solution_label)
+            selection_model.select(row_selection, QItemSelectionModel.SelectionFlag.Deselect | QItemSelectionModel.SelectionFlag.Rows)
+            if solution_label in self.selected_solution_labels:
+                self.selected_solution_labels.remove(solution_label)
 
     def apply_df_correction(self):
         """Apply DF correction to the included samples (منطق مثل Weight)."""
@@ -443,8 +401,6 @@ class DFCheckFrame(QWidget):
             QMessageBox.warning(self, "Warning", "No samples included! Check 'Include' checkboxes.")
             return
 
-        self.undo_stack.append(df.copy().to_json())
-
         # Store corrections like Weight (استفاده از original_bad_dfs)
         if self.original_bad_dfs is not None:
             bad_dfs_dict = self.original_bad_dfs.set_index('Solution Label')[['DF', 'Expected DF']].to_dict('index')
@@ -460,60 +416,27 @@ class DFCheckFrame(QWidget):
         # Ensure app.df_check reference is correct
         self.app.df_check = self
 
-        if len(valid_labels) <= 10:
-            try:
-                corrected_rows = 0
-                for solution_label in valid_labels:
-                    mask = (df['Solution Label'] == solution_label) & (df['Type'] == 'Samp')
-                    matching_rows = df[mask]
-                    if not matching_rows.empty:
-                        df.loc[mask, 'DF'] = self.new_df
-                        corrected_rows += len(matching_rows)
-                self.df_cache = df
-                self.app.set_data(self.df_cache)
-                self.data_changed.emit()
-                self.recalculate_bad_dfs()  # مثل Weight
-                self.update_correction_table()
-                self.clear_ui_state()
-                self.app.notify_data_changed()
-                QMessageBox.information(self, "Success", f"Corrected {corrected_rows} rows")
-                if self.bad_dfs.empty:
-                    QMessageBox.information(self, "Info", "All DF values are now correct!")
-                logger.debug(f"Small batch correction took {time.time() - start_time:.3f} seconds")
-                return
-            except Exception as e:
-                QMessageBox.warning(self, "Error", f"Failed: {str(e)}")
-                return
-
-        # Threaded correction
-        self.thread = DFCorrectionThread(df, valid_labels, self.new_df)
-        self.progress_dialog = QProgressDialog("Applying DF correction...", "Cancel", 0, 100, self)
-        self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
-        self.progress_dialog.setAutoClose(True)
-        self.progress_dialog.setMinimumDuration(0)
-        self.progress_dialog.canceled.connect(self.thread.terminate)
-        self.thread.progress.connect(self.progress_dialog.setValue)
-        self.thread.finished.connect(self.on_correction_finished)
-        self.thread.error.connect(self.on_correction_error)
-        self.thread.start()
-
-        logger.debug(f"Starting threaded apply_df_correction took {time.time() - start_time:.3f} seconds")
+        try:
+            self.app.begin_corrections().set_value(valid_labels, 'DF', self.new_df)
+            corrected_rows = self.app.commit_corrections(on_undo=self.on_correction_undone)
+        except Exception as e:
+            self.app.discard_corrections()
+            QMessageBox.warning(self, "Error", f"Failed: {str(e)}")
+            return
+        self.on_correction_finished(corrected_rows)
+        logger.debug(f"Apply DF correction took {time.time() - start_time:.3f} seconds")
 
     def recalculate_bad_dfs(self):
         """Recalculate bad_dfs after correction (مثل Weight)."""
         if self.df_cache is None:
             return
-        sample_data = self.df_cache[self.df_cache['Type'] == 'Samp'].copy()
-        
-        def get_expected_df(label):
-            match = re.search(r'D(\d+)(?:-|\b|$)', label)
-            return int(match.group(1)) if match else self.df_value
-        
-        sample_data['Expected DF'] = sample_data['Solution Label'].apply(get_expected_df)
-        sample_data['DF'] = pd.to_numeric(sample_data['DF'], errors='coerce')
-        self.bad_dfs = sample_data[
-            (sample_data['DF'] != sample_data['Expected DF'])
-        ][['Solution Label', 'DF', 'Expected DF']].drop_duplicates(subset=['Solution Label'])
+        df = self.df_cache
+        expected = expected_dfs(df['Solution Label'], self.df_value)
+        dfs = pd.to_numeric(df['DF'], errors='coerce').to_numpy(dtype=float)
+        bad = (df['Type'] == 'Samp').to_numpy() & (dfs != expected)
+        rows = first_rows_per_label(df, bad)
+        self.bad_dfs = pd.DataFrame({'Solution Label': df['Solution Label'].to_numpy()[rows], 'DF': dfs[rows],
+                                     'Expected DF': expected[rows]}, index=df.index[rows])
         logger.debug(f"Recalculated bad_dfs shape: {self.bad_dfs.shape}")
         logger.debug(f"Recalculated bad_dfs Solution Labels: {self.bad_dfs['Solution Label'].tolist()}")
 
@@ -525,17 +448,24 @@ class DFCheckFrame(QWidget):
         self.select_all_checkbox.setCheckState(Qt.CheckState.Unchecked)
 
     def undo_last_change(self):
-        """Undo the last DF correction and update the table (مثل Weight)."""
-        if not self.undo_stack:
+        """Undo the last correction batch (weight, volume, DF or drift) (مثل Weight)."""
+        try:
+            undone = self.app.undo_corrections()
+        except (ValueError, TypeError) as e:
+            logger.error(f"Undo failed: {str(e)}")
+            QMessageBox.warning(self, "Warning", "Data changed since the last correction; it cannot be undone.")
+            return
+        if not undone:
             QMessageBox.information(self, "Info", "No changes to undo!")
             return
         
-        # Restore previous data from undo stack
-        prev_json = self.undo_stack.pop()
-        self.df_cache = pd.read_json(prev_json)
-        self.app.set_data(self.df_cache)
-        self.data_changed.emit()
-        self.app.notify_data_changed()  # Notify all tabs of data change
+        QMessageBox.information(self, "Success", "Last change undone")
+        if self.bad_dfs is not None and self.bad_dfs.empty:
+            QMessageBox.information(self, "Info", "No DF issues found after undo.")
+
+    def on_correction_undone(self, changes):
+        """Refresh the bad-DF table once a DF correction has been undone."""
+        self.df_cache = self.app.get_data()
         
         # Recalculate bad_dfs based on restored data (مثل Weight)
         self.recalculate_bad_dfs()
@@ -546,18 +476,11 @@ class DFCheckFrame(QWidget):
         # Update table to reflect restored bad DFs
         self.update_correction_table()
         self.clear_ui_state()
-        
-        QMessageBox.information(self, "Success", "Last change undone")
-        if self.bad_dfs.empty:
-            QMessageBox.information(self, "Info", "No DF issues found after undo.")
 
-    def on_correction_finished(self, df_json, corrected_rows):
-        """Handle thread completion (منطق دقیق مثل Weight)."""
+    def on_correction_finished(self, corrected_rows):
+        """Refresh the bad-DF table from the corrected data (منطق دقیق مثل Weight)."""
         try:
-            self.df_cache = pd.read_json(df_json)
-            self.app.set_data(self.df_cache)
-            self.data_changed.emit()
-            self.app.notify_data_changed()  # Notify all tabs of data change
+            self.df_cache = self.app.get_data()
             
             # Recalculate bad_dfs after correction (مثل Weight)
             self.recalculate_bad_dfs()
@@ -573,25 +496,13 @@ class DFCheckFrame(QWidget):
             QMessageBox.information(self, "Success", f"Corrected {corrected_rows} rows")
             if self.bad_dfs.empty:
                 QMessageBox.information(self, "Info", "All DF values are now within the valid range!")
-            
-            # Close progress dialog
-            if hasattr(self, 'progress_dialog'):
-                self.progress_dialog.close()
-                
-            logger.debug(f"DF correction thread finished. {corrected_rows} rows updated.")
+
+            logger.debug(f"DF correction finished. {corrected_rows} rows updated.")
             logger.debug(f"corrected_dfs has {len(self.corrected_dfs)} entries for reporting.")
             
         except Exception as e:
             logger.error(f"Error in on_correction_finished: {e}", exc_info=True)
             QMessageBox.critical(self, "Error", f"Failed to finalize DF correction:\n{str(e)}")
-            if hasattr(self, 'progress_dialog'):
-                self.progress_dialog.close()
-
-    def on_correction_error(self, error_msg):
-        """Handle thread errors."""
-        QMessageBox.warning(self, "Error", f"Failed to apply corrections: {error_msg}")
-        if hasattr(self, 'progress_dialog'):
-            self.progress_dialog.close()
 
     def reset_state(self):
         """Reset all internal state and UI (مثل Weight)."""
@@ -604,7 +515,6 @@ class DFCheckFrame(QWidget):
         self.corrected_dfs.clear()  # Clear corrected_dfs (مثل Weight)
         self.selected_solution_labels = []
         self.included_samples.clear()
-        self.undo_stack.clear()
         self.is_select_all_processing = False
         self.df_value = 1.0
         self.new_df = 1.0
@@ -4,19 +4,38 @@ from PyQt6.QtWidgets import (
     QComboBox
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from PyQt6.QtGui import QFont, QStandardItemModel, QStandardItem, QColor
+from PyQt6.QtGui import QFont, QStandardItemModel, QColor
 import pyqtgraph as pg
 import pandas as pd
 import numpy as np
 import logging
-from functools import reduce
+from functools import reduce, partial
 import math
 import re
+from utils.array_table_model import ArrayTableModel, ArrayColumn
+from utils.undo_journal import CellChanges
+from utils.sample_correction import apply_values
+from utils.drift_models import DRIFT_MODELS, drift_factors, drift_pass
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+RM_TABLE_HEADERS = ["RM Label", "Next RM", "Type", "Original Value", "Current Value", "Ratio"]
+RM_TYPE_COLORS = {
+    'Base': '#2E7D32',
+    'Check': '#FF6B00',
+    'Cone': '#7B1FA2'
+}
+
+# rm_type -> (symbol, color) of the RM plot markers; 'Missing' marks RMs flagged by the empty check
+RM_PLOT_MARKERS = {
+    'Base': ('o', '#2E7D32'),
+    'Check': ('t', '#FF6B00'),
+    'Cone': ('s', '#7B1FA2'),
+    'Missing': ('o', 'r'),
+}
+
 # Global stylesheet
 global_style = """
     QWidget {
@@ -96,6 +115,41 @@ global_style = """
     }
 """
 
+# (chek|check|cone) اولین نوع در برچسب؛ num آخرین عدد قبل از آن
+RM_LABEL_PATTERN = (
+    r'^(?:{keyword}\s*[-_]?\s*)?'
+    r'(?:(?:(?!chek|check|cone).)*?(?P<num>\d+))?'
+    r'(?:(?!chek|check|cone)\D)*'
+    r'(?:(?P<type>chek|check|cone)|$)'
+)
+RM_TYPE_NAMES = {'chek': 'Check', 'check': 'Check', 'cone': 'Cone'}
+
+def rm_info_table(labels, keyword="RM", cache=None):
+    """
+    جدول is_rm / rm_num / rm_type برای برچسب‌ها، با index برابر Solution Label
+    هر برچسب یکتا با یک str.extract برداری تجزیه می‌شود؛ اگر cache (دیکشنری keyword → جدول)
+    داده شود، برچسب‌های تجزیه‌شده در آن نگه داشته می‌شوند و فقط برچسب‌های جدید تجزیه می‌شوند.
+    """
+    labels = pd.Series(labels, dtype=object)
+    cached = cache.get(keyword) if cache is not None else None
+    unique = pd.Index(labels.unique())
+    new = unique if cached is None else unique[~unique.isin(cached.index)]
+    if len(new):
+        raw = pd.Series(new, index=new, dtype=object).astype(str)
+        parsed = raw.str.strip().str.lower().str.extract(
+            RM_LABEL_PATTERN.format(keyword=re.escape(keyword)), flags=re.IGNORECASE | re.DOTALL
+        )
+        table = pd.DataFrame({
+            'is_rm': raw.str.match(rf'^{re.escape(keyword)}', flags=re.IGNORECASE).fillna(False).astype(bool),
+            'rm_num': pd.to_numeric(parsed['num']).fillna(0).astype(int),
+            'rm_type': parsed['type'].map(RM_TYPE_NAMES).fillna('Base'),
+        }, index=new)
+        table.loc[pd.isna(new), 'is_rm'] = False
+        cached = table if cached is None else pd.concat([cached, table])
+        if cache is not None:
+            cache[keyword] = cached
+    return cached
+
 def extract_rm_info(label, keyword="RM"):
     """
     استخراج عدد و نوع RM از Solution Label
@@ -106,25 +160,27 @@ def extract_rm_info(label, keyword="RM"):
         RMcheck → (0, 'Check')
         RM → (0, 'Base')
     """
-    label = str(label).strip()
-    label_lower = label.lower()
-    # حذف keyword از اول (RM, rm, Rm, ...)
-    cleaned = re.sub(rf'^{re.escape(keyword)}\s*[-_]?\s*', '', label_lower, flags=re.IGNORECASE)
-    rm_type = 'Base'
-    rm_number = 0
-    # تشخیص نوع (check/cone) — حتی چسبیده
-    type_match = re.search(r'(chek|check|cone)', cleaned)
-    if type_match:
-        typ = type_match.group(1)
-        rm_type = 'Check' if typ in ['chek', 'check'] else 'Cone'
-        before_text = cleaned[:type_match.start()]
-    else:
-        before_text = cleaned
-    # استخراج عدد از قبل نوع
-    numbers = re.findall(r'\d+', before_text)
-    if numbers:
-        rm_number = int(numbers[-1])
-    return rm_number, rm_type
+    info = rm_info_table([label], keyword).loc[label]
+    return int(info['rm_num']), info['rm_type']
+
+def linear_fits(x, y, groups, n_groups):
+    """Least-squares slope and intercept of y over x for every group at once, from closed-form sums.
+
+    Groups with fewer than two distinct x values get slope 0 (intercept is their mean, NaN if empty).
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = np.bincount(groups, minlength=n_groups).astype(float)
+    sx = np.bincount(groups, x, n_groups)
+    sy = np.bincount(groups, y, n_groups)
+    sxx = np.bincount(groups, x * x, n_groups)
+    sxy = np.bincount(groups, x * y, n_groups)
+    denom = n * sxx - sx * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(denom > 0, (n * sxy - sx * sy) / denom, 0.0)
+        intercept = np.where(n > 0, (sy - slope * sx) / n, np.nan)
+    return slope, intercept
 
 class CheckRMThread(QThread):
     progress = pyqtSignal(int)
@@ -135,6 +191,16 @@ class CheckRMThread(QThread):
         super().__init__()
         self.app = app
         self.keyword = keyword
+        self.rm_info_cache = {}  # labels parsed during this run, shared by every step
+
+    def is_rm(self, labels):
+        """Mask of labels that start with the keyword."""
+        return labels.map(rm_info_table(labels, self.keyword, self.rm_info_cache)['is_rm']).fillna(False).astype(bool)
+
+    def rm_info(self, labels):
+        """rm_num and rm_type Series aligned with labels, read from this run's label table."""
+        info = rm_info_table(labels, self.keyword, self.rm_info_cache)
+        return labels.map(info['rm_num']).astype(int), labels.map(info['rm_type'])
 
     def run(self):
         try:
@@ -269,13 +335,13 @@ class CheckRMThread(QThread):
                 pivot_df = pivot_df.drop(columns=['group_id'], errors='ignore')
 
             # --- مرحله 9: استخراج num و نوع برای همه RMها ---
+            # همه برچسب‌ها یک بار طبقه‌بندی می‌شوند؛ مراحل بعد فقط از جدول می‌خوانند
+            rm_info = rm_info_table(pd.concat([df_filtered['Solution Label'], pivot_df['Solution Label'].fillna('')]), self.keyword, self.rm_info_cache)
             rm_data = df_filtered[
-                df_filtered['Solution Label'].str.match(rf'^{re.escape(self.keyword)}', na=False, flags=re.IGNORECASE)
+                self.is_rm(df_filtered['Solution Label'])
             ].copy()
             if not rm_data.empty:
-                info = rm_data['Solution Label'].apply(extract_rm_info, keyword=self.keyword)
-                rm_data[['rm_num', 'rm_type']] = pd.DataFrame(info.tolist(), index=rm_data.index)
-                rm_data['rm_num'] = rm_data['rm_num'].astype(int)
+                rm_data['rm_num'], rm_data['rm_type'] = self.rm_info(rm_data['Solution Label'])
                 # فقط Baseها رو برای keep فیلتر کن
                 base_data = rm_data[rm_data['rm_type'] == 'Base']
                 check_cone_data = rm_data[rm_data['rm_type'].isin(['Check', 'Cone'])]
@@ -303,7 +369,7 @@ class CheckRMThread(QThread):
             # --- مرحله 10: ساخت rm_df با فیلتر گسترده ---
             pivot_df['Solution Label'] = pivot_df['Solution Label'].fillna('')
             rm_df = pivot_df[
-                pivot_df['Solution Label'].str.match(rf'^{re.escape(self.keyword)}', na=False, flags=re.IGNORECASE)
+                self.is_rm(pivot_df['Solution Label'])
             ].copy()
             if rm_df.empty:
                 labels = df_filtered['Solution Label'].unique().tolist()
@@ -319,17 +385,15 @@ class CheckRMThread(QThread):
                 rm_df[c] = pd.to_numeric(rm_df[c], errors='coerce')
                 pivot_df[c] = pd.to_numeric(pivot_df[c], errors='coerce')
             solution_labels = sorted(rm_df['Solution Label'].unique(),
-                                    key=lambda x: extract_rm_info(x, self.keyword)[0])
+                                    key=lambda x: rm_info.at[x, 'rm_num'])
 
             # --- مرحله 12: ساخت positions_df با فیلتر keep فقط برای Base ---
             positions_df = df_filtered.groupby(['Solution Label', 'row_id'])['original_index'].agg(['min', 'max']).reset_index()
             rm_positions = positions_df[
-                positions_df['Solution Label'].str.match(rf'^{re.escape(self.keyword)}', na=False, flags=re.IGNORECASE)
+                self.is_rm(positions_df['Solution Label'])
             ].copy()
             if not rm_positions.empty:
-                info_pos = rm_positions['Solution Label'].apply(extract_rm_info, keyword=self.keyword)
-                rm_positions[['rm_num', 'rm_type']] = pd.DataFrame(info_pos.tolist(), index=rm_positions.index)
-                rm_positions['rm_num'] = rm_positions['rm_num'].astype(int)
+                rm_positions['rm_num'], rm_positions['rm_type'] = self.rm_info(rm_positions['Solution Label'])
                 base_pos = rm_positions[rm_positions['rm_type'] == 'Base']
                 check_cone_pos = rm_positions[rm_positions['rm_type'].isin(['Check', 'Cone'])]
                 keep_mask = pd.Series([True] * len(rm_positions), index=rm_positions.index)
@@ -359,26 +423,21 @@ class CheckRMThread(QThread):
                 df_filtered = df_filtered[df_filtered['keep']].drop(columns=['keep'])
                 corrected_df = df_filtered.copy(deep=True)
             # Add rm_num and rm_type to corrected_df
-            corrected_df['rm_num'] = np.nan
-            corrected_df['rm_type'] = np.nan
-            mask = corrected_df['Solution Label'].str.match(rf'^{re.escape(self.keyword)}', na=False, flags=re.IGNORECASE)
-            if mask.any():
-                info = corrected_df.loc[mask, 'Solution Label'].apply(lambda x: extract_rm_info(x, keyword=self.keyword))
-                corrected_df.loc[mask, ['rm_num', 'rm_type']] = pd.DataFrame(info.tolist(), index=corrected_df.loc[mask].index)
-                corrected_df['rm_num'] = corrected_df['rm_num'].astype(float)
+            mask = self.is_rm(corrected_df['Solution Label'])
+            rm_nums, rm_types = self.rm_info(corrected_df['Solution Label'])
+            corrected_df['rm_num'] = rm_nums.astype(float).where(mask)
+            corrected_df['rm_type'] = rm_types.where(mask)
             # --- مرحله 13: بازسازی rm_df بدون فیلتر keep ---
             rm_df = pivot_df[
-                pivot_df['Solution Label'].str.match(rf'^{re.escape(self.keyword)}', na=False, flags=re.IGNORECASE)
+                self.is_rm(pivot_df['Solution Label'])
             ].copy()
             rm_with_row_id = df_filtered[
-                df_filtered['Solution Label'].str.match(rf'^{re.escape(self.keyword)}', na=False, flags=re.IGNORECASE)
+                self.is_rm(df_filtered['Solution Label'])
             ][['Solution Label', 'original_index', 'row_id']].drop_duplicates()
             rm_df = rm_df.merge(rm_with_row_id, on=['Solution Label', 'original_index'], how='left')
             rm_df['row_id'] = rm_df['row_id'].fillna(-1).astype(int)
             # --- مرحله 14: اضافه کردن rm_num و rm_type به rm_df ---
-            info_rm = rm_df['Solution Label'].apply(extract_rm_info, keyword=self.keyword)
-            rm_df[['rm_num', 'rm_type']] = pd.DataFrame(info_rm.tolist(), index=rm_df.index)
-            rm_df['rm_num'] = rm_df['rm_num'].astype(int)
+            rm_df['rm_num'], rm_df['rm_type'] = self.rm_info(rm_df['Solution Label'])
             # --- مرحله 15: تقسیم‌بندی بر اساس Cone ---
             rm_df = rm_df.sort_values('original_index').reset_index(drop=True)
             positions_list = []
@@ -443,121 +502,125 @@ class CheckRMThread(QThread):
             self.error.emit(str(e))
 
 class ApplySingleRMThread(QThread):
+    """Apply RM drift ratios to the samples of one element, or of a list of elements in one pass.
+
+    With several elements the RM x element ratio matrix of each segment is computed once and the
+    whole sample block is corrected with a single broadcast multiply. `models` maps an element to a
+    DRIFT_MODELS key; elements without one use the per-interval ratio (flat or stepwise). Curve
+    models run through every RM of a Cone segment and restart at the next Cone, whose reference RM
+    the following ratios are measured against.
+
+    corrected_df is only read. The result is a column patch {'Corr Con': (row positions, values)}
+    that the GUI thread writes into its own frame, so no frame is copied or serialized, plus the
+    corrected elements.
+    """
     progress = pyqtSignal(int)
     finished = pyqtSignal(dict)
     error = pyqtSignal(str)
 
-    def __init__(self, app, keyword, element, rm_num, rm_df, initial_rm_df, segments, corrected_df, stepwise):
+    def __init__(self, app, keyword, element, rm_num, rm_df, initial_rm_df, segments, corrected_df, stepwise, models=None):
         super().__init__()
         self.app = app
         self.keyword = keyword
-        self.element = element
+        self.elements = [element] if isinstance(element, str) else list(element)
         self.rm_num = rm_num
         self.rm_df = rm_df.copy(deep=True)
         self.initial_rm_df = initial_rm_df.copy(deep=True)
         self.segments = segments
-        self.corrected_df = corrected_df.copy(deep=True)
+        self.corrected_df = corrected_df
         self.stepwise = stepwise
+        self.models = dict(models or {})
         self.corrected_drift = {}
 
     def run(self):
         try:
-            element = self.element
-            total_steps = len(self.segments)
-            step = 0
-
+            elements = self.elements
+            df = self.corrected_df
+            corr_con = df['Corr Con'].to_numpy(dtype=float, copy=True)  # نسخه کاری همین یک ستون
+            touched = np.zeros(len(df), dtype=bool)
+
+            # یک بار برای کل اجرا: ردیف‌های نمونه این عناصر و موقعیت آن‌ها، و ردیف‌های RM همین عناصر
+            element_codes = pd.Categorical(df['Element'], categories=elements).codes.astype(np.int64)
+            is_rm = df['Solution Label'].str.match(rf'^{self.keyword}\d*$', na=False).to_numpy()
+            is_element = element_codes >= 0
+            sample_rows = np.flatnonzero(is_element & df['Corr Con'].notna().to_numpy() & ~is_rm)
+            samples = {
+                'rows': sample_rows,
+                'pos': pd.to_numeric(df['original_index'], errors='coerce').to_numpy(dtype=float)[sample_rows],
+                'codes': element_codes[sample_rows],
+                'labels': df['Solution Label'].to_numpy()[sample_rows],
+            }
+            rm_rows = np.flatnonzero(is_element & df['rm_num'].notna().to_numpy())
+            rm_row_nums = df['rm_num'].to_numpy(dtype=float)[rm_rows]
+            rm_row_ids = df['row_id'].to_numpy()[rm_rows]
+            rm_row_codes = element_codes[rm_rows]
+
+            # مرحله 1: ماتریس نسبت‌ها (RM x element) و به‌روزرسانی RMها برای هر بخش
+            blocks = []
+            rm_updates = []
             for segment in self.segments:
-                seg_id = segment['segment_id']
                 ref_rm_num = segment['ref_rm_num']
                 positions_df = segment['positions']
 
                 # فقط اگر RM در این بخش باشه
                 seg_rm_df = self.rm_df[self.rm_df['rm_num'].isin(positions_df['rm_num'])]
-                if seg_rm_df.empty:
-                    continue
-
                 # فقط از RMهایی که بعد از ref_rm_num هستن
                 valid_rows = positions_df[positions_df['rm_num'] >= ref_rm_num]
-                if valid_rows.empty:
+                if seg_rm_df.empty or valid_rows.empty:
                     continue
 
-                row_ids = valid_rows['row_id'].values
                 rm_nums = valid_rows['rm_num'].values
 
-                # مقادیر اولیه و فعلی
-                initial_vals = pd.to_numeric(self.initial_rm_df[self.initial_rm_df['rm_num'].isin(rm_nums)][element], errors='coerce').values
-                current_vals = pd.to_numeric(seg_rm_df[element], errors='coerce').values
+                # مقادیر اولیه و فعلی (RM x element)
+                initial_vals = self._element_matrix(self.initial_rm_df[self.initial_rm_df['rm_num'].isin(rm_nums)])
+                current_vals = self._element_matrix(seg_rm_df)
 
                 # شروع از اولین RM بعد از ref
                 start_idx = list(rm_nums).index(ref_rm_num) if ref_rm_num in rm_nums else 0
-                if start_idx >= len(rm_nums) - 1:
-                    step += 1
-                    self.progress.emit(int((step / total_steps) * 100))
-                    continue
-
-                effective_row_ids = row_ids[start_idx + 1:]
-                effective_initial = initial_vals[start_idx + 1:]
-                effective_current = current_vals[start_idx + 1:]
-
-                ratios = np.where(effective_initial != 0, effective_current / effective_initial, 1.0)
-
-                # اعمال در بخش
-                for i in range(len(effective_row_ids)):
-                    ratio = ratios[i]
-                    if np.isnan(ratio) or ratio <= 0:
-                        continue
-
-                    pos_row = valid_rows[valid_rows['row_id'] == effective_row_ids[i]].iloc[0]
-                    min_pos = pos_row['min']
-                    max_pos = pos_row['max']
-
-                    condition = (
-                        (self.corrected_df['original_index'] > min_pos) &
-                        (self.corrected_df['original_index'] < max_pos) &
-                        (self.corrected_df['Element'] == element) &
-                        (self.corrected_df['Corr Con'].notna()) &
-                        ~self.corrected_df['Solution Label'].str.match(rf'^{self.keyword}\d*$', na=False)
-                    )
-                    data_to_correct = self.corrected_df[condition].copy()
-
-                    if data_to_correct.empty:
-                        continue
-
-                    original_values_to_correct = data_to_correct['Corr Con'].values
-                    corrected_values = self.calculate_corrected_values(original_values_to_correct, ratio)
-                    self.corrected_df.loc[data_to_correct.index, 'Corr Con'] = corrected_values
-
+                if start_idx < len(rm_nums) - 1:
+                    effective = valid_rows.iloc[start_idx + 1:]
+                    effective_initial = initial_vals[start_idx + 1:]
+                    effective_current = current_vals[start_idx + 1:]
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        ratios = np.where(effective_initial != 0, effective_current / effective_initial, 1.0)
+                    blocks.append((effective['min'].to_numpy(dtype=float), effective['max'].to_numpy(dtype=float), ratios))
+                    rm_updates.append((rm_nums[start_idx + 1:], effective['row_id'].values, effective_current))
+            self.progress.emit(10)
+
+            # مرحله 2: ضرایب همه نمونه‌ها (در صورت بزرگ بودن داده، موازی بین عناصر)
+            models = [self.models.get(element, 'interval') for element in elements]
+            picked, factors, block_ids = drift_pass(samples['pos'], samples['codes'], blocks, self.stepwise, models)
+            self.progress.emit(70)
+
+            # مرحله 3: اعمال به ترتیب بخش‌ها؛ در هر بخش اول نمونه‌ها، بعد خود RMها
+            element_names = np.asarray(elements, dtype=object)
+            starts = np.searchsorted(block_ids, np.arange(len(blocks) + 1))
+            for block_id, (update_nums, update_row_ids, update_values) in enumerate(rm_updates):
+                seg_picked = picked[starts[block_id]:starts[block_id + 1]]
+                seg_factors = factors[starts[block_id]:starts[block_id + 1]]
+                if len(seg_picked):
+                    rows = samples['rows'][seg_picked]
+                    corr_con[rows] *= seg_factors
+                    touched[rows] = True
                     # ذخیره drift برای هر Sample
-                    for idx, row in data_to_correct.iterrows():
-                        solution_label = row['Solution Label']
-                        if self.stepwise:
-                            n = len(original_values_to_correct)
-                            delta = ratio - 1.0
-                            step_delta = delta / n if n > 0 else 0.0
-                            step_index = list(data_to_correct.index).index(idx)
-                            effective_ratio = 1.0 + step_delta * (step_index + 1)
-                        else:
-                            effective_ratio = ratio
-                        self.corrected_drift[(solution_label, element)] = effective_ratio
+                    keys = zip(samples['labels'][seg_picked], element_names[samples['codes'][seg_picked]])
+                    self.corrected_drift.update(zip(keys, seg_factors.tolist()))
 
                 # به‌روزرسانی خود RMها
-                for j, row_id in enumerate(effective_row_ids):
-                    rm_num_j = rm_nums[start_idx + 1 + j]
-                    condition = (
-                        (self.corrected_df['rm_num'] == rm_num_j) &
-                        (self.corrected_df['row_id'] == row_id) &
-                        (self.corrected_df['Element'] == element)
-                    )
-                    if not self.corrected_df[condition].empty and not np.isnan(effective_current[j]):
-                        self.corrected_df.loc[condition, 'Corr Con'] = effective_current[j]
-
-                step += 1
-                self.progress.emit(int((step / total_steps) * 100))
-
+                for rm_num_j, row_id, values in zip(update_nums, update_row_ids, update_values):
+                    hits = (rm_row_nums == rm_num_j) & (rm_row_ids == row_id)
+                    new_values = values[rm_row_codes[hits]]
+                    keep = ~np.isnan(new_values)
+                    if keep.any():
+                        corr_con[rm_rows[hits][keep]] = new_values[keep]
+                        touched[rm_rows[hits][keep]] = True
+            self.progress.emit(100)
+
+            rows = np.flatnonzero(touched)
             results = {
-                'corrected_df': self.corrected_df,
-                'rm_df': self.rm_df,
-                'corrected_drift': self.corrected_drift
+                'patch': {'Corr Con': (rows, corr_con[rows])},
+                'corrected_drift': self.corrected_drift,
+                'elements': elements
             }
             self.finished.emit(results)
 
@@ -565,23 +628,16 @@ class ApplySingleRMThread(QThread):
             logger.error(f"Error in ApplySingleRMThread: {str(e)}", exc_info=True)
             self.error.emit(str(e))
 
-    def calculate_corrected_values(self, original_values, current_ratio):
-        n = len(original_values)
-        if n == 0:
-            return np.array([])
-        delta = current_ratio - 1.0
-        step_delta = delta / n if n > 0 else 0.0
-        return original_values * np.array([1.0 + step_delta * (j + 1) if self.stepwise else current_ratio for j in range(n)])
+    def _element_matrix(self, frame):
+        """Numeric values of self.elements in frame as a (rows x elements) array."""
+        return frame.reindex(columns=self.elements).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
 
 class CheckRMFrame(QWidget):
-    data_changed = pyqtSignal()
-
     def __init__(self, app, parent=None):
         super().__init__(parent)
         self.app = app
         self.empty_rows_from_check = pd.DataFrame()
         self.initial_rm_df = None
-        self.undo_stack = []
         self.navigation_list = []
         self.current_nav_index = -1
         self.segments = []
@@ -598,11 +654,14 @@ class CheckRMFrame(QWidget):
         self.original_rm_values = self.display_rm_values = np.array([])
         self.current_valid_pivot_indices = []
         self.selected_row = -1
-        self.undo_stack = []
+        self.published_generation = None  # app.data_generation when corrected_df was last handed to the app
         self.corrected_drift = {}
+        self.drift_models = {}
         self.navigation_list = []
         self.current_nav_index = -1
         self.segments = []
+        self._empty_cache = (None, None)
+        self._segment_cache = (None, None, None)
         if hasattr(self, 'keyword_entry'): self.keyword_entry.setText("RM")
         if hasattr(self, 'element_combo'): self.element_combo.clear()
         if hasattr(self, 'label_label'): self.label_label.setText("Current RM: None")
@@ -611,11 +670,14 @@ class CheckRMFrame(QWidget):
         if hasattr(self, 'rm_table'): self.rm_table.setModel(QStandardItemModel())
         if hasattr(self, 'detail_table'): self.detail_table.setModel(QStandardItemModel())
         if hasattr(self, 'plot_widget'): self.plot_widget.clear()
-        if hasattr(self, 'detail_plot_widget'): self.detail_plot_widget.clear()
+        self.plot_items = {}  # ('line'|'trend', segment_id) / ('points', rm_type) -> PlotDataItem
+        if hasattr(self, 'detail_plot_widget'): self.detail_orig_item.setData([], []); self.detail_corr_item.setData([], [])
         if hasattr(self, 'auto_optimize_flat_button'): self.auto_optimize_flat_button.setEnabled(False)
         if hasattr(self, 'auto_optimize_zero_button'): self.auto_optimize_zero_button.setEnabled(False)
         if hasattr(self, 'undo_button'): self.undo_button.setEnabled(False)
+        if hasattr(self, 'apply_all_button'): self.apply_all_button.setEnabled(False)
         if hasattr(self, 'stepwise_checkbox'): self.stepwise_checkbox.setChecked(False)
+        if hasattr(self, 'drift_model_combo'): self.sync_drift_model()
 
     def setup_ui(self):
         self.setStyleSheet(global_style)
@@ -642,6 +704,12 @@ class CheckRMFrame(QWidget):
         control_layout.addWidget(self.undo_button)
         self.stepwise_checkbox = QCheckBox("Apply Stepwise Changes")
         control_layout.addWidget(self.stepwise_checkbox)
+        self.drift_model_combo = QComboBox()
+        for key, label in DRIFT_MODELS.items():
+            self.drift_model_combo.addItem(label, key)
+        self.drift_model_combo.setToolTip("Drift model used for the selected element")
+        self.drift_model_combo.currentIndexChanged.connect(self.on_drift_model_changed)
+        control_layout.addWidget(self.drift_model_combo)
         left_layout.addWidget(control_frame)
         optimize_frame = QFrame()
         optimize_layout = QHBoxLayout(optimize_frame)
@@ -653,6 +721,10 @@ class CheckRMFrame(QWidget):
         self.auto_optimize_zero_button.clicked.connect(self.auto_optimize_slope_to_zero)
         self.auto_optimize_zero_button.setEnabled(False)
         optimize_layout.addWidget(self.auto_optimize_zero_button)
+        self.apply_all_button = QPushButton("Apply to All Elements")
+        self.apply_all_button.clicked.connect(self.apply_to_all_elements)
+        self.apply_all_button.setEnabled(False)
+        optimize_layout.addWidget(self.apply_all_button)
         left_layout.addWidget(optimize_frame)
         element_label_layout = QHBoxLayout()
         self.element_combo = QComboBox()
@@ -705,12 +777,36 @@ class CheckRMFrame(QWidget):
         self.detail_plot_widget = pg.PlotWidget()
         self.detail_plot_widget.setLabel('left', 'Value'); self.detail_plot_widget.setLabel('bottom', 'Index')
         self.detail_plot_widget.showGrid(x=True, y=True); self.detail_plot_widget.addLegend(); self.detail_plot_widget.setBackground('w')
+        self.detail_orig_item = self.detail_plot_widget.plot([], [], pen=None, symbol='o', symbolSize=6, symbolPen='b', name='Original')
+        self.detail_corr_item = self.detail_plot_widget.plot([], [], pen=None, symbol='x', symbolPen='r', symbolSize=8, name='Corrected')
         right_layout.addWidget(self.detail_plot_widget, stretch=1)
         content_layout.addWidget(right_frame, stretch=2)
         main_layout.addWidget(content_frame)
         self.update_navigation_buttons()
     def on_empty_rows_received(self, empty_df):
         self.empty_rows_from_check = empty_df.copy()
+    def empty_mask(self, pivot_indices):
+        """True for pivot indices flagged by the empty-row check; the flagged set is rebuilt only when the check result changes."""
+        empty_df = self.empty_rows_from_check
+        if self._empty_cache[0] is not empty_df:
+            if not empty_df.empty and 'original_index' in empty_df.columns:
+                flagged = np.unique(empty_df['original_index'].dropna().astype(int).to_numpy())
+            else:
+                flagged = np.array([], dtype=int)
+            self._empty_cache = (empty_df, flagged)
+        return np.isin(np.asarray(pivot_indices), self._empty_cache[1])
+    def segment_codes(self, pivot_indices):
+        """Position in self.segments of each pivot index, -1 for pivots outside every segment."""
+        if self._segment_cache[0] is not self.segments:
+            pivots = [seg['positions']['pivot_index'].to_numpy() for seg in self.segments]
+            all_pivots = np.concatenate(pivots) if pivots else np.array([], dtype=int)
+            codes = np.repeat(np.arange(len(pivots)), [len(p) for p in pivots])
+            index = pd.Index(all_pivots)
+            first = ~index.duplicated()
+            self._segment_cache = (self.segments, index[first], codes[first])
+        _, index, codes = self._segment_cache
+        found = index.get_indexer(np.asarray(pivot_indices))
+        return np.where(found >= 0, codes[found], -1)
     def update_navigation_buttons(self):
         self.prev_btn.setEnabled(self.current_nav_index > 0)
         self.next_btn.setEnabled(self.current_nav_index < len(self.navigation_list) - 1)
@@ -721,6 +817,17 @@ class CheckRMFrame(QWidget):
         self.label_label.setText(f"Current RM: {self.current_rm_num if self.current_rm_num is not None else 'None'}")
         if self.element_combo.count() > 0:
             self.element_combo.blockSignals(True); self.element_combo.setCurrentText(self.selected_element or ''); self.element_combo.blockSignals(False)
+        self.sync_drift_model()
+    def sync_drift_model(self):
+        """Show the drift model of the selected element; stepwise only applies to per-interval ratios."""
+        model = self.drift_models.get(self.selected_element, 'interval')
+        self.drift_model_combo.blockSignals(True); self.drift_model_combo.setCurrentIndex(max(self.drift_model_combo.findData(model), 0)); self.drift_model_combo.blockSignals(False)
+        self.stepwise_checkbox.setEnabled(model == 'interval')
+    def on_drift_model_changed(self, index):
+        model = self.drift_model_combo.itemData(index)
+        if self.selected_element:
+            self.drift_models[self.selected_element] = model
+        self.stepwise_checkbox.setEnabled(model == 'interval')
     def has_changes(self):
         return len(self.original_rm_values) > 0 and not np.array_equal(self.original_rm_values, self.display_rm_values)
     def prompt_apply_changes(self):
@@ -750,6 +857,7 @@ class CheckRMFrame(QWidget):
                     self.current_nav_index = idx
                     break
             self.selected_row = -1
+            self.sync_drift_model()
             self.update_displays(); self.update_navigation_buttons()
     def update_displays(self):
         if self.current_rm_num is not None and self.selected_element:
@@ -788,18 +896,14 @@ class CheckRMFrame(QWidget):
             self.element_combo.addItems(self.elements)
             self.update_labels(); self.update_displays()
             self.auto_optimize_flat_button.setEnabled(True); self.auto_optimize_zero_button.setEnabled(True)
-        std_data = self.original_df[self.original_df['Type'] == 'Std'].copy(deep=True)
-        updated_df = pd.concat([self.corrected_df, std_data], ignore_index=True)
-        self.app.set_data(updated_df, for_results=True)
+            self.apply_all_button.setEnabled(True)
+        self.publish_corrected_df()
         self.save_corrected_drift()
-        self.data_changed.emit(); self.update_navigation_buttons()
+        self.update_navigation_buttons()
     def on_check_rm_error(self, message):
         self.progress_dialog.close()
         QMessageBox.critical(self, "Error", message)
     def display_rm_table(self):
-        model = QStandardItemModel()
-        model.setHorizontalHeaderLabels(["RM Label", "Next RM", "Type", "Original Value", "Current Value", "Ratio"])
-       
         label_df = self.rm_df[self.rm_df['rm_num'] == self.current_rm_num].sort_values('pivot_index')
         initial_label_df = self.initial_rm_df[self.initial_rm_df['rm_num'] == self.current_rm_num].sort_values('pivot_index')
        
@@ -814,81 +918,41 @@ class CheckRMFrame(QWidget):
         # استفاده از rm_type از rm_df
         self.rm_types = label_df.loc[label_df.index.isin(label_df.index[valid_mask]), 'rm_type'].values
         self.solution_labels_for_group = label_df.loc[label_df.index.isin(label_df.index[valid_mask]), 'Solution Label'].values
-        empty_pivot_set = set(self.empty_rows_from_check['original_index'].dropna().astype(int).tolist()) if not self.empty_rows_from_check.empty and 'original_index' in self.empty_rows_from_check.columns else set()
-        is_empty = np.array([p in empty_pivot_set for p in self.current_valid_pivot_indices], dtype=bool)
-        blue_pivot_indices = self.current_valid_pivot_indices[~is_empty]
-        blue_index_to_pos = {idx: i for i, idx in enumerate(blue_pivot_indices)}
-        if len(self.display_rm_values) == 0:
-            model.appendRow([QStandardItem("No Data")] * 6)
+        is_empty = self.empty_mask(self.current_valid_pivot_indices)
+        n = len(self.display_rm_values)
+        if n == 0:
+            columns = [ArrayColumn(header, ["No Data"]) for header in RM_TABLE_HEADERS]
+            model = ArrayTableModel(columns)
         else:
-            for i in range(len(self.display_rm_values)):
-                current_rm_label = f"{self.solution_labels_for_group[i]}-{self.current_valid_pivot_indices[i]}"
-                next_rm_label = "N/A"
-                if not is_empty[i]:
-                    pos = blue_index_to_pos.get(self.current_valid_pivot_indices[i])
-                    if pos is not None and pos < len(blue_pivot_indices) - 1:
-                        next_rm_label = f"{self.solution_labels_for_group[pos + 1]}-{blue_pivot_indices[pos + 1]}"
-                orig_val = self.original_rm_values[i]
-                curr_val = self.display_rm_values[i]
-                ratio = curr_val / orig_val if orig_val != 0 else np.nan
-                rm_type = self.rm_types[i]
-                row_items = [
-                    QStandardItem(current_rm_label),
-                    QStandardItem(next_rm_label),
-                    QStandardItem(rm_type),
-                    QStandardItem(f"{orig_val:.3f}"),
-                    QStandardItem(f"{curr_val:.3f}"),
-                    QStandardItem(f"{ratio:.3f}" if pd.notna(ratio) else "N/A")
-                ]
-                # رنگ‌آمیزی
-                if is_empty[i]:
-                    for item in row_items:
-                        item.setBackground(Qt.GlobalColor.red)
-                        item.setForeground(Qt.GlobalColor.white)
-                        item.setEditable(False)
-                else:
-                    row_items[2].setEditable(False) # نوع قابل ویرایش نیست
-                    for j in [0, 1, 3, 4, 5]: row_items[j].setEditable(False)
-                    # رنگ بر اساس نوع
-                    color_map = {
-                        'Base': '#2E7D32',
-                        'Check': '#FF6B00',
-                        'Cone': '#7B1FA2'
-                    }
-                    color = QColor(color_map.get(rm_type, '#000000'))
-                    row_items[2].setForeground(color)
-                    row_items[2].setFont(QFont("Segoe UI", 9, QFont.Weight.Bold))
-                model.appendRow(row_items)
-       
+            current_labels = (pd.Series(self.solution_labels_for_group).astype(str) + "-" + pd.Series(self.current_valid_pivot_indices).astype(str)).to_numpy(dtype=object)
+            # Each non-empty RM points to the next non-empty RM of the group
+            next_labels = np.full(n, "N/A", dtype=object)
+            blue_positions = np.flatnonzero(~is_empty)
+            next_labels[blue_positions[:-1]] = current_labels[blue_positions[1:]]
+            type_font = QFont("Segoe UI", 9, QFont.Weight.Bold)
+            # رنگ بر اساس نوع
+            type_styles = {rm_type: {'foreground': QColor(color)} for rm_type, color in RM_TYPE_COLORS.items()}
+            row_styles = {'empty': {'background': QColor(Qt.GlobalColor.red), 'foreground': QColor(Qt.GlobalColor.white), 'font': QFont()}}
+            columns = [
+                ArrayColumn("RM Label", current_labels),
+                ArrayColumn("Next RM", next_labels),
+                ArrayColumn("Type", self.rm_types, foreground=QColor('#000000'), font=type_font,
+                            tags=self.rm_types, tag_styles=type_styles),
+                ArrayColumn("Original Value", self.original_rm_values, decimals=3),
+                ArrayColumn("Current Value", self.display_rm_values, decimals=3),
+                ArrayColumn("Ratio", self._rm_ratios(), decimals=3, missing_text="N/A"),
+            ]
+            row_tags = np.where(is_empty, 'empty', '')
+            model = ArrayTableModel(columns, row_tags=row_tags, row_styles=row_styles)
+
         self.rm_table.setModel(model)
-        try: model.itemChanged.disconnect()
-        except: pass
-        model.itemChanged.connect(self.on_rm_value_changed)
         self.update_slope_from_data()
         if 0 <= self.selected_row < len(self.current_valid_pivot_indices):
             self.rm_table.selectRow(self.selected_row)
-    def on_rm_value_changed(self, item):
-        row = item.row()
-        try:
-            if item.column() == 3:
-                val = float(item.text())
-                self.display_rm_values[row] = val
-            elif item.column() == 4:
-                ratio = float(item.text())
-                val = self.original_rm_values[row] * ratio
-                self.display_rm_values[row] = val
-                self.rm_table.model().item(row, 3).setText(f"{val:.3f}")
-            self.selected_row = row
-            self.update_rm_data()
-            self.update_plot(); self.update_rm_table_ratios(); self.update_slope_from_data()
-            self.update_detail_plot(); self.update_detail_table()
-        except ValueError as e:
-            QMessageBox.warning(self, "Invalid Value", str(e))
-            if item.column() == 3:
-                item.setText(f"{self.display_rm_values[row]:.3f}")
-            elif item.column() == 4:
-                ratio = self.display_rm_values[row] / self.original_rm_values[row] if self.original_rm_values[row] != 0 else np.nan
-                item.setText(f"{ratio:.3f}" if pd.notna(ratio) else "N/A")
+    def _rm_ratios(self):
+        ratios = np.full(len(self.display_rm_values), np.nan)
+        np.divide(self.display_rm_values, self.original_rm_values, out=ratios, where=self.original_rm_values != 0)
+        return ratios
     def on_table_row_clicked(self, index):
         self.selected_row = index.row()
         self.update_detail_plot(); self.update_detail_table()
@@ -906,92 +970,79 @@ class CheckRMFrame(QWidget):
                 self.corrected_df.loc[cond, 'Corr Con'] = valid_display_values[i]
     def update_rm_table_ratios(self):
         model = self.rm_table.model()
-        for i in range(model.rowCount()):
-            if i < len(self.original_rm_values):
-                ratio = self.display_rm_values[i] / self.original_rm_values[i] if self.original_rm_values[i] != 0 else np.nan
-                model.item(i, 4).setText(f"{ratio:.3f}" if pd.notna(ratio) else "N/A")
+        if not isinstance(model, ArrayTableModel) or model.rowCount() != len(self.display_rm_values):
+            return
+        model.set_column_values(4, self.display_rm_values.copy())
+        model.set_column_values(5, self._rm_ratios())
     def update_slope_from_data(self):
         if len(self.display_rm_values) >= 2:
             x = np.arange(len(self.display_rm_values))
             valid_mask = ~np.isnan(self.display_rm_values)
             x_valid = x[valid_mask]; y_valid = self.display_rm_values[valid_mask]
             pivot_valid = np.array(self.current_valid_pivot_indices)[valid_mask]
-            empty_set = set(self.empty_rows_from_check['original_index'].dropna().astype(int).tolist()) if not self.empty_rows_from_check.empty else set()
-            is_empty = np.array([p in empty_set for p in pivot_valid], dtype=bool)
-            normal_mask = ~is_empty
+            normal_mask = ~self.empty_mask(pivot_valid)
             if np.sum(normal_mask) >= 2:
-                self.current_slope = np.polyfit(x_valid[normal_mask], y_valid[normal_mask], 1)[0]
+                slope, _ = linear_fits(x_valid[normal_mask], y_valid[normal_mask], np.zeros(np.sum(normal_mask), dtype=np.int64), 1)
+                self.current_slope = float(slope[0])
             else:
                 self.current_slope = 0.0
         else:
             self.current_slope = 0.0
         self.slope_spinbox.blockSignals(True); self.slope_spinbox.setValue(self.current_slope); self.slope_spinbox.blockSignals(False)
         self.slope_label.setText(f"Current Slope: {self.current_slope:.3f}")
+    def plot_item(self, key, **style):
+        """Persistent PlotDataItem of the RM plot for key, created (and added to the legend) on first use."""
+        item = self.plot_items.get(key)
+        if item is None:
+            item = self.plot_items[key] = self.plot_widget.plot([], [], **style)
+        return item
     def update_plot(self):
-        self.plot_widget.clear()
-        if len(self.display_rm_values) == 0: return
+        """Refresh the RM plot by feeding new arrays to its persistent items; nothing is recreated."""
+        # خط‌های بخش‌هایی که دیگر وجود ندارند (اجرای جدید) حذف می‌شوند
+        segment_ids = {seg['segment_id'] for seg in self.segments}
+        for key in [key for key in self.plot_items if key[0] in ('line', 'trend') and key[1] not in segment_ids]:
+            self.plot_widget.removeItem(self.plot_items.pop(key))
+        if len(self.display_rm_values) == 0:
+            for item in self.plot_items.values(): item.setData([], [])
+            return
         x = np.arange(len(self.display_rm_values))
         valid_mask = ~np.isnan(self.display_rm_values)
         x_valid = x[valid_mask]
         y_valid = self.display_rm_values[valid_mask]
         pivot_valid = np.array(self.current_valid_pivot_indices)[valid_mask]
         types_valid = self.rm_types[valid_mask]
-        empty_set = set(self.empty_rows_from_check['original_index'].dropna().astype(int).tolist()) if not self.empty_rows_from_check.empty else set()
-        is_empty = np.array([p in empty_set for p in pivot_valid], dtype=bool)
+        is_empty = self.empty_mask(pivot_valid)
         normal_mask = ~is_empty
+        seg_codes = self.segment_codes(pivot_valid)
+        fit_mask = normal_mask & (seg_codes >= 0)
+        slopes, intercepts = linear_fits(x_valid[fit_mask], y_valid[fit_mask], seg_codes[fit_mask], len(self.segments))
 
-        # تنظیمات رنگ و شکل
-        symbol_map = {'Base': 'o', 'Check': 't', 'Cone': 's', 'Missing': 'o'}
-        color_map = {'Base': '#2E7D32', 'Check': '#FF6B00', 'Cone': '#7B1FA2', 'Missing': 'r'}
-
-        legend_added = {'Base': False, 'Check': False, 'Cone': False, 'Missing': False}
-
-        # 1. اول خط سبز رو بکش (به همه نقاط غیر قرمز)
+        # 1. خط هر بخش و خط روند آن (به همه نقاط غیر قرمز)
         line_colors = ['#43A047', '#FF6B00', '#7B1FA2', '#1A3C34']  # رنگ‌های مختلف برای بخش‌ها
-        for seg in self.segments:
-            seg_positions = seg['positions']
-            seg_pivot = seg_positions['pivot_index'].values
-            seg_mask = np.isin(pivot_valid, seg_pivot) & normal_mask
-            if np.any(seg_mask):
-                x_n = x_valid[seg_mask]
-                y_n = y_valid[seg_mask]
-                color_idx = seg['segment_id'] % len(line_colors)
-                self.plot_widget.plot(
-                    x_n, y_n,
-                    pen=pg.mkPen(line_colors[color_idx], width=2.5),
-                    name=f'Segment {seg["segment_id"]} Line'
-                )
+        for code, seg in enumerate(self.segments):
+            seg_id = seg['segment_id']
+            color = line_colors[seg_id % len(line_colors)]
+            seg_mask = fit_mask & (seg_codes == code)
+            x_n = x_valid[seg_mask]
+            line = self.plot_item(('line', seg_id), pen=pg.mkPen(color, width=2.5), name=f'Segment {seg_id} Line')
+            line.setData(x_n, y_valid[seg_mask])
+            trend = self.plot_item(('trend', seg_id), pen=pg.mkPen(color, width=2, style=Qt.PenStyle.DashLine),
+                                   name=f'Segment {seg_id} Trendline')
+            if len(x_n) >= 2:
+                trend.setData(x_n, slopes[code] * x_n + intercepts[code])
+            else:
+                trend.setData([], [])
 
-                # خط روند (اختیاری)
-                if len(x_n) >= 2:
-                    z = np.polyfit(x_n, y_n, 1)
-                    p = np.poly1d(z)
-                    self.plot_widget.plot(
-                        x_n, p(x_n),
-                        pen=pg.mkPen(line_colors[color_idx], width=2, style=Qt.PenStyle.DashLine),
-                        name=f'Segment {seg["segment_id"]} Trendline'
-                    )
-
-        # 2. بعد نقاط رو روی خط بذار
-        for i in range(len(x_valid)):
-            rm_type = 'Missing' if is_empty[i] else types_valid[i]
-            symbol = symbol_map[rm_type]
-            color = color_map[rm_type]
-            size = 14 if rm_type == 'Missing' else 11
-
-            name = rm_type if not legend_added[rm_type] else None
-            if name:
-                legend_added[rm_type] = True
-
-            self.plot_widget.plot(
-                [x_valid[i]], [y_valid[i]],
-                pen=None,
-                symbol=symbol,
-                symbolSize=size,
-                symbolBrush=color,
-                symbolPen=pg.mkPen('w', width=1.5),
-                name=name
-            )
+        # 2. نقاط روی خط: یک آیتم برای هر نوع RM
+        point_types = np.where(is_empty, 'Missing', types_valid.astype(object))
+        for rm_type, (symbol, color) in RM_PLOT_MARKERS.items():
+            hits = point_types == rm_type
+            if not hits.any() and ('points', rm_type) not in self.plot_items:
+                continue
+            points = self.plot_item(('points', rm_type), pen=None, symbol=symbol, symbolSize=14 if rm_type == 'Missing' else 11,
+                                    symbolBrush=color, symbolPen=pg.mkPen('w', width=1.5), name=rm_type)
+            points.setZValue(10)
+            points.setData(x_valid[hits], y_valid[hits])
 
         self.plot_widget.setXRange(-0.5, len(x_valid) - 0.5)
         self.plot_widget.autoRange()
@@ -1009,33 +1060,30 @@ class CheckRMFrame(QWidget):
     def calculate_corrected_values(self, original_values, current_ratio):
         n = len(original_values)
         if n == 0: return np.array([])
-        delta = current_ratio - 1.0
-        step_delta = delta / n if n > 0 else 0.0
-        stepwise = self.stepwise_checkbox.isChecked()
-        return original_values * np.array([1.0 + step_delta * (j + 1) if stepwise else current_ratio for j in range(n)])
+        return original_values * drift_factors([current_ratio], np.zeros(n, dtype=np.int64), self.stepwise_checkbox.isChecked())
     def update_detail_plot(self):
-        self.detail_plot_widget.clear()
         data = self.get_data_between_rm()
-        if data.empty: return
+        if data.empty:
+            self.detail_orig_item.setData([], []); self.detail_corr_item.setData([], [])
+            return
         x = data['original_index'].values; orig = data[self.selected_element].values
         ratio = self.display_rm_values[self.selected_row + 1] / self.original_rm_values[self.selected_row + 1] if self.original_rm_values[self.selected_row + 1] != 0 else 1.0
         corr = self.calculate_corrected_values(orig, ratio)
-        self.detail_plot_widget.plot(x, orig, pen=None, symbol='o', symbolSize=6, symbolPen='b', name='Original')
-        self.detail_plot_widget.plot(x, corr, pen=None, symbol='x', symbolPen='r', symbolSize=8, name='Corrected')
+        self.detail_orig_item.setData(x, orig); self.detail_corr_item.setData(x, corr)
         self.detail_plot_widget.setXRange(min(x)-0.5, max(x)+0.5); self.detail_plot_widget.autoRange()
     def update_detail_table(self):
-        model = QStandardItemModel()
-        model.setHorizontalHeaderLabels(["Solution Label", "Original Value", "Corrected Value"])
         data = self.get_data_between_rm()
         if data.empty:
-            self.detail_table.setModel(model)
+            self.detail_table.setModel(ArrayTableModel([ArrayColumn(header, []) for header in ["Solution Label", "Original Value", "Corrected Value"]]))
             return
         orig = data[self.selected_element].values
         ratio = self.display_rm_values[self.selected_row + 1] / self.original_rm_values[self.selected_row + 1] if self.original_rm_values[self.selected_row + 1] != 0 else 1.0
         corr = self.calculate_corrected_values(orig, ratio)
-        for i, row in data.iterrows():
-            model.appendRow([QStandardItem(row['Solution Label']), QStandardItem(f"{orig[i]:.3f}"), QStandardItem(f"{corr[i]:.3f}")])
-        self.detail_table.setModel(model)
+        self.detail_table.setModel(ArrayTableModel([
+            ArrayColumn("Solution Label", data['Solution Label'].values),
+            ArrayColumn("Original Value", orig, decimals=3),
+            ArrayColumn("Corrected Value", corr, decimals=3),
+        ]))
     def update_slope(self, value):
         if len(self.display_rm_values) >= 2:
             delta = value - self.current_slope
@@ -1051,34 +1099,27 @@ class CheckRMFrame(QWidget):
         self.display_rm_values = self.original_rm_values.copy()
         self.update_rm_data(); self.update_plot(); self.update_rm_table_ratios(); self.update_slope_from_data()
         self.update_detail_plot(); self.update_detail_table()
-        model = self.rm_table.model()
-        for i in range(model.rowCount()):
-            if i < len(self.display_rm_values):
-                model.item(i, 3).setText(f"{self.display_rm_values[i]:.3f}")
         QMessageBox.information(self, "Info", "Reset to original values.")
+    def rm_segment_layout(self):
+        """Per rm_df row: segment position (-1 outside all segments), x position inside its segment,
+        the element's values and the mask of non-empty, non-NaN points used for fitting."""
+        seg_codes = self.segment_codes(self.rm_df['pivot_index'].to_numpy())
+        x = pd.Series(seg_codes).groupby(seg_codes).cumcount().to_numpy(dtype=float)
+        y = pd.to_numeric(self.rm_df[self.selected_element], errors='coerce').to_numpy(dtype=float)
+        normal = (seg_codes >= 0) & ~self.empty_mask(self.rm_df['pivot_index'].to_numpy()) & ~np.isnan(y)
+        return seg_codes, x, y, normal
     def auto_optimize_to_flat(self):
         if len(self.display_rm_values) == 0:
             return
-        empty_set = set(self.empty_rows_from_check['original_index'].dropna().astype(int).tolist()) if not self.empty_rows_from_check.empty else set()
-        optimized = False
-        for seg in self.segments:
-            seg_positions = seg['positions']
-            seg_pivot = seg_positions['pivot_index'].values
-            mask = self.rm_df['pivot_index'].isin(seg_pivot)
-            if not mask.any():
-                continue
-            y_seg = self.rm_df.loc[mask, self.selected_element].astype(float).values
-            pivot_seg = self.rm_df.loc[mask, 'pivot_index'].values
-            is_empty_seg = np.array([p in empty_set for p in pivot_seg])
-            normal_mask_seg = ~is_empty_seg & ~np.isnan(y_seg)
-            if normal_mask_seg.sum() == 0:
-                continue
-            first_idx = np.where(normal_mask_seg)[0][0]
-            first_val = y_seg[first_idx]
-            y_seg[normal_mask_seg] = first_val
-            self.rm_df.loc[mask, self.selected_element] = y_seg
-            optimized = True
-        if optimized:
+        seg_codes, x, y, normal = self.rm_segment_layout()
+        if normal.any():
+            # اولین نقطه معتبر هر بخش به‌عنوان مرجع
+            normal_rows = np.flatnonzero(normal)
+            codes, first = np.unique(seg_codes[normal_rows], return_index=True)
+            reference = np.full(len(self.segments), np.nan)
+            reference[codes] = y[normal_rows[first]]
+            y[normal_rows] = reference[seg_codes[normal_rows]]
+            self.rm_df[self.selected_element] = y
             self.update_displays()
             self.update_slope_from_data()
             QMessageBox.information(self, "Info", "All segments optimized to flat relative to their first valid RM point.")
@@ -1087,32 +1128,15 @@ class CheckRMFrame(QWidget):
     def auto_optimize_slope_to_zero(self):
         if len(self.display_rm_values) < 2:
             return
-        empty_set = set(self.empty_rows_from_check['original_index'].dropna().astype(int).tolist()) if not self.empty_rows_from_check.empty else set()
-        optimized = False
-        for seg in self.segments:
-            seg_positions = seg['positions']
-            seg_pivot = seg_positions['pivot_index'].values
-            mask = self.rm_df['pivot_index'].isin(seg_pivot)
-            if not mask.any():
-                continue
-            y_seg = self.rm_df.loc[mask, self.selected_element].astype(float).values
-            pivot_seg = self.rm_df.loc[mask, 'pivot_index'].values
-            is_empty_seg = np.array([p in empty_set for p in pivot_seg])
-            normal_mask_seg = ~is_empty_seg & ~np.isnan(y_seg)
-            if normal_mask_seg.sum() < 2:
-                continue
-            x_seg = np.arange(len(y_seg))
-            x_n = x_seg[normal_mask_seg]
-            y_n = y_seg[normal_mask_seg].copy()
-            for _ in range(10):
-                slope = np.polyfit(x_n, y_n, 1)[0]
-                if abs(slope) < 1e-6:
-                    break
-                y_n -= slope * x_n
-            y_seg[normal_mask_seg] = y_n
-            self.rm_df.loc[mask, self.selected_element] = y_seg
-            optimized = True
-        if optimized:
+        seg_codes, x, y, normal = self.rm_segment_layout()
+        counts = np.bincount(seg_codes[normal], minlength=len(self.segments))
+        fitted = normal.copy()
+        fitted[normal] = counts[seg_codes[normal]] >= 2
+        if fitted.any():
+            # کم کردن شیب رگرسیون هر بخش در یک مرحله (پس از آن شیب صفر است)
+            slopes, _ = linear_fits(x[fitted], y[fitted], seg_codes[fitted], len(self.segments))
+            y[fitted] -= slopes[seg_codes[fitted]] * x[fitted]
+            self.rm_df[self.selected_element] = y
             self.update_displays()
             self.update_slope_from_data()
             QMessageBox.information(self, "Info", "Slope optimized to zero in all segments relative to their first valid RM point.")
@@ -1124,23 +1148,61 @@ class CheckRMFrame(QWidget):
             return
         self.progress_dialog = QProgressDialog("Applying corrections...", "Cancel", 0, 100, self)
         self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
-        self.thread = ApplySingleRMThread(self.app, self.keyword, self.selected_element, self.current_rm_num, self.rm_df, self.initial_rm_df, self.segments, self.corrected_df, self.stepwise_checkbox.isChecked())
+        self.thread = ApplySingleRMThread(self.app, self.keyword, self.selected_element, self.current_rm_num, self.rm_df, self.initial_rm_df, self.segments, self.corrected_df, self.stepwise_checkbox.isChecked(), self.drift_models)
         self.thread.progress.connect(self.progress_dialog.setValue)
         self.thread.finished.connect(self.on_apply_single_finished)
         self.thread.error.connect(self.on_apply_single_error)
         self.thread.start()
-    def on_apply_single_finished(self, results):
-        self.progress_dialog.close()
-        self.undo_stack.append((self.corrected_df.copy(deep=True), self.rm_df.copy(deep=True), self.corrected_drift.copy()))
-        self.undo_button.setEnabled(True)
-        self.corrected_df = results['corrected_df']
-        self.rm_df = results['rm_df']
-        self.corrected_drift.update(results['corrected_drift'])
+    def changed_elements(self):
+        """Elements whose RM values differ from the values found by Check RM."""
+        changed = []
+        for element in self.elements:
+            current = pd.to_numeric(self.rm_df[element], errors='coerce').to_numpy(dtype=float)
+            initial = pd.to_numeric(self.initial_rm_df[element], errors='coerce').to_numpy(dtype=float)
+            if len(current) != len(initial) or not np.allclose(current, initial, equal_nan=True):
+                changed.append(element)
+        return changed
+    def apply_to_all_elements(self):
+        if self.rm_df is None or self.initial_rm_df is None:
+            QMessageBox.critical(self, "Error", "Run Check RM Changes first.")
+            return
+        elements = self.changed_elements()
+        if not elements:
+            QMessageBox.warning(self, "Warning", "No RM changes to apply.")
+            return
+        self.progress_dialog = QProgressDialog(f"Applying corrections to {len(elements)} elements...", "Cancel", 0, 100, self)
+        self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        self.thread = ApplySingleRMThread(self.app, self.keyword, elements, self.current_rm_num, self.rm_df, self.initial_rm_df, self.segments, self.corrected_df, self.stepwise_checkbox.isChecked(), self.drift_models)
+        self.thread.progress.connect(self.progress_dialog.setValue)
+        self.thread.finished.connect(self.on_apply_single_finished)
+        self.thread.error.connect(self.on_apply_single_error)
+        self.thread.start()
+    def publish_corrected_df(self):
+        """Hand corrected_df plus the Std rows to the app; corrected_df's rows then lead the app data in order."""
         std_data = self.original_df[self.original_df['Type'] == 'Std'].copy(deep=True)
         updated_df = pd.concat([self.corrected_df, std_data], ignore_index=True)
         self.app.set_data(updated_df, for_results=True)
+        self.published_generation = self.app.data_generation
+    def on_apply_single_finished(self, results):
+        self.progress_dialog.close()
+        rows, values = results['patch']['Corr Con']
+        if self.published_generation != self.app.data_generation:
+            # داده برنامه بعد از Check RM جایگزین شده؛ دوباره منتشر شود تا شماره ردیف‌ها یکی باشد
+            self.publish_corrected_df()
+        # جدول RM هم در همان ورودی undo ذخیره می‌شود تا با نمونه‌ها برگردد
+        changes = {'corrected_df': CellChanges.capture(self.corrected_df, rows, ['Corr Con']),
+                   'rm_df': CellChanges.capture(self.rm_df, np.arange(len(self.rm_df)), results['elements'])}
+        try:
+            self.app.begin_corrections().assign(rows, 'Corr Con', values)
+            self.app.commit_corrections(changes, on_undo=partial(self.on_correction_undone, self.corrected_drift.copy()))
+        except Exception as e:
+            self.app.discard_corrections()
+            logger.error(f"Error applying drift correction: {str(e)}", exc_info=True)
+            QMessageBox.critical(self, "Error", str(e))
+            return
+        apply_values(self.corrected_df, rows, {'Corr Con': values})
+        self.corrected_drift.update(results['corrected_drift'])
         self.save_corrected_drift()
-        self.data_changed.emit(); self.app.notify_data_changed()
         self.update_displays()
         QMessageBox.information(self, "Success", "Corrections applied.")
     def on_apply_single_error(self, message):
@@ -1159,20 +1221,20 @@ class CheckRMFrame(QWidget):
         except Exception as e:
             logger.error(f"Error saving corrected_drift: {str(e)}")
     def undo_correction(self):
-        if self.undo_stack:
-            self.corrected_df, self.rm_df, self.corrected_drift = self.undo_stack.pop()
-            std_data = self.original_df[self.original_df['Type'] == 'Std'].copy(deep=True)
-            updated_df = pd.concat([self.corrected_df, std_data], ignore_index=True)
-            self.app.set_data(updated_df, for_results=True)
-            self.save_corrected_drift()
-            self.data_changed.emit(); self.app.notify_data_changed()
-            self.update_displays()
-            self.undo_button.setEnabled(bool(self.undo_stack))
+        """Undo the app's last correction batch, which may come from the weight, volume or DF tab too."""
+        try:
+            undone = self.app.undo_corrections()
+        except ValueError as e:
+            logger.error(f"Undo failed: {str(e)}")
+            QMessageBox.warning(self, "Warning", "Data changed since the last correction; it cannot be undone.")
+            return
+        if undone:
             QMessageBox.information(self, "Success", "Last correction undone.")
-            try:
-                self.app.results.reset_cache()
-                self.app.results.show_processed_data()
-            except Exception as e:
-                logger.error(f"Error updating results: {str(e)}")
         else:
-            QMessageBox.warning(self, "Warning", "No corrections to undo.")
\ No newline at end of file
+            QMessageBox.warning(self, "Warning", "No corrections to undo.")
+    def on_correction_undone(self, corrected_drift, changes):
+        changes['corrected_df'].restore(self.corrected_df)
+        changes['rm_df'].restore(self.rm_df)
+        self.corrected_drift = corrected_drift
+        self.save_corrected_drift()
+        self.update_displays()
\ No newline at end of file
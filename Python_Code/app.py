@@ -3,7 +3,7 @@ import sys
 import os
 import logging
 from PyQt6.QtWidgets import (
-    QApplication, QMainWindow, QLabel, QTabWidget
+    QApplication, QMainWindow, QLabel
 )
 from PyQt6.QtCore import Qt
 
@@ -12,7 +12,10 @@ from screens.calibration_tab import ElementsTab
 from screens.pivot.pivot_tab import PivotTab
 from screens.CRM import CRMTab
 from utils.load_file import load_excel, load_additional
-from screens.process.result import ResultsFrame
+from utils.sample_correction import CorrectionTransaction
+from utils.undo_journal import UndoJournal
+from utils.change_bus import ChangeBus
+from screens.process.result import ResultsFrame, PIVOT_SOURCE_COLUMNS
 from screens.process.RM_check import CheckRMFrame
 from screens.process.weight_check import WeightCheckFrame
 from screens.process.volume_check import VolumeCheckFrame
@@ -47,6 +50,10 @@ class MainWindow(QMainWindow):
         self.data = None
         self.file_path = None
         self.file_path_label = QLabel("File Path: No file selected")
+        self.correction_journal = UndoJournal()
+        self.pending_corrections = None
+        self.data_generation = 0  # با هر جایگزینی self.data یکی زیاد می‌شود
+        self.change_bus = ChangeBus(self)
 
         # تب‌ها
         self.pivot_tab = PivotTab(self, self)
@@ -62,11 +69,12 @@ class MainWindow(QMainWindow):
         self.crm_check = CrmCheck(self, self.results)
         self.report = ReportTab(self, self.results)
 
+        # تب‌هایی که به تغییر داده واکنش نشان می‌دهند فقط وقتی دیده شوند دوباره محاسبه می‌کنند
+        self.change_bus.subscribe(self.results, self.results.on_data_change)
+        self.change_bus.subscribe(self.crm_check, self.on_crm_check_changed)
+        self.change_bus.subscribe(self.empty_check, self.empty_check.on_data_change)
+
         # اتصالات سیگنال
-        self.weight_check.data_changed.connect(self.results.data_changed)
-        self.volume_check.data_changed.connect(self.results.data_changed)
-        self.df_check.data_changed.connect(self.results.data_changed)
-        self.rm_check.data_changed.connect(self.results.data_changed)
         self.empty_check.empty_rows_found.connect(self.rm_check.on_empty_rows_received)
 
         # تعریف تب‌ها با دکمه‌های جدید + Logout
@@ -118,6 +126,9 @@ class MainWindow(QMainWindow):
     def reset_app_state(self):
         logger.debug("Resetting application state")
         self.data = None
+        self.correction_journal.clear()
+        self.pending_corrections = None
+        self.change_bus.clear()
         self.file_path = None
         self.file_path_label.setText("File Path: No file selected")
         self.setWindowTitle(f"RASF Data Processor - {self.user_name}")
@@ -130,6 +141,7 @@ class MainWindow(QMainWindow):
             obj = getattr(self, attr, None)
             if obj and hasattr(obj, 'reset_state'):
                 obj.reset_state()
+        self.update_undo_buttons()
 
     def handle_excel(self):
         self.reset_app_state()
@@ -206,17 +218,92 @@ class MainWindow(QMainWindow):
         if not isinstance(df, pd.DataFrame):
             return
         self.data = df.copy(deep=True)
+        # اصلاحات قبلی در journal می‌مانند ولی دیگر روی این داده undo نمی‌شوند
+        self.data_generation += 1
+        self.update_undo_buttons()
         if for_results:
             self.notify_data_changed()
 
-    def notify_data_changed(self):
-        for i in range(self.main_content.tabs.count()):
-            tab = self.main_content.tabs.widget(i)
-            if isinstance(tab, QTabWidget):
-                for j in range(tab.count()):
-                    sub = tab.widget(j)
-                    if hasattr(sub, 'data_changed'):
-                        sub.data_changed()
+    def begin_corrections(self):
+        """The open correction batch on the current data, started on first use.
+
+        Weight, volume, DF and drift fixes all queue their steps on it; commit_corrections() then
+        writes everything queued in one pass.
+        """
+        if self.data is None:
+            return None
+        if self.pending_corrections is None or self.pending_corrections.df is not self.data:
+            self.pending_corrections = CorrectionTransaction(self.data)
+        return self.pending_corrections
+
+    def discard_corrections(self):
+        """Drop the steps queued since the last commit."""
+        self.pending_corrections = None
+
+    def commit_corrections(self, changes=None, on_undo=None):
+        """Commit the open batch: one pass over the data, one undo entry and one change notification.
+
+        `changes` holds CellChanges of a tab's own frames, kept in the same undo entry. Whichever tab
+        undoes the batch, on_undo(changes) is called afterwards so the tab that queued it can restore
+        them and refresh.
+        """
+        transaction, self.pending_corrections = self.pending_corrections, None
+        if transaction is None:
+            return 0
+        data_changes, corrected_rows = transaction.commit()
+        entry = dict(changes or {}, data=data_changes)
+        self.correction_journal.push(entry, payload=(self.data_generation, on_undo))
+        self.update_undo_buttons()
+        self.notify_changed_cells(data_changes)
+        logger.debug(f"Committed correction batch: {corrected_rows} rows")
+        return corrected_rows
+
+    def undo_corrections(self):
+        """Revert the last committed batch; False when there is nothing to undo.
+
+        Raises ValueError when the data has been replaced since that batch; the journal is then
+        emptied, since every older batch is in the same situation.
+        """
+        entry = self.correction_journal.pop()
+        self.update_undo_buttons()
+        if entry is None:
+            return False
+        changes, (generation, on_undo) = entry
+        if generation != self.data_generation:
+            self.correction_journal.clear()
+            self.update_undo_buttons()
+            raise ValueError("Data was replaced after this correction")
+        changes['data'].restore(self.data)
+        if on_undo is not None:
+            on_undo(changes)
+        self.notify_changed_cells(changes['data'])
+        return True
+
+    def update_undo_buttons(self):
+        """Enable the undo buttons of the correction tabs only while the latest batch can be undone on the current data."""
+        entry = self.correction_journal.peek()
+        enabled = entry is not None and entry[1][0] == self.data_generation
+        for attr in ['rm_check', 'weight_check', 'volume_check', 'df_check']:
+            button = getattr(getattr(self, attr, None), 'undo_button', None)
+            if button is not None:
+                button.setEnabled(enabled)
+
+    def notify_changed_cells(self, changes):
+        """Publish the Solution Labels, Elements and columns of a CellChanges recorded on self.data."""
+        rows = changes.rows
+        labels = self.data['Solution Label'].to_numpy()[rows]
+        elements = self.data['Element'].to_numpy()[rows] if 'Element' in self.data.columns else None
+        return self.notify_data_changed(labels=labels, columns=changes.columns.keys(), elements=elements)
+
+    def on_crm_check_changed(self, change):
+        # جدول CRM از pivot صفحه Result ساخته می‌شود و با سیگنال pivot_rebuilt آن تازه می‌شود؛
+        # اگر Result پنهان است و تغییرش هنوز در صف است، همین حالا به آن تحویل شود
+        if change.touches(PIVOT_SOURCE_COLUMNS) and self.change_bus.is_dirty(self.results):
+            self.change_bus.deliver(self.results)
+
+    def notify_data_changed(self, labels=None, columns=None, source=None, elements=None):
+        """Publish a data change (None = all labels / columns / elements); `source` is not notified of its own change."""
+        return self.change_bus.publish(labels, columns, source, elements)
 
     def get_data(self): return self.data
     def get_excluded_samples(self): return []
@@ -0,0 +1,149 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+import pandas as pd
+import numpy as np
+import logging
+from utils.display_format import format_column
+
+logger = logging.getLogger(__name__)
+
+class ArrayColumn:
+    """One column of an ArrayTableModel.
+
+    Display strings are built for the whole column at once: numbers are formatted with `decimals`
+    places when given, everything else with str(); missing values show `missing_text`.
+    `background`, `foreground` and `font` style every cell of the column; `tags` is an optional
+    per-row array whose values are looked up in `tag_styles` ({tag: {'background': ..., ...}}).
+    """
+    def __init__(self, header, values, decimals=None, alignment=None, background=None, foreground=None,
+                 font=None, tags=None, tag_styles=None, missing_text=""):
+        self.header = header
+        self.decimals = decimals
+        self.missing_text = missing_text
+        self.alignment = alignment
+        self.style = {'background': background, 'foreground': foreground, 'font': font}
+        self.tags = None if tags is None else np.asarray(tags, dtype=object)
+        self.tag_styles = tag_styles or {}
+        self.set_values(values)
+
+    def set_values(self, values):
+        self.values = np.asarray(values, dtype=object)
+        if self.decimals is not None:
+            self.display = format_column(self.values, self.decimals)
+        else:
+            self.display = format_column(self.values, 0, numeric=np.full(len(self.values), np.nan))
+        if self.missing_text:
+            self.display[pd.isna(self.values)] = self.missing_text
+
+    def role_value(self, row, key):
+        if self.tags is not None:
+            style = self.tag_styles.get(self.tags[row])
+            if style is not None and style.get(key) is not None:
+                return style[key]
+        return self.style[key]
+
+class ArrayTableModel(QAbstractTableModel):
+    """Read-only table model over a list of ArrayColumn objects.
+
+    Replaces per-cell QStandardItem tables: building the model formats each column once and
+    data() is plain array indexing. Optional whole-row tags (row_tags + row_styles) override the
+    column styles, e.g. to paint flagged rows. With check_column set, that column shows a checkbox
+    backed by a boolean array; user toggles emit check_toggled(row, checked).
+    """
+    check_toggled = pyqtSignal(int, bool)
+
+    _STYLE_ROLES = {
+        Qt.ItemDataRole.BackgroundRole: 'background',
+        Qt.ItemDataRole.ForegroundRole: 'foreground',
+        Qt.ItemDataRole.FontRole: 'font',
+    }
+
+    def __init__(self, columns, check_column=None, checked=None, row_tags=None, row_styles=None, parent=None):
+        super().__init__(parent)
+        self._columns = list(columns)
+        self._rows = len(self._columns[0].values) if self._columns else 0
+        self._check_column = check_column
+        if checked is None:
+            self._checked = np.zeros(self._rows, dtype=bool)
+        else:
+            self._checked = np.asarray(checked, dtype=bool).copy()
+        self._row_tags = None if row_tags is None else np.asarray(row_tags, dtype=object)
+        self._row_styles = row_styles or {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        column = self._columns[index.column()]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return column.display[row]
+        if role in self._STYLE_ROLES:
+            key = self._STYLE_ROLES[role]
+            if self._row_tags is not None:
+                style = self._row_styles.get(self._row_tags[row])
+                if style is not None and style.get(key) is not None:
+                    return style[key]
+            return column.role_value(row, key)
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return column.alignment
+        if role == Qt.ItemDataRole.CheckStateRole and index.column() == self._check_column:
+            return Qt.CheckState.Checked if self._checked[row] else Qt.CheckState.Unchecked
+        if role == Qt.ItemDataRole.UserRole:
+            return column.values[row]
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.CheckStateRole or index.column() != self._check_column:
+            return False
+        checked = value in (Qt.CheckState.Checked, Qt.CheckState.Checked.value)
+        self._checked[index.row()] = checked
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
+        self.check_toggled.emit(index.row(), checked)
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() == self._check_column:
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole:
+            if orientation == Qt.Orientation.Horizontal:
+                return str(self._columns[section].header) if section < len(self._columns) else ""
+            return str(section + 1)
+        return None
+
+    def column_values(self, col):
+        """Raw values of a column, in row order."""
+        return self._columns[col].values
+
+    def value(self, row, col):
+        return self._columns[col].values[row]
+
+    def set_column_values(self, col, values):
+        """Replace one column's values and repaint it with a single dataChanged."""
+        self._columns[col].set_values(values)
+        if self._rows:
+            self.dataChanged.emit(self.index(0, col), self.index(self._rows - 1, col), [Qt.ItemDataRole.DisplayRole])
+
+    def is_checked(self, row):
+        return bool(self._checked[row])
+
+    def checked_rows(self):
+        return np.flatnonzero(self._checked)
+
+    def set_all_checked(self, checked):
+        """Check or uncheck every row at once; emits one dataChanged and no check_toggled."""
+        self._checked[:] = checked
+        if self._rows and self._check_column is not None:
+            col = self._check_column
+            self.dataChanged.emit(self.index(0, col), self.index(self._rows - 1, col), [Qt.ItemDataRole.CheckStateRole])
@@ -4,12 +4,12 @@ from PyQt6.QtWidgets import (
     QMessageBox, QComboBox, QLabel, QProgressDialog
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from PyQt6.QtGui import QStandardItemModel, QStandardItem
 import numpy as np
 import pandas as pd
 import logging
 import sqlite3
 import os  # برای clean_filename
+from utils.array_table_model import ArrayTableModel, ArrayColumn
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -266,16 +266,13 @@ class ChangesReportDialog(QDialog):
         self.thread.start()
 
     def on_report_finished(self, rows):
-        model = QStandardItemModel()
         headers = [
             "Solution Label", "Original Value", "New Value",
             "Weight Correction", "Volume Correction", "DF Correction",
             "CRM Calibration", "Drift Calibration"
         ]
-        model.setHorizontalHeaderLabels(headers)
-
-        for row_items in rows:
-            model.appendRow([QStandardItem(str(item)) for item in row_items])
+        table = np.array(rows, dtype=object).reshape(len(rows), len(headers))
+        model = ArrayTableModel([ArrayColumn(header, table[:, i]) for i, header in enumerate(headers)], parent=self)
 
         self.report_table.setModel(model)
         self.report_table.resizeColumnsToContents()
@@ -0,0 +1,85 @@
+from PyQt6.QtCore import QObject, QEvent, QTimer
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DataChange:
+    """What changed in the app data: sets of Solution Labels, columns and Elements (None = all) and the data version."""
+    def __init__(self, labels=None, columns=None, version=0, elements=None):
+        self.labels = None if labels is None else set(labels)
+        self.columns = None if columns is None else set(columns)
+        self.elements = None if elements is None else set(elements)
+        self.version = version
+
+    def touches(self, columns):
+        """Whether the change may affect any of `columns`; always True for a change to all columns."""
+        return self.columns is None or not self.columns.isdisjoint(columns)
+
+    def merge(self, other):
+        """One change covering both self and other, at the later version."""
+        labels = None if self.labels is None or other.labels is None else self.labels | other.labels
+        columns = None if self.columns is None or other.columns is None else self.columns | other.columns
+        elements = None if self.elements is None or other.elements is None else self.elements | other.elements
+        return DataChange(labels, columns, max(self.version, other.version), elements)
+
+    def __repr__(self):
+        return f"DataChange(labels={self.labels}, columns={self.columns}, elements={self.elements}, version={self.version})"
+
+class ChangeBus(QObject):
+    """Delivers data changes to subscribed tabs, only while they are visible.
+
+    publish() marks every subscriber dirty and merges the change into what it has pending. Visible
+    subscribers are called once on the next event-loop turn, so a burst of publishes from one edit
+    becomes a single call; hidden ones are called when they are next shown.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.version = 0
+        self._handlers = {}  # widget -> handler(change)
+        self._pending = {}  # widget -> merged DataChange
+        self._flush_scheduled = False
+
+    def subscribe(self, widget, handler):
+        self._handlers[widget] = handler
+        widget.installEventFilter(self)
+
+    def publish(self, labels=None, columns=None, source=None, elements=None):
+        self.version += 1
+        change = DataChange(labels, columns, self.version, elements)
+        for widget in self._handlers:
+            if widget is source:
+                continue
+            pending = self._pending.get(widget)
+            self._pending[widget] = change if pending is None else pending.merge(change)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            QTimer.singleShot(0, self.flush)
+        return change
+
+    def flush(self):
+        """Deliver pending changes to the visible subscribers."""
+        self._flush_scheduled = False
+        for widget in [widget for widget in self._pending if widget.isVisible()]:
+            self.deliver(widget)
+
+    def clear(self):
+        self._pending.clear()
+
+    def is_dirty(self, widget):
+        return widget in self._pending
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Show and obj in self._pending:
+            self.deliver(obj)
+        return False
+
+    def deliver(self, widget):
+        """Call widget's handler now with its pending change, if any, whether it is visible or not."""
+        change = self._pending.pop(widget, None)
+        if change is None:
+            return
+        logger.debug(f"Delivering {change} to {type(widget).__name__}")
+        try:
+            self._handlers[widget](change)
+        except Exception as e:
+            logger.error(f"Error handling data change in {type(widget).__name__}: {str(e)}", exc_info=True)
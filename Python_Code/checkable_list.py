@@ -0,0 +1,131 @@
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QListView, QPushButton, QAbstractItemView
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CheckableValueModel(QAbstractListModel):
+    """List model of unique column values; check state is kept in a boolean array instead of widgets."""
+    def __init__(self, values, selected_values=None, parent=None):
+        super().__init__(parent)
+        self._values = list(values)
+        self._labels = [str(v) for v in self._values]
+        # Lower-cased labels as a NumPy string array so search is one vectorized pass
+        self._search_keys = np.char.lower(np.array(self._labels, dtype=str)) if self._labels else np.array([], dtype=str)
+        if selected_values is None:
+            self._checked = np.ones(len(self._values), dtype=bool)
+        else:
+            self._checked = np.fromiter((v in selected_values for v in self._values), dtype=bool, count=len(self._values))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._values)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._labels[row]
+        if role == Qt.ItemDataRole.CheckStateRole:
+            return Qt.CheckState.Checked if self._checked[row] else Qt.CheckState.Unchecked
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.CheckStateRole:
+            return False
+        self._checked[index.row()] = value in (Qt.CheckState.Checked, Qt.CheckState.Checked.value)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsUserCheckable
+
+    def match_mask(self, text):
+        """Boolean mask of rows whose label contains text (case-insensitive)."""
+        if not text:
+            return np.ones(len(self._values), dtype=bool)
+        return np.char.find(self._search_keys, text.lower()) >= 0
+
+    def set_checked_mask(self, mask, checked):
+        """Set the check state of all rows in mask and emit a single dataChanged."""
+        if len(self._values) == 0 or not mask.any():
+            return
+        self._checked[mask] = checked
+        self.dataChanged.emit(self.index(0), self.index(len(self._values) - 1), [Qt.ItemDataRole.CheckStateRole])
+
+    def checked_values(self):
+        return {self._values[i] for i in np.flatnonzero(self._checked)}
+
+class ValueFilterProxyModel(QSortFilterProxyModel):
+    """Proxy that hides rows using a precomputed match mask from CheckableValueModel."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._mask = None
+
+    def set_search_text(self, text):
+        source = self.sourceModel()
+        self._mask = source.match_mask(text) if text and source is not None else None
+        self.invalidateFilter()
+
+    def visible_mask(self):
+        if self._mask is not None:
+            return self._mask
+        return np.ones(self.sourceModel().rowCount(), dtype=bool)
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self._mask is None or bool(self._mask[source_row])
+
+class CheckableValueList(QWidget):
+    """Search box, virtualized checkable list and Select/Deselect All buttons for filter dialogs.
+
+    Rows that are hidden by the search are unchecked. With check_matches=True, rows matching
+    the search are checked as well.
+    """
+    def __init__(self, values, selected_values=None, check_matches=False, parent=None):
+        super().__init__(parent)
+        self.check_matches = check_matches
+        self.model = CheckableValueModel(values, selected_values, self)
+        self.proxy = ValueFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Search...")
+        self.search_edit.textChanged.connect(self.filter_values)
+        layout.addWidget(self.search_edit)
+
+        self.view = QListView()
+        self.view.setModel(self.proxy)
+        self.view.setUniformItemSizes(True)
+        self.view.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        layout.addWidget(self.view)
+
+        buttons = QHBoxLayout()
+        select_all_btn = QPushButton("Select All")
+        select_all_btn.clicked.connect(lambda: self.toggle_all(True))
+        buttons.addWidget(select_all_btn)
+
+        deselect_all_btn = QPushButton("Deselect All")
+        deselect_all_btn.clicked.connect(lambda: self.toggle_all(False))
+        buttons.addWidget(deselect_all_btn)
+
+        layout.addLayout(buttons)
+
+    def filter_values(self, text):
+        self.proxy.set_search_text(text)
+        visible = self.proxy.visible_mask()
+        self.model.set_checked_mask(~visible, False)
+        if self.check_matches:
+            self.model.set_checked_mask(visible, True)
+
+    def toggle_all(self, checked):
+        """Select or deselect all rows that pass the current search."""
+        self.model.set_checked_mask(self.proxy.visible_mask(), checked)
+
+    def checked_values(self):
+        return self.model.checked_values()
@@ -1,11 +1,10 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTableView, QAbstractItemView,
     QHeaderView, QScrollBar, QComboBox, QLineEdit, QDialog, QFileDialog, QMessageBox, QGroupBox, QProgressBar,QProgressDialog,
-    QTabWidget, QScrollArea, QCheckBox
+    QTabWidget
 )
 from PyQt6.QtCore import Qt, QAbstractTableModel, QTimer, QThread, pyqtSignal
 from PyQt6.QtGui import QStandardItemModel, QStandardItem, QFont, QColor
-import pandas as pd
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
@@ -17,6 +16,8 @@ from functools import reduce
 import re
 import logging
 
+from utils.checkable_list import CheckableValueList
+
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
@@ -27,7 +28,7 @@ class ColumnFilterDialog(QDialog):
         self.setWindowTitle(f"Filter Column: {col_name}")
         self.parent = parent
         self.col_name = col_name
-        self.checkboxes = {}
+        self.value_list = None
         self.min_edit = None
         self.max_edit = None
 
@@ -46,18 +47,15 @@ class ColumnFilterDialog(QDialog):
             return
 
         try:
-            test_series = pd.to_numeric(data_source[self.col_name], errors='coerce')
-            self.is_numeric_col = test_series.notna().any() and self.col_name != 'Solution Label'
+            self.stats = self.parent.column_stats.get(data_source, self.col_name, self.parent.data_hash)
+            self.is_numeric_col = self.stats.is_numeric
             logger.debug(f"Column {col_name} is_numeric after coercion: {self.is_numeric_col}")
         except Exception as e:
+            self.stats = None
             self.is_numeric_col = False
             logger.error(f"Error checking numeric type for {col_name}: {str(e)}")
 
-        unique_values = data_source[self.col_name].dropna().unique()
-        if self.is_numeric_col:
-            sorted_unique = sorted(unique_values, key=lambda x: float(x) if self.is_numeric(str(x)) else float('inf'))
-        else:
-            sorted_unique = sorted(unique_values, key=str)
+        sorted_unique = self.stats.sorted_unique if self.stats is not None else []
 
         layout = QVBoxLayout(self)
         self.setMinimumSize(400, 400)
@@ -91,41 +89,13 @@ class ColumnFilterDialog(QDialog):
     def setup_list_tab(self, widget, sorted_unique):
         list_layout = QVBoxLayout(widget)
 
-        self.search_edit = QLineEdit()
-        self.search_edit.setPlaceholderText("Search...")
-        self.search_edit.textChanged.connect(self.filter_checkboxes)
-        list_layout.addWidget(self.search_edit)
-
-        scroll = QScrollArea()
-        scroll_widget = QWidget()
-        scroll_layout = QVBoxLayout(scroll_widget)
-        scroll.setWidget(scroll_widget)
-        scroll.setWidgetResizable(True)
-        list_layout.addWidget(scroll)
-
         if not hasattr(self.parent, 'column_filters'):
             self.parent.column_filters = {}
         
         curr_filter = self.parent.column_filters.get(self.col_name, {})
-        selected_values = curr_filter.get('selected_values', set(sorted_unique))
-
-        for val in sorted_unique:
-            cb = QCheckBox(str(val))
-            cb.setChecked(val in selected_values)
-            cb.stateChanged.connect(lambda state, v=val: self.update_filter(v, state))
-            self.checkboxes[val] = cb
-            scroll_layout.addWidget(cb)
-
-        buttons = QHBoxLayout()
-        select_all_btn = QPushButton("Select All")
-        select_all_btn.clicked.connect(lambda: self.toggle_all(True))
-        buttons.addWidget(select_all_btn)
-
-        deselect_all_btn = QPushButton("Deselect All")
-        deselect_all_btn.clicked.connect(lambda: self.toggle_all(False))
-        buttons.addWidget(deselect_all_btn)
-
-        list_layout.addLayout(buttons)
+        selected_values = curr_filter.get('selected_values')
+        self.value_list = CheckableValueList(sorted_unique, selected_values, check_matches=True)
+        list_layout.addWidget(self.value_list)
 
     def setup_number_tab(self, widget):
         number_layout = QVBoxLayout(widget)
@@ -150,13 +120,10 @@ class ColumnFilterDialog(QDialog):
         max_layout.addStretch()
         number_layout.addLayout(max_layout)
 
-        # NEW: Use last_filtered_data as fallback
-        data_source = self.parent.last_pivot_data if self.parent.last_pivot_data is not None else self.parent.last_filtered_data
         try:
-            data_range = pd.to_numeric(data_source[self.col_name], errors='coerce').dropna()
-            if not data_range.empty:
-                min_val = data_range.min()
-                max_val = data_range.max()
+            if self.stats.has_range():
+                min_val = self.stats.min_val
+                max_val = self.stats.max_val
                 range_label = QLabel(f"Data Range: {min_val:.2f} to {max_val:.2f}")
                 range_label.setStyleSheet("color: blue; font-size: 10px;")
                 number_layout.addWidget(range_label)
@@ -172,24 +139,6 @@ class ColumnFilterDialog(QDialog):
         if 'max_val' in curr_filter and curr_filter['max_val'] is not None:
             self.max_edit.setText(str(curr_filter['max_val']))
 
-    def filter_checkboxes(self, text):
-        text = text.lower()
-        for val, cb in self.checkboxes.items():
-            if text == '' or text in str(val).lower():
-                cb.setVisible(True)
-                cb.setChecked(True)
-            else:
-                cb.setVisible(False)
-                cb.setChecked(False)
-
-    def update_filter(self, value, state):
-        self.checkboxes[value].setChecked(state == Qt.CheckState.Checked.value)
-
-    def toggle_all(self, checked):
-        for cb in self.checkboxes.values():
-            if cb.isVisible():
-                cb.setChecked(checked)
-
     def is_numeric(self, value):
         try:
             float(value)
@@ -198,7 +147,7 @@ class ColumnFilterDialog(QDialog):
             return False
 
     def apply_filters(self):
-        selected_values = {val for val, cb in self.checkboxes.items() if cb.isChecked()}
+        selected_values = self.value_list.checked_values()
         min_val = None
         max_val = None
         if self.is_numeric_col:
@@ -210,10 +159,8 @@ class ColumnFilterDialog(QDialog):
                     max_val = float(self.max_edit.text())
                     logger.debug(f"Max filter set for {self.col_name}: {max_val}")
                 if min_val is not None or max_val is not None:
-                    data_source = self.parent.last_pivot_data if self.parent.last_pivot_data is not None else self.parent.last_filtered_data
-                    data_range = pd.to_numeric(data_source[self.col_name], errors='coerce').dropna()
-                    if not data_range.empty:
-                        min_data, max_data = data_range.min(), data_range.max()
+                    if self.stats.has_range():
+                        min_data, max_data = self.stats.min_val, self.stats.max_val
                         if (min_val is not None and min_val > max_data) or (max_val is not None and max_val < min_data):
                             QMessageBox.warning(self, "Invalid Filter", f"Filter range ({min_val}, {max_val}) is outside data range ({min_data:.2f}, {max_data:.2f})")
                             return
@@ -0,0 +1,62 @@
+import pandas as pd
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ColumnStats:
+    """Statistics of one column used by the filter dialogs: sorted unique values, range, NaN count and numeric flag."""
+    def __init__(self, series, col_name):
+        numeric = pd.to_numeric(series, errors='coerce')
+        self.is_numeric = bool(numeric.notna().any()) and col_name != 'Solution Label'
+        self.nan_count = int(series.isna().sum())
+
+        valid = numeric.dropna()
+        self.min_val = valid.min() if not valid.empty else None
+        self.max_val = valid.max() if not valid.empty else None
+
+        unique_values = series.dropna().unique()
+        if self.is_numeric:
+            # Non-numeric entries sort last, same as sorted(key=float or inf)
+            keys = pd.to_numeric(pd.Series(unique_values), errors='coerce').fillna(np.inf).to_numpy()
+        else:
+            keys = np.array([str(v) for v in unique_values], dtype=str)
+        order = np.argsort(keys, kind='stable')
+        self.sorted_unique = [unique_values[i] for i in order]
+
+    def has_range(self):
+        return self.min_val is not None
+
+class ColumnStatsCache:
+    """Per-column statistics for one version of a table.
+
+    The cache is bound to a DataFrame object (and an optional version key); passing a different
+    frame or version drops every cached column. In-place edits must call invalidate().
+    """
+    def __init__(self):
+        self._df = None
+        self._version = None
+        self._stats = {}
+
+    def get(self, df, col_name, version=None):
+        if df is not self._df or version != self._version:
+            self._df = df
+            self._version = version
+            self._stats = {}
+        stats = self._stats.get(col_name)
+        if stats is None:
+            stats = ColumnStats(df[col_name], col_name)
+            self._stats[col_name] = stats
+            logger.debug(f"Computed column stats for {col_name}: numeric={stats.is_numeric}, unique={len(stats.sorted_unique)}")
+        return stats
+
+    def invalidate(self, col_name=None):
+        if col_name is None:
+            self._stats = {}
+        else:
+            self._stats.pop(col_name, None)
+
+    def clear(self):
+        self._df = None
+        self._version = None
+        self._stats = {}
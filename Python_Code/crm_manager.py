@@ -26,14 +26,15 @@ class CRMManager:
             return
 
         try:
-            conn = self.pivot_tab.app.crm_tab.conn
-            if conn is None:
-                self.pivot_tab.app.crm_tab.init_db()
-                conn = self.pivot_tab.app.crm_tab.conn
-                if conn is None:
-                    QMessageBox.warning(self.pivot_tab, "Error", "Failed to connect to CRM database!")
-                    self.logger.error("Failed to connect to CRM database")
-                    return
+            try:
+                store = self.pivot_tab.app.crm_tab.crm_store()
+            except ValueError:
+                QMessageBox.warning(self.pivot_tab, "Error", "pivot_crm table missing required columns!")
+                return
+            if store is None:
+                QMessageBox.warning(self.pivot_tab, "Error", "Failed to connect to CRM database!")
+                self.logger.error("Failed to connect to CRM database")
+                return
 
             crm_ids = ['258', '252', '906', '506', '233', '255', '263', '260']
 
@@ -53,14 +54,6 @@ class CRMManager:
                 QMessageBox.information(self.pivot_tab, "Info", "No CRM rows found in pivot data!")
                 return
 
-            cursor = conn.cursor()
-            cursor.execute("PRAGMA table_info(pivot_crm)")
-            cols = [x[1] for x in cursor.fetchall()]
-            required = {'CRM ID', 'Analysis Method'}
-            if not required.issubset(cols):
-                QMessageBox.warning(self.pivot_tab, "Error", "pivot_crm table missing required columns!")
-                return
-
             element_to_columns = {}
             for col in self.pivot_tab.results_frame.last_filtered_data.columns:
                 if col == 'Solution Label':
@@ -77,8 +70,7 @@ class CRMManager:
             self.pivot_tab._inline_crm_rows.clear()
             self.pivot_tab.included_crms.clear()
 
-            for _, row in crm_rows.iterrows():
-                label = row['Solution Label']
+            for label in crm_rows['Solution Label']:
                 found_crm_id = None
                 for crm_id in crm_ids:
                     pattern = rf'(?i)(?:(?:^|(?<=\s))(?:CRM|OREAS)?\s*({crm_id}(?:[a-zA-Z0-9]{{0,2}})?)\b)'
@@ -89,44 +81,21 @@ class CRMManager:
                 if not found_crm_id:
                     continue
 
-                crm_id_string = f"OREAS {found_crm_id}"
-                cursor.execute(
-                    "SELECT * FROM pivot_crm WHERE [CRM ID] LIKE ?",
-                    (f"OREAS {found_crm_id}%",)
-                )
-                crm_data = cursor.fetchall()
-                if not crm_data:
+                positions = store.with_prefix(f"OREAS {found_crm_id}")
+                if len(positions) == 0:
                     continue
 
-                cursor.execute("PRAGMA table_info(pivot_crm)")
-                db_columns = [x[1] for x in cursor.fetchall()]
-                non_element_columns = ['CRM ID', 'Solution Label', 'Analysis Method', 'Type']
-
+                # key -> {symbol: grade}; a repeated key keeps its place but takes the last record's grades
                 all_crm_options = {}
                 filtered_crm_options = {}
                 allowed_methods = {'4-Acid Digestion', 'Aqua Regia Digestion'}
 
-                for db_row in crm_data:
-                    crm_id = db_row[db_columns.index('CRM ID')]
-                    analysis_method = db_row[db_columns.index('Analysis Method')]
-                    key = f"{crm_id} ({analysis_method})"
-                    all_crm_options[key] = []
+                for pos in positions:
+                    analysis_method = store.methods[pos]
+                    key = f"{store.crm_ids[pos]} ({analysis_method})"
+                    all_crm_options[key] = store.grades([pos])
                     if analysis_method in allowed_methods:
-                        filtered_crm_options[key] = []
-
-                    for col in db_columns:
-                        if col in non_element_columns:
-                            continue
-                        value = db_row[db_columns.index(col)]
-                        if value not in (None, ''):
-                            try:
-                                symbol = col.split('_')[0].strip()
-                                val = float(value)
-                                all_crm_options[key].append((symbol, val))
-                                if analysis_method in allowed_methods:
-                                    filtered_crm_options[key].append((symbol, val))
-                            except (ValueError, TypeError):
-                                continue
+                        filtered_crm_options[key] = all_crm_options[key]
 
                 selected_crm_key = self.crm_selections.get(label)
                 if selected_crm_key is None and len(filtered_crm_options) > 1:
@@ -200,8 +169,7 @@ class CRMManager:
                                        if filtered_crm_options else list(all_crm_options.keys())[0])
                     self.crm_selections[label] = selected_crm_key
 
-                crm_data = all_crm_options.get(selected_crm_key, [])
-                crm_dict = {symbol: grade for symbol, grade in crm_data}
+                crm_dict = all_crm_options.get(selected_crm_key, {})
                 crm_values = {'Solution Label': selected_crm_key}
                 for element, columns in element_to_columns.items():
                     value = crm_dict.get(element)
@@ -231,18 +199,17 @@ class CRMManager:
     def open_manual_crm_dialog(self, solution_label):
         """Open a dialog to search and select a CRM manually."""
         try:
-            conn = self.pivot_tab.app.crm_tab.conn
-            if conn is None:
-                self.pivot_tab.app.crm_tab.init_db()
-                conn = self.pivot_tab.app.crm_tab.conn
-                if conn is None:
-                    QMessageBox.warning(self.pivot_tab, "Error", "Failed to connect to CRM database!")
-                    self.logger.error("Failed to connect to CRM database")
-                    return
+            try:
+                store = self.pivot_tab.app.crm_tab.crm_store()
+            except ValueError:
+                QMessageBox.warning(self.pivot_tab, "Error", "pivot_crm table missing required columns!")
+                return
+            if store is None:
+                QMessageBox.warning(self.pivot_tab, "Error", "Failed to connect to CRM database!")
+                self.logger.error("Failed to connect to CRM database")
+                return
 
-            cursor = conn.cursor()
-            cursor.execute("SELECT DISTINCT [CRM ID] FROM pivot_crm WHERE [CRM ID] LIKE 'OREAS%'")
-            crm_ids = [row[0] for row in cursor.fetchall()]
+            crm_ids = store.crm_ids_with_prefix('OREAS')
 
             if not crm_ids:
                 QMessageBox.warning(self.pivot_tab, "Warning", "No CRMs found in the database!")
@@ -292,12 +259,7 @@ class CRMManager:
 
                 filtered_crms = [crm_id for crm_id in crm_ids if search_text.lower() in crm_id.lower()]
                 for crm_id in sorted(filtered_crms):
-                    cursor.execute(
-                        "SELECT DISTINCT [Analysis Method] FROM pivot_crm WHERE [CRM ID] = ?",
-                        (crm_id,)
-                    )
-                    methods = [row[0] for row in cursor.fetchall()]
-                    for method in sorted(methods):
+                    for method in sorted(store.methods_of(crm_id)):
                         key = f"{crm_id} ({method})"
                         rb = QRadioButton(key)
                         rb.setStyleSheet("margin:0px; padding:0px;")
@@ -350,19 +312,10 @@ class CRMManager:
     def add_manual_crm(self, solution_label, selected_crm_key):
         """Add manually selected CRM to the pivot table."""
         try:
-            conn = self.pivot_tab.app.crm_tab.conn
-            cursor = conn.cursor()
-            cursor.execute("PRAGMA table_info(pivot_crm)")
-            db_columns = [x[1] for x in cursor.fetchall()]
-            non_element_columns = ['CRM ID', 'Solution Label', 'Analysis Method', 'Type']
-
+            store = self.pivot_tab.app.crm_tab.crm_store()
             crm_id = selected_crm_key.split(' (')[0]
-            cursor.execute(
-                "SELECT * FROM pivot_crm WHERE [CRM ID] = ? AND [Analysis Method] = ?",
-                (crm_id, selected_crm_key.split(' (')[1][:-1])
-            )
-            crm_data = cursor.fetchall()
-            if not crm_data:
+            records = store.records(crm_id, selected_crm_key.split(' (')[1][:-1])
+            if not records:
                 self.logger.warning(f"No data found for CRM {selected_crm_key}")
                 return
 
@@ -373,19 +326,7 @@ class CRMManager:
                 element = col.split()[0].strip()
                 element_to_columns.setdefault(element, []).append(col)
 
-            crm_dict = {}
-            for db_row in crm_data:
-                for col in db_columns:
-                    if col in non_element_columns:
-                        continue
-                    value = db_row[db_columns.index(col)]
-                    if value not in (None, ''):
-                        try:
-                            symbol = col.split('_')[0].strip()
-                            val = float(value)
-                            crm_dict[symbol] = val
-                        except (ValueError, TypeError):
-                            continue
+            crm_dict = store.grades(records)
 
             crm_values = {'Solution Label': selected_crm_key}
             for element, columns in element_to_columns.items():
@@ -417,8 +358,8 @@ class CRMManager:
         self.pivot_tab.data_changed.emit()
         self.logger.debug("Emitted data_changed signal after check_rm_with_diff_range")
 
-    def _build_crm_row_lists_for_columns(self, columns):
-        """Build CRM row lists for display."""
+    def _build_crm_row_lists_for_columns(self, columns, labels=None):
+        """Build CRM row lists for display, for every inline CRM label or only those in labels."""
         crm_display = {}
         try:
             dec = int(self.pivot_tab.results_frame.decimal_combo.currentText())
@@ -433,6 +374,8 @@ class CRMManager:
             min_diff, max_diff = -12, 12
 
         for sol_label, list_of_dicts in self.pivot_tab._inline_crm_rows.items():
+            if labels is not None and sol_label not in labels:
+                continue
             crm_display[sol_label] = []
             pivot_row = self.pivot_tab.results_frame.last_filtered_data[
                 self.pivot_tab.results_frame.last_filtered_data['Solution Label'].str.strip().str.lower() == sol_label.strip().lower()
@@ -0,0 +1,86 @@
+import pandas as pd
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+NON_ELEMENT_COLUMNS = ('CRM ID', 'Solution Label', 'Analysis Method', 'Type')
+REQUIRED_COLUMNS = {'CRM ID', 'Analysis Method'}
+
+class CRMStore:
+    """The pivot_crm table held in memory for CRM checks: one read, then no SQL.
+
+    Certified values form a (record x element) float matrix, NaN where a value is missing or not
+    numeric. Element columns are keyed by symbol (the part of the column name before '_'); when
+    several columns share a symbol the last non-empty one wins, as the old per-row parsing did.
+    Records are indexed by lowercase CRM ID for prefix lookups and by (CRM ID, Analysis Method).
+    """
+    def __init__(self, frame):
+        missing = REQUIRED_COLUMNS - set(frame.columns)
+        if missing:
+            raise ValueError(f"pivot_crm table missing required columns: {sorted(missing)}")
+        self.crm_ids = frame['CRM ID'].astype(str).to_numpy(dtype=object)
+        self.methods = frame['Analysis Method'].to_numpy(dtype=object)
+
+        symbols = {}
+        for col in frame.columns:
+            if col in NON_ELEMENT_COLUMNS:
+                continue
+            symbol = str(col).split('_')[0].strip()
+            values = frame[col]
+            if values.dtype == object:
+                values = values.astype(str).str.strip()
+            values = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+            previous = symbols.get(symbol)
+            symbols[symbol] = values if previous is None else np.where(np.isnan(values), previous, values)
+        self.symbols = list(symbols)
+        self.values = np.column_stack(list(symbols.values())) if symbols else np.empty((len(frame), 0))
+
+        # CRM ID prefix index: record positions sorted by lowercase id
+        keys = np.array([crm_id.lower() for crm_id in self.crm_ids], dtype=object)
+        self._prefix_order = np.argsort(keys, kind='stable')
+        self._prefix_keys = keys[self._prefix_order].astype(str)
+
+        # (CRM ID, Analysis Method) index, records in table order
+        self._by_method = {}
+        self._methods = {}
+        for pos, key in enumerate(zip(self.crm_ids, self.methods)):
+            if key not in self._by_method:
+                self._methods.setdefault(key[0], []).append(key[1])
+            self._by_method.setdefault(key, []).append(pos)
+        logger.debug(f"CRM store loaded: {len(self.crm_ids)} records x {len(self.symbols)} elements")
+
+    @classmethod
+    def load(cls, conn):
+        return cls(pd.read_sql_query("SELECT * FROM pivot_crm", conn))
+
+    def __len__(self):
+        return len(self.crm_ids)
+
+    def with_prefix(self, prefix):
+        """Positions of the records whose CRM ID starts with prefix (case-insensitive), in table order."""
+        prefix = prefix.lower()
+        lo = np.searchsorted(self._prefix_keys, prefix, side='left')
+        hi = np.searchsorted(self._prefix_keys, prefix + '\U0010ffff', side='left')
+        return np.sort(self._prefix_order[lo:hi])
+
+    def crm_ids_with_prefix(self, prefix):
+        """Distinct CRM IDs starting with prefix (case-insensitive)."""
+        return list(dict.fromkeys(self.crm_ids[self.with_prefix(prefix)]))
+
+    def methods_of(self, crm_id):
+        """Distinct Analysis Methods recorded for crm_id."""
+        return list(self._methods.get(crm_id, []))
+
+    def records(self, crm_id, method):
+        """Positions of the records with exactly this CRM ID and Analysis Method."""
+        return self._by_method.get((crm_id, method), [])
+
+    def grades(self, positions):
+        """{symbol: certified value} over the given records; later records override earlier ones."""
+        grades = {}
+        for pos in positions:
+            row = self.values[pos]
+            for i in np.flatnonzero(~np.isnan(row)):
+                grades[self.symbols[i]] = float(row[i])
+        return grades
@@ -0,0 +1,74 @@
+import pandas as pd
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+def format_numbers(numbers, decimals, strip_zeros=False):
+    """Format a float array to fixed decimals in one vectorized pass."""
+    out = np.char.mod(f"%.{decimals}f", numbers)
+    if strip_zeros and decimals > 0:
+        out = np.char.rstrip(np.char.rstrip(out, '0'), '.')
+    return out.astype(object)
+
+def format_column(values, decimals, numeric=None, strip_zeros=False, blank_missing=True):
+    """Display strings for one column.
+
+    Numeric cells are formatted with `decimals` places; other cells fall back to str(),
+    or "" for missing values when blank_missing is set. `numeric` may pass an already
+    converted float view of the values.
+    """
+    values = np.asarray(values, dtype=object)
+    if numeric is None:
+        numeric = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+    has_number = ~np.isnan(numeric)
+    out = np.empty(len(values), dtype=object)
+    if has_number.any():
+        out[has_number] = format_numbers(numeric[has_number], decimals, strip_zeros)
+    rest = np.flatnonzero(~has_number)
+    if len(rest):
+        missing = pd.isna(values[rest])
+        for i, is_missing in zip(rest, missing):
+            out[i] = "" if is_missing and blank_missing else str(values[i])
+    return out
+
+class FormattedColumnCache:
+    """Display strings per column for one (data version, decimals) key.
+
+    Columns are formatted on first access, i.e. when they are first painted; later paints
+    are plain lookups. Binding a different key drops every cached column.
+    """
+    def __init__(self):
+        self._key = None
+        self._columns = {}
+
+    def bind(self, key):
+        if key != self._key:
+            self._key = key
+            self._columns = {}
+
+    def get(self, col, build):
+        out = self._columns.get(col)
+        if out is None:
+            out = build(col)
+            self._columns[col] = out
+            logger.debug(f"Formatted column {col} for key {self._key}")
+        return out
+
+    def invalidate(self, col=None):
+        if col is None:
+            self._columns = {}
+        else:
+            self._columns.pop(col, None)
+
+    def clear(self):
+        self._key = None
+        self._columns = {}
+
+def estimate_text_width(values, header, formatter=str, sample_size=200):
+    """Longest display length among the header and an evenly spaced sample of values."""
+    values = np.asarray(values, dtype=object)
+    if len(values) > sample_size:
+        values = values[np.linspace(0, len(values) - 1, sample_size).astype(int)]
+    lengths = [len(formatter(v)) for v in values]
+    return max(lengths + [len(str(header))])
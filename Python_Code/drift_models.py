@@ -0,0 +1,217 @@
+from scipy.interpolate import CubicSpline
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import numpy as np
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# key -> label shown in the drift tab
+DRIFT_MODELS = {
+    'interval': "Ratio per Interval",
+    'linear': "Piecewise Linear",
+    'spline': "Cubic Spline",
+    'loess': "LOESS",
+}
+
+LOESS_FRACTION = 0.5  # share of the RM points used for each local fit
+LOESS_CHUNK = 4096  # positions evaluated per weight matrix
+
+DRIFT_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+# Serial cost per sample of each model, measured on a 120k-cell run (30 elements); spline taken as linear
+DRIFT_CELL_COST = {'interval': 100e-9, 'linear': 120e-9, 'spline': 150e-9, 'loess': 3.5e-6}
+PARALLEL_MIN_COST = 0.02  # seconds; below this a warm pool's ~1.5 ms round trip per job does not pay off
+
+_drift_pool = None
+
+def drift_factors(ratios, interval, stepwise):
+    """Correction factor per sample; interval[i] indexes the ratio of the RM that closes sample i's interval.
+
+    Samples must be sorted by interval, in run order within each one. Stepwise mode ramps linearly
+    over each interval from 1 + (ratio - 1) / n up to ratio; otherwise every sample gets the ratio.
+    """
+    ratios = np.asarray(ratios, dtype=float)
+    interval = np.asarray(interval, dtype=np.int64)
+    factors = ratios[interval]
+    if not stepwise or len(interval) == 0:
+        return factors
+    counts = np.bincount(interval, minlength=len(ratios))
+    rank = np.arange(len(interval)) - (np.cumsum(counts) - counts)[interval]
+    return 1.0 + (factors - 1.0) / counts[interval] * (rank + 1)
+
+def evaluate_drift_model(model, knot_x, knot_y, positions):
+    """Drift ratio curve through the RM points (knot_x, knot_y), evaluated at every position at once.
+
+    knot_x must be increasing. Positions outside the RM points take the value of the nearest end.
+    'interval' has no curve of its own; it is handled by drift_factors() in the RM check.
+    """
+    knot_x = np.asarray(knot_x, dtype=float)
+    knot_y = np.asarray(knot_y, dtype=float)
+    positions = np.asarray(positions, dtype=float)
+    if len(knot_x) == 0:
+        return np.ones(len(positions))
+    if len(knot_x) == 1:
+        return np.full(len(positions), knot_y[0])
+    clipped = np.clip(positions, knot_x[0], knot_x[-1])
+    if model == 'linear' or (model == 'spline' and len(knot_x) < 3):
+        return np.interp(clipped, knot_x, knot_y)
+    if model == 'spline':
+        return CubicSpline(knot_x, knot_y, bc_type='natural')(clipped)
+    if model == 'loess':
+        return loess(knot_x, knot_y, clipped)
+    raise ValueError(f"Unknown drift model: {model}")
+
+def loess(knot_x, knot_y, positions, frac=LOESS_FRACTION):
+    """Local linear fit with tricube weights over the nearest frac of the points, at every position.
+
+    Each chunk of positions is one (positions x points) weight matrix; the weighted least-squares
+    line is solved in closed form, centred on the position so only its intercept is needed.
+    """
+    n = len(knot_x)
+    k = min(n, max(3, int(np.ceil(frac * n))))
+    out = np.empty(len(positions))
+    for start in range(0, len(positions), LOESS_CHUNK):
+        pos = positions[start:start + LOESS_CHUNK]
+        dx = knot_x[None, :] - pos[:, None]
+        dist = np.abs(dx)
+        bandwidth = np.partition(dist, k - 1, axis=1)[:, k - 1] * 1.0001
+        bandwidth = np.where(bandwidth > 0, bandwidth, 1.0)
+        w = (1.0 - np.clip(dist / bandwidth[:, None], 0.0, 1.0) ** 3) ** 3
+        sw = w.sum(axis=1)
+        swx = (w * dx).sum(axis=1)
+        swy = (w * knot_y).sum(axis=1)
+        swxx = (w * dx * dx).sum(axis=1)
+        swxy = (w * dx * knot_y).sum(axis=1)
+        denom = sw * swxx - swx * swx
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.where(denom > 1e-12, (sw * swxy - swx * swy) / denom, 0.0)
+            out[start:start + LOESS_CHUNK] = (swy - slope * swx) / sw
+    return out
+
+def segment_drift_factors(sample_pos, sample_codes, mins, maxs, ratios, stepwise, models):
+    """Correction factors for the samples lying strictly inside one segment's RM intervals (mins[i], maxs[i]).
+
+    ratios is (RM x element) and models holds a DRIFT_MODELS key per element column. RM intervals
+    do not overlap, so each sample is assigned to its bracketing interval with one searchsorted over
+    the sorted upper bounds. Returns the indices of the corrected samples and their factors, ordered
+    by (interval, element) and then sample order, the order stepwise ramps are counted in.
+
+    Curve models are fitted once per element through every usable RM of the segment, not per
+    interval, and evaluated at all of the segment's samples in one call. Segments end only at Cone
+    RMs, where the reference RM (ratio 1) changes, so one curve across segments would join ratios
+    measured against different references.
+    """
+    order = np.argsort(maxs, kind='stable')
+    mins, maxs, ratios = mins[order], maxs[order], ratios[order]
+    usable = ~np.isnan(ratios) & (ratios > 0)
+    if not usable.any() or len(sample_pos) == 0:
+        return np.array([], dtype=np.int64), np.array([])
+
+    interval = np.searchsorted(maxs, sample_pos, side='right')
+    inside = interval < len(maxs)
+    interval = np.minimum(interval, len(maxs) - 1)
+    inside &= (sample_pos > mins[interval]) & usable[interval, sample_codes]
+    if not inside.any():
+        return np.array([], dtype=np.int64), np.array([])
+
+    picked = np.flatnonzero(inside)
+    group = interval[picked] * ratios.shape[1] + sample_codes[picked]
+    sort = np.argsort(group, kind='stable')
+    picked, group = picked[sort], group[sort]
+    factors = drift_factors(ratios.ravel(), group, stepwise)
+
+    # Curve models: from the segment's reference RM (ratio 1) through every usable RM of the element
+    picked_codes = sample_codes[picked]
+    for code, model in enumerate(models):
+        if model == 'interval':
+            continue
+        selected = picked_codes == code
+        if not selected.any():
+            continue
+        ok = usable[:, code]
+        knot_x, first = np.unique(np.concatenate([[mins[0]], maxs[ok]]), return_index=True)
+        knot_y = np.concatenate([[1.0], ratios[ok, code]])[first]
+        factors[selected] = evaluate_drift_model(model, knot_x, knot_y, sample_pos[picked[selected]])
+    return picked, factors
+
+def run_drift_factors(sample_pos, sample_codes, blocks, stepwise, models):
+    """segment_drift_factors over every (mins, maxs, ratios) block of a run, one block per Cone segment.
+
+    Returns (sample indices, factors, block index of each result), concatenated in block order.
+    """
+    picked_parts, factor_parts, block_parts = [], [], []
+    for block_id, (mins, maxs, ratios) in enumerate(blocks):
+        picked, factors = segment_drift_factors(sample_pos, sample_codes, mins, maxs, ratios, stepwise, models)
+        picked_parts.append(picked)
+        factor_parts.append(factors)
+        block_parts.append(np.full(len(picked), block_id, dtype=np.int64))
+    if not picked_parts:
+        return np.array([], dtype=np.int64), np.array([]), np.array([], dtype=np.int64)
+    return np.concatenate(picked_parts), np.concatenate(factor_parts), np.concatenate(block_parts)
+
+def start_drift_pool():
+    """Create the shared drift worker pool; call from the GUI thread before any drift pass runs.
+
+    Workers are spawned rather than forked, since drift passes are submitted from QThreads.
+    """
+    global _drift_pool
+    if _drift_pool is None and DRIFT_WORKERS > 1:
+        _drift_pool = ProcessPoolExecutor(max_workers=DRIFT_WORKERS,
+                                          mp_context=multiprocessing.get_context('spawn'))
+    return _drift_pool
+
+def shutdown_drift_pool():
+    global _drift_pool
+    if _drift_pool is not None:
+        _drift_pool.shutdown(wait=False, cancel_futures=True)
+        _drift_pool = None
+
+def estimated_cost(sample_codes, models):
+    """Estimated serial seconds of a drift pass, from the sample count and model of each element."""
+    counts = np.bincount(sample_codes, minlength=len(models))
+    return sum(count * DRIFT_CELL_COST.get(model, DRIFT_CELL_COST['linear'])
+               for count, model in zip(counts, models))
+
+def drift_pass(sample_pos, sample_codes, blocks, stepwise, models, workers=None):
+    """run_drift_factors for a whole run, split by element across the drift pool when it pays off.
+
+    The pool is used only once start_drift_pool() has run and the estimated serial cost reaches
+    PARALLEL_MIN_COST. Each worker receives only its elements' sample positions and ratio columns
+    as plain arrays. Results come back ordered by block and then by sample index, so the outcome
+    does not depend on scheduling or worker count. A broken or shut-down pool falls back to the
+    serial pass.
+    """
+    workers = DRIFT_WORKERS if workers is None else workers
+    n_elements = len(models)
+    pool = _drift_pool
+    if (pool is None or workers <= 1 or n_elements < 2
+            or estimated_cost(sample_codes, models) < PARALLEL_MIN_COST):
+        return _in_sample_order(*run_drift_factors(sample_pos, sample_codes, blocks, stepwise, models))
+
+    try:
+        jobs = []
+        for chunk in np.array_split(np.arange(n_elements), min(workers, n_elements)):
+            local = np.full(n_elements, -1, dtype=np.int64)
+            local[chunk] = np.arange(len(chunk))
+            rows = np.flatnonzero(local[sample_codes] >= 0)
+            chunk_blocks = [(mins, maxs, np.ascontiguousarray(ratios[:, chunk])) for mins, maxs, ratios in blocks]
+            future = pool.submit(run_drift_factors, sample_pos[rows], local[sample_codes[rows]],
+                                 chunk_blocks, stepwise, [models[i] for i in chunk])
+            jobs.append((rows, future))
+        parts = [(rows, future.result()) for rows, future in jobs]
+    except (BrokenProcessPool, OSError, RuntimeError) as e:
+        logger.warning(f"Drift process pool unavailable, running serially: {str(e)}")
+        shutdown_drift_pool()
+        return _in_sample_order(*run_drift_factors(sample_pos, sample_codes, blocks, stepwise, models))
+
+    picked = np.concatenate([rows[result[0]] for rows, result in parts])
+    factors = np.concatenate([result[1] for _, result in parts])
+    block_ids = np.concatenate([result[2] for _, result in parts])
+    logger.debug(f"Drift pass over {len(sample_pos)} samples on {len(parts)} workers")
+    return _in_sample_order(picked, factors, block_ids)
+
+def _in_sample_order(picked, factors, block_ids):
+    order = np.lexsort((picked, block_ids))
+    return picked[order], factors[order], block_ids[order]
@@ -1,11 +1,16 @@
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel, QLineEdit, QPushButton, QTableView, QHeaderView, QGroupBox, QMessageBox, QCheckBox, QDialog, QScrollArea, QTabWidget
 from PyQt6.QtCore import Qt,pyqtSignal
-from PyQt6.QtGui import QStandardItemModel, QStandardItem
+from PyQt6.QtGui import QStandardItemModel
 import pandas as pd
 import numpy as np
 import time
 import logging
 
+from utils.checkable_list import CheckableValueList
+from utils.column_stats import ColumnStatsCache
+from utils.array_table_model import ArrayTableModel, ArrayColumn
+from .result import PIVOT_SOURCE_COLUMNS
+
 # Setup logging with minimal output
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
@@ -17,7 +22,7 @@ class ColumnFilterDialog(QDialog):
         self.setWindowTitle(f"Filter Column: {col_name}")
         self.parent = parent
         self.col_name = col_name
-        self.checkboxes = {}
+        self.value_list = None
         self.min_edit = None
         self.max_edit = None
 
@@ -25,17 +30,19 @@ class ColumnFilterDialog(QDialog):
             logger.warning(f"No data available for filtering column {col_name}")
             return
 
-        # Check if column is numeric by attempting conversion
         try:
-            test_series = pd.to_numeric(self.parent.empty_rows[self.col_name], errors='coerce')
-            self.is_numeric_col = test_series.notna().any() and self.col_name != 'Solution Label'
+            self.stats = self.parent.column_stats.get(self.parent.empty_rows, self.col_name)
+            self.is_numeric_col = self.stats.is_numeric
         except Exception as e:
+            self.stats = None
             self.is_numeric_col = False
             logger.error(f"Error checking numeric type for {col_name}: {str(e)}")
 
-        # Get unique values, including NaN
-        unique_values = self.parent.empty_rows[self.col_name].replace(np.nan, 'NaN').astype(str).unique()
-        sorted_unique = sorted(unique_values, key=str)
+        # Unique values as strings, including NaN
+        str_values = {str(v) for v in self.stats.sorted_unique} if self.stats is not None else set()
+        if self.stats is not None and self.stats.nan_count:
+            str_values.add('NaN')
+        sorted_unique = sorted(str_values)
 
         layout = QVBoxLayout(self)
         self.setMinimumSize(400, 400)
@@ -69,38 +76,10 @@ class ColumnFilterDialog(QDialog):
         """Set up the list filter tab with checkboxes for unique values."""
         list_layout = QVBoxLayout(widget)
 
-        self.search_edit = QLineEdit()
-        self.search_edit.setPlaceholderText("Search...")
-        self.search_edit.textChanged.connect(self.filter_checkboxes)
-        list_layout.addWidget(self.search_edit)
-
-        scroll = QScrollArea()
-        scroll_widget = QWidget()
-        scroll_layout = QVBoxLayout(scroll_widget)
-        scroll.setWidget(scroll_widget)
-        scroll.setWidgetResizable(True)
-        list_layout.addWidget(scroll)
-
         curr_filter = self.parent.filters.get(self.col_name, {})
-        selected_values = curr_filter.get('selected_values', set(sorted_unique))
-
-        for val in sorted_unique:
-            cb = QCheckBox(str(val))
-            cb.setChecked(val in selected_values)
-            cb.stateChanged.connect(lambda state, v=val: self.update_filter(v, state))
-            self.checkboxes[val] = cb
-            scroll_layout.addWidget(cb)
-
-        buttons = QHBoxLayout()
-        select_all_btn = QPushButton("Select All")
-        select_all_btn.clicked.connect(lambda: self.toggle_all(True))
-        buttons.addWidget(select_all_btn)
-
-        deselect_all_btn = QPushButton("Deselect All")
-        deselect_all_btn.clicked.connect(lambda: self.toggle_all(False))
-        buttons.addWidget(deselect_all_btn)
-
-        list_layout.addLayout(buttons)
+        selected_values = curr_filter.get('selected_values')
+        self.value_list = CheckableValueList(sorted_unique, selected_values)
+        list_layout.addWidget(self.value_list)
 
     def setup_number_tab(self, widget):
         """Set up the numeric filter tab with min/max inputs."""
@@ -130,10 +109,9 @@ class ColumnFilterDialog(QDialog):
 
         # Display data range
         try:
-            data_range = pd.to_numeric(self.parent.empty_rows[self.col_name], errors='coerce').dropna()
-            if not data_range.empty:
-                min_val = data_range.min()
-                max_val = data_range.max()
+            if self.stats.has_range():
+                min_val = self.stats.min_val
+                max_val = self.stats.max_val
                 range_label = QLabel(f"Data Range: {min_val:.2f} to {max_val:.2f}")
                 range_label.setStyleSheet("color: blue; font-size: 10px;")
                 number_layout.addWidget(range_label)
@@ -149,29 +127,9 @@ class ColumnFilterDialog(QDialog):
         if 'max_val' in curr_filter and curr_filter['max_val'] is not None:
             self.max_edit.setText(str(curr_filter['max_val']))
 
-    def filter_checkboxes(self, text):
-        """Filter checkboxes based on search text."""
-        text = text.lower()
-        for val, cb in self.checkboxes.items():
-            if text == '' or text in str(val).lower():
-                cb.setVisible(True)
-            else:
-                cb.setVisible(False)
-                cb.setChecked(False)
-
-    def update_filter(self, value, state):
-        """Update the checkbox state for a value."""
-        self.checkboxes[value].setChecked(state == Qt.CheckState.Checked.value)
-
-    def toggle_all(self, checked):
-        """Select or deselect all visible checkboxes."""
-        for cb in self.checkboxes.values():
-            if cb.isVisible():
-                cb.setChecked(checked)
-
     def apply_filters(self):
         """Apply the selected filters and update the parent table."""
-        selected_values = {val for val, cb in self.checkboxes.items() if cb.isChecked()}
+        selected_values = self.value_list.checked_values()
         if not selected_values and not self.is_numeric_col:
             QMessageBox.warning(self, "Warning", "No values selected. Please select at least one value.")
             return
@@ -304,6 +262,7 @@ class EmptyCheckFrame(QWidget):
         self.empty_rows = None
         self.mean_percentage_threshold = 70  # Threshold for mean comparison
         self.filters = {}
+        self.column_stats = ColumnStatsCache()
         self.main_elements = {'Na', 'Ca', 'Al', 'Mg', 'K'}  # Default main elements
         self.setup_ui()
 
@@ -534,9 +493,8 @@ class EmptyCheckFrame(QWidget):
 
     def update_empty_table(self):
         """Update the empty rows table, applying any column filters."""
-        model = QStandardItemModel()
         headers = ["Solution Label"] + (list(self.empty_rows.columns[1:]) if self.empty_rows is not None else [])
-        model.setHorizontalHeaderLabels(headers)
+        columns = [ArrayColumn(header, []) for header in headers]
 
         if self.empty_rows is not None and not self.empty_rows.empty:
             df = self.empty_rows.copy()
@@ -593,32 +551,29 @@ class EmptyCheckFrame(QWidget):
             if df.empty:
                 logger.debug("No rows remain after applying all filters")
             else:
-                for _, row in df.iterrows():
-                    solution_label = row['Solution Label']
-                    label_item = QStandardItem(str(solution_label))
-                    label_item.setTextAlignment(Qt.AlignmentFlag.AlignLeft)
-
-                    row_items = [label_item]
-                    for col in df.columns[1:]:
-                        value = row[col]
-                        item = QStandardItem(f"{value:.3f}" if pd.notna(value) else "")
-                        item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
-                        row_items.append(item)
+                columns = [ArrayColumn("Solution Label", df['Solution Label'].to_numpy(dtype=object), alignment=Qt.AlignmentFlag.AlignLeft)]
+                for col in df.columns[1:]:
+                    columns.append(ArrayColumn(col, df[col].to_numpy(dtype=object), decimals=3, alignment=Qt.AlignmentFlag.AlignRight))
 
-                    model.appendRow(row_items)
-
-        self.empty_table.setModel(model)
+        self.empty_table.setModel(ArrayTableModel(columns))
         self.empty_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Interactive)
         self.empty_table.resizeColumnToContents(0)
         for col in range(1, len(headers)):
             self.empty_table.horizontalHeader().setSectionResizeMode(col, QHeaderView.ResizeMode.Fixed)
             self.empty_table.setColumnWidth(col, 100)
 
+    def on_data_change(self, change):
+        """Change-bus handler: the empty rows come from the Results pivot, so only changes to its
+        source columns clear them."""
+        if change.touches(PIVOT_SOURCE_COLUMNS):
+            self.data_changed()
+
     def data_changed(self):
         """Handle data change notifications."""
         self.df_cache = None
         self.empty_rows = None
         self.filters.clear()
+        self.column_stats.clear()
         self.empty_table.setModel(QStandardItemModel())
 
     def reset_state(self):
@@ -627,6 +582,7 @@ class EmptyCheckFrame(QWidget):
         self.empty_rows = None
         self.mean_percentage_threshold = 70
         self.filters.clear()
+        self.column_stats.clear()
         self.main_elements = {'Na', 'Ca', 'Al', 'Mg', 'K'}
         
         if hasattr(self, 'mean_percentage_entry'):
@@ -0,0 +1,279 @@
+import re
+import pandas as pd
+import numpy as np
+import logging
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+logger = logging.getLogger(__name__)
+
+class NumericBlock:
+    """Float64 matrix of a pivot table's element columns plus its labels, built once per pivot version.
+
+    Columns are stored column-major so every element column is a contiguous view.
+    """
+    def __init__(self, df, label_col='Solution Label'):
+        self.source = df
+        self.label_col = label_col
+        self.index = df.index
+        self.all_columns = list(df.columns)
+        self.columns = [c for c in df.columns if c != label_col]
+        self.col_index = {c: i for i, c in enumerate(self.columns)}
+        numeric = df[self.columns].apply(pd.to_numeric, errors='coerce')
+        self.values = np.asfortranarray(numeric.to_numpy(dtype=float)) if self.columns else np.empty((len(df), 0))
+        if label_col in df.columns:
+            self.label_values = df[label_col].to_numpy()
+            self.labels = df[label_col].astype(str).to_numpy(dtype=str)
+        else:
+            self.label_values = np.full(len(df), '', dtype=object)
+            self.labels = np.full(len(df), '', dtype=str)
+
+    def __len__(self):
+        return len(self.index)
+
+    def column(self, name):
+        return self.values[:, self.col_index[name]]
+
+    def to_frame(self):
+        """DataFrame with the original column order, element columns converted to numeric."""
+        data = {}
+        for col in self.all_columns:
+            data[col] = self.label_values if col == self.label_col else self.values[:, self.col_index[col]]
+        return pd.DataFrame(data, index=self.index, columns=self.all_columns)
+
+class ExpressionError(ValueError):
+    pass
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<str>'[^']*'|"[^"]*")
+      | (?P<quoted>`[^`]+`)
+      | (?P<op>>=|<=|==|!=|>|<|=)
+      | (?P<lparen>\()
+      | (?P<rparen>\))
+      | (?P<num>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?(?![^\s()<>=!'"`]))
+      | (?P<word>[^\s()<>=!'"`]+)
+    )""", re.VERBOSE)
+
+_KEYWORDS = {'and', 'or', 'not', 'startswith', 'endswith', 'contains'}
+_STRING_METHODS = {'startswith', 'endswith', 'contains'}
+_NUMEXPR_OPS = {'>': '>', '<': '<', '>=': '>=', '<=': '<=', '==': '==', '=': '==', '!=': '!='}
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        m = _TOKEN_RE.match(text, pos)
+        if m is None or m.end() == pos:
+            raise ExpressionError(f"Unexpected character at position {pos}: {text[pos:pos + 10]!r}")
+        group = m.lastgroup
+        value = m.group(group)
+        kind = value.lower() if group == 'word' and value.lower() in _KEYWORDS else group
+        tokens.append((kind, value, m.start(group), m.end(group)))
+        pos = m.end()
+    return tokens
+
+class _Parser:
+    """Recursive-descent parser producing a small tuple AST:
+
+    ('or', [nodes]) / ('and', [nodes]) / ('not', node) / ('cmp', op, left, right) / ('str', method, pattern)
+    with operands ('col', name) or ('num', value).
+    """
+    def __init__(self, text, columns, label_col):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.columns = list(columns)
+        self.label_col = label_col
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, 'end of expression', len(self.text), len(self.text))
+
+    def advance(self):
+        tok = self.peek()
+        self.pos += 1
+        return tok
+
+    def expect(self, kind):
+        tok = self.advance()
+        if tok[0] != kind:
+            raise ExpressionError(f"Expected {kind} at position {tok[2]}, got {tok[1]!r}")
+        return tok
+
+    def parse(self):
+        if not self.tokens:
+            raise ExpressionError("Empty filter expression")
+        node = self.parse_or()
+        if self.peek()[0] is not None:
+            tok = self.peek()
+            raise ExpressionError(f"Unexpected {tok[1]!r} at position {tok[2]}")
+        return node
+
+    def parse_or(self):
+        nodes = [self.parse_and()]
+        while self.peek()[0] == 'or':
+            self.advance()
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else ('or', nodes)
+
+    def parse_and(self):
+        nodes = [self.parse_not()]
+        while self.peek()[0] == 'and':
+            self.advance()
+            nodes.append(self.parse_not())
+        return nodes[0] if len(nodes) == 1 else ('and', nodes)
+
+    def parse_not(self):
+        if self.peek()[0] == 'not':
+            self.advance()
+            return ('not', self.parse_not())
+        if self.peek()[0] == 'lparen':
+            self.advance()
+            node = self.parse_or()
+            self.expect('rparen')
+            return node
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        left = self.parse_operand()
+        tok = self.advance()
+        if tok[0] in _STRING_METHODS or (left[0] == 'label' and tok[0] == 'op'):
+            if left[0] != 'label':
+                raise ExpressionError(f"'{tok[1]}' can only be used with label")
+            method = tok[0] if tok[0] in _STRING_METHODS else _NUMEXPR_OPS.get(tok[1])
+            if method not in _STRING_METHODS and method not in ('==', '!='):
+                raise ExpressionError(f"Operator {tok[1]!r} is not supported for label")
+            pattern = self.expect('str')[1][1:-1]
+            return ('str', method, pattern)
+        if tok[0] != 'op':
+            raise ExpressionError(f"Expected comparison operator at position {tok[2]}, got {tok[1]!r}")
+        right = self.parse_operand()
+        if left[0] == 'label' or right[0] == 'label':
+            raise ExpressionError("label must be compared with a quoted string")
+        if left[0] == 'num' and right[0] == 'num':
+            raise ExpressionError(f"Comparison at position {tok[2]} does not reference a column")
+        return ('cmp', _NUMEXPR_OPS[tok[1]], left, right)
+
+    def parse_operand(self):
+        kind, value, start, end = self.peek()
+        if kind == 'num':
+            self.advance()
+            return ('num', float(value))
+        if kind == 'quoted':
+            self.advance()
+            return self.resolve(value[1:-1])
+        if kind == 'word':
+            self.advance()
+            # Column names contain spaces and wavelengths (e.g. "Fe 238.204"); take the raw source span
+            while self.peek()[0] in ('word', 'num'):
+                end = self.advance()[3]
+            return self.resolve(self.text[start:end])
+        raise ExpressionError(f"Expected column or number at position {start}, got {value!r}")
+
+    def resolve(self, name):
+        name = ' '.join(name.split())
+        if name.lower() in ('label', self.label_col.lower()):
+            return ('label',)
+        if name in self.columns:
+            return ('col', name)
+        lowered = name.lower()
+        matches = [c for c in self.columns if str(c).lower() == lowered]
+        if not matches:
+            matches = [c for c in self.columns if str(c).lower().startswith(lowered)]
+        if len(matches) == 1:
+            return ('col', matches[0])
+        if not matches:
+            raise ExpressionError(f"Unknown column: {name!r}")
+        raise ExpressionError(f"Column {name!r} is ambiguous: {', '.join(map(str, matches[:5]))}")
+
+class CompiledFilter:
+    """Filter expression parsed once and evaluated as a single vectorized mask over a NumericBlock.
+
+    With numexpr installed the whole expression is evaluated in one blocked pass without
+    intermediate arrays; otherwise it falls back to in-place NumPy operations.
+    """
+    def __init__(self, text, columns, label_col='Solution Label'):
+        self.text = text
+        self.tree = _Parser(text, columns, label_col).parse()
+        self.columns = []
+        self._string_preds = []
+        self._numexpr_source = self._to_numexpr(self.tree)
+
+    def _to_numexpr(self, node):
+        kind = node[0]
+        if kind in ('and', 'or'):
+            joiner = ' & ' if kind == 'and' else ' | '
+            return '(' + joiner.join(self._to_numexpr(n) for n in node[1]) + ')'
+        if kind == 'not':
+            return f"(~{self._to_numexpr(node[1])})"
+        if kind == 'str':
+            self._string_preds.append((node[1], node[2]))
+            return f"s{len(self._string_preds) - 1}"
+        _, op, left, right = node
+        return f"({self._operand_source(left)} {op} {self._operand_source(right)})"
+
+    def _operand_source(self, operand):
+        if operand[0] == 'num':
+            return repr(operand[1])
+        if operand[1] not in self.columns:
+            self.columns.append(operand[1])
+        return f"c{self.columns.index(operand[1])}"
+
+    def _string_mask(self, labels, method, pattern):
+        if method == 'startswith':
+            return np.char.startswith(labels, pattern)
+        if method == 'endswith':
+            return np.char.endswith(labels, pattern)
+        if method == 'contains':
+            return np.char.find(labels, pattern) >= 0
+        if method == '==':
+            return labels == pattern
+        return labels != pattern
+
+    def evaluate(self, block):
+        missing = [c for c in self.columns if c not in block.col_index]
+        if missing:
+            raise ExpressionError(f"Column(s) no longer in table: {', '.join(map(str, missing))}")
+        local_dict = {f"c{i}": block.column(c) for i, c in enumerate(self.columns)}
+        if numexpr is not None:
+            for i, (method, pattern) in enumerate(self._string_preds):
+                local_dict[f"s{i}"] = self._string_mask(block.labels, method, pattern)
+            mask = numexpr.evaluate(self._numexpr_source, local_dict=local_dict)
+            return np.broadcast_to(mask, (len(block),)).astype(bool, copy=False)
+        return self._evaluate_numpy(self.tree, local_dict, block.labels)
+
+    def _evaluate_numpy(self, node, local_dict, labels):
+        kind = node[0]
+        if kind in ('and', 'or'):
+            mask = np.array(self._evaluate_numpy(node[1][0], local_dict, labels), dtype=bool, copy=True)
+            for child in node[1][1:]:
+                if kind == 'and':
+                    mask &= self._evaluate_numpy(child, local_dict, labels)
+                else:
+                    mask |= self._evaluate_numpy(child, local_dict, labels)
+            return mask
+        if kind == 'not':
+            return ~self._evaluate_numpy(node[1], local_dict, labels)
+        if kind == 'str':
+            return self._string_mask(labels, node[1], node[2])
+        _, op, left, right = node
+        a = left[1] if left[0] == 'num' else local_dict[f"c{self.columns.index(left[1])}"]
+        b = right[1] if right[0] == 'num' else local_dict[f"c{self.columns.index(right[1])}"]
+        with np.errstate(invalid='ignore'):
+            if op == '>':
+                result = np.greater(a, b)
+            elif op == '<':
+                result = np.less(a, b)
+            elif op == '>=':
+                result = np.greater_equal(a, b)
+            elif op == '<=':
+                result = np.less_equal(a, b)
+            elif op == '==':
+                result = np.equal(a, b)
+            else:
+                result = np.not_equal(a, b)
+        return np.broadcast_to(result, (len(labels),))
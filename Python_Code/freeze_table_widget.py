@@ -1,108 +1,129 @@
 from PyQt6.QtWidgets import QTableView, QAbstractItemView, QHeaderView
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QColor
+from PyQt6.QtCore import Qt, pyqtSignal
+import logging
+
+logger = logging.getLogger(__name__)
+
+FROZEN_STYLE = """
+    QTableView {
+        border: none;
+        selection-background-color: #999;
+    }
+"""
 
 class FreezeTableWidget(QTableView):
-    """A QTableView with a frozen first column that does not scroll horizontally."""
-    def __init__(self, model, parent=None):
+    """A QTableView whose first frozen_columns columns stay in place while the rest scroll horizontally.
+
+    The frozen part is a second view over the same model and selection model, stacked over the
+    main viewport once. Vertical scroll position, row heights and frozen column widths are mirrored
+    between the two views; each view scrolls its own viewport, so scrolling does not trigger any
+    extra paints. Clicks on the frozen header are re-emitted as frozen_header_clicked(section).
+    """
+    frozen_header_clicked = pyqtSignal(int)
+
+    def __init__(self, model=None, parent=None, frozen_columns=1):
         super().__init__(parent)
+        self.frozen_columns = frozen_columns
         self.frozenTableView = QTableView(self)
-        self.setModel(model)
-        self.frozenTableView.setModel(model)
+        self._reset_model = None
         self.init()
+        self.setModel(model)
 
         self.horizontalHeader().sectionResized.connect(self.updateSectionWidth)
         self.verticalHeader().sectionResized.connect(self.updateSectionHeight)
         self.frozenTableView.verticalScrollBar().valueChanged.connect(self.frozenVerticalScroll)
         self.verticalScrollBar().valueChanged.connect(self.mainVerticalScroll)
-        self.model().modelReset.connect(self.resetFrozenTable)
+        self.frozenTableView.horizontalHeader().sectionClicked.connect(self.frozen_header_clicked)
 
     def init(self):
         self.frozenTableView.setFocusPolicy(Qt.FocusPolicy.NoFocus)
         self.frozenTableView.verticalHeader().hide()
         self.frozenTableView.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
-        self.viewport().stackUnder(self.frozenTableView)
-        
-        self.frozenTableView.setStyleSheet("""
-            QTableView { 
-                border: none;
-                selection-background-color: #999;
-            }
-        """)
-        self.frozenTableView.setSelectionModel(self.selectionModel())
-        
-        self.updateFrozenColumns()  # Initialize frozen columns
-        
+        self.frozenTableView.setStyleSheet(FROZEN_STYLE)
         self.frozenTableView.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.frozenTableView.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.frozenTableView.show()
-        self.frozenTableView.viewport().repaint()
-        
-        self.setHorizontalScrollMode(QAbstractItemView.ScrollMode.ScrollPerItem)
-        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerItem)
-        self.frozenTableView.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerItem)
-        
-        self.updateFrozenTableGeometry()
+        self.viewport().stackUnder(self.frozenTableView)
+        self.set_scroll_mode(QAbstractItemView.ScrollMode.ScrollPerItem)
+
+    def set_scroll_mode(self, mode):
+        """Use the same scroll mode in both views so their rows stay aligned."""
+        self.setHorizontalScrollMode(mode)
+        self.setVerticalScrollMode(mode)
+        self.frozenTableView.setHorizontalScrollMode(mode)
+        self.frozenTableView.setVerticalScrollMode(mode)
+
+    def set_frozen_columns(self, count):
+        self.frozen_columns = count
+        self.update_frozen_columns()
 
-    def updateFrozenColumns(self):
-        """Ensure only the first column is visible in the frozen table."""
-        for col in range(self.model().columnCount()):
-            self.frozenTableView.setColumnHidden(col, col != 0)
-        if self.model().columnCount() > 0:
-            self.frozenTableView.setColumnWidth(0, self.columnWidth(0) or 100)
+    def setModel(self, model):
+        super().setModel(model)
+        frozen = getattr(self, 'frozenTableView', None)
+        if frozen is None:
+            return
+        frozen.setModel(model)
+        if model is not None:
+            frozen.setSelectionModel(self.selectionModel())
+            if model is not self._reset_model:
+                model.modelReset.connect(self.update_frozen_columns)
+                self._reset_model = model
+        self.update_frozen_columns()
 
-    def resetFrozenTable(self):
-        """Handle model reset to ensure frozen table is correctly updated."""
-        self.updateFrozenColumns()
+    def update_frozen_columns(self):
+        model = self.model()
+        if model is None or model.columnCount() < self.frozen_columns:
+            self.frozenTableView.hide()
+            return
+        for col in range(model.columnCount()):
+            self.frozenTableView.setColumnHidden(col, col >= self.frozen_columns)
+        for col in range(self.frozen_columns):
+            self.frozenTableView.setColumnWidth(col, self.columnWidth(col) or 100)
+        self.frozenTableView.show()
         self.updateFrozenTableGeometry()
 
+    def frozen_width(self):
+        return sum(self.columnWidth(col) for col in range(self.frozen_columns))
+
     def updateSectionWidth(self, logicalIndex, oldSize, newSize):
-        if logicalIndex == 0:
-            self.frozenTableView.setColumnWidth(0, newSize)
+        if logicalIndex < self.frozen_columns:
+            self.frozenTableView.setColumnWidth(logicalIndex, newSize)
             self.updateFrozenTableGeometry()
-            self.frozenTableView.viewport().repaint()
 
     def updateSectionHeight(self, logicalIndex, oldSize, newSize):
         self.frozenTableView.setRowHeight(logicalIndex, newSize)
-        self.frozenTableView.viewport().repaint()
 
     def frozenVerticalScroll(self, value):
-        self.viewport().stackUnder(self.frozenTableView)
+        # setValue is a no-op when the value is unchanged, so the two views cannot ping-pong
         self.verticalScrollBar().setValue(value)
-        self.frozenTableView.viewport().repaint()
-        self.viewport().update()
 
     def mainVerticalScroll(self, value):
-        self.viewport().stackUnder(self.frozenTableView)
         self.frozenTableView.verticalScrollBar().setValue(value)
-        self.frozenTableView.viewport().repaint()
-        self.viewport().update()
 
     def updateFrozenTableGeometry(self):
+        model = self.model()
+        if model is None or model.columnCount() < self.frozen_columns:
+            return
         self.frozenTableView.setGeometry(
             self.verticalHeader().width() + self.frameWidth(),
             self.frameWidth(),
-            self.columnWidth(0),
+            self.frozen_width(),
             self.viewport().height() + self.horizontalHeader().height()
         )
-        self.frozenTableView.viewport().repaint()
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
         self.updateFrozenTableGeometry()
-        self.frozenTableView.viewport().repaint()
 
     def moveCursor(self, cursorAction, modifiers):
         current = super().moveCursor(cursorAction, modifiers)
-        if cursorAction == QAbstractItemView.CursorAction.MoveLeft and current.column() > 0:
+        if cursorAction == QAbstractItemView.CursorAction.MoveLeft and current.column() >= self.frozen_columns:
             visual_x = self.visualRect(current).topLeft().x()
-            if visual_x < self.frozenTableView.columnWidth(0):
-                new_value = self.horizontalScrollBar().value() + visual_x - self.frozenTableView.columnWidth(0)
+            frozen_width = self.frozen_width()
+            if visual_x < frozen_width:
+                new_value = self.horizontalScrollBar().value() + visual_x - frozen_width
                 self.horizontalScrollBar().setValue(int(new_value))
-        self.frozenTableView.viewport().repaint()
         return current
 
     def scrollTo(self, index, hint=QAbstractItemView.ScrollHint.EnsureVisible):
-        if index.column() > 0:
+        if index.column() >= self.frozen_columns:
             super().scrollTo(index, hint)
-        self.frozenTableView.viewport().repaint()
\ No newline at end of file
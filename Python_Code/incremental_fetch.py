@@ -0,0 +1,38 @@
+from PyQt6.QtCore import QModelIndex
+import logging
+
+logger = logging.getLogger(__name__)
+
+class IncrementalFetchMixin:
+    """canFetchMore/fetchMore for table models whose rows are already in memory.
+
+    The view only sees the first FETCH_BATCH rows after a reset and asks for more as it
+    scrolls, so it never lays out the whole table up front. Models call reset_fetch(total)
+    whenever their row count changes and return self._fetched from rowCount().
+    """
+    FETCH_BATCH = 500
+
+    def reset_fetch(self, total):
+        self._total_rows = total
+        self._fetched = min(total, self.FETCH_BATCH)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._fetched < self._total_rows
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        self.fetch_to(self._fetched + self.FETCH_BATCH - 1)
+
+    def fetch_to(self, row):
+        """Make sure rows up to and including row are visible to the view."""
+        last = min(row, self._total_rows - 1)
+        if last < self._fetched:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, last)
+        self._fetched = last + 1
+        self.endInsertRows()
+        logger.debug(f"Fetched rows up to {last} of {self._total_rows}")
+
+    def fetch_all(self):
+        self.fetch_to(self._total_rows - 1)
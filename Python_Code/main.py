@@ -1,16 +1,22 @@
 # main.py
 import sys
 import logging
+import multiprocessing
 from PyQt6.QtWidgets import QApplication
 from login_window import LoginWindow
 from app import MainWindow
+from utils.drift_models import start_drift_pool, shutdown_drift_pool
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 if __name__ == "__main__":
+    # worker processes of the drift pool must not re-run the app in frozen builds
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
+    start_drift_pool()
+    app.aboutToQuit.connect(shutdown_drift_pool)
 
     login = LoginWindow()
 
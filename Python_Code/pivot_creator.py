@@ -171,7 +171,6 @@ class PivotCreator:
 
             self.pivot_tab.pivot_data = pivot_df
             self.pivot_tab.column_widths.clear()
-            self.pivot_tab.cached_formatted.clear()
             # self.pivot_tab._inline_crm_rows.clear()
             # self.pivot_tab._inline_crm_rows_display.clear()
             self.pivot_tab.row_filter_values.clear()
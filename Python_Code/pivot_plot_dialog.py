@@ -625,6 +625,7 @@ class PivotPlotWindow(QWidget):
                         'blank': 0.0
                     }
 
+            self.parent.results_frame.column_stats.invalidate(column_to_correct)
             self.logger.debug(f"Applied correction to pivot_data[{column_to_correct}]: blank={self.preview_blank:.3f}, scale={self.preview_scale:.3f}, range=[{self.scale_range_min}, {self.scale_range_max}], scale_above_50={self.scale_above_50.isChecked()}")
 
             original_df = self.parent.app.get_data()
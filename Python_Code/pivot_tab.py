@@ -1,15 +1,18 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QMessageBox, QComboBox, QLabel, 
-    QFrame, QLineEdit, QCheckBox, QDialog, QHeaderView, QTableView, QScrollArea, QFileDialog,
-    QTabWidget, QAbstractItemView
+    QFrame, QLineEdit, QCheckBox, QDialog, QHeaderView, QTableView, QFileDialog,
+    QTabWidget
 )
 from PyQt6.QtGui import QFont, QPixmap, QColor
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, pyqtSignal
 from .freeze_table_widget import FreezeTableWidget
 from .pivot_table_model import PivotTableModel
 from .pivot_creator import PivotCreator
 from .pivot_exporter import PivotExporter
 from .oxide_factors import oxide_factors
+from utils.checkable_list import CheckableValueList
+from utils.column_stats import ColumnStatsCache
+from utils.expression_filter import NumericBlock, CompiledFilter, ExpressionError
 import pandas as pd
 import logging
 import numpy as np
@@ -30,7 +33,7 @@ class ColumnFilterDialog(QDialog):
         self.setWindowTitle(f"Filter Column: {col_name}")
         self.parent = parent
         self.col_name = col_name
-        self.checkboxes = {}
+        self.value_list = None
         self.min_edit = None
         self.max_edit = None
 
@@ -38,20 +41,17 @@ class ColumnFilterDialog(QDialog):
             logger.warning(f"No pivot data available for filtering column {col_name}")
             return
 
-        # Check if column is numeric by attempting conversion
+        # Stats are computed once per pivot version and shared by every dialog opened on it
         try:
-            test_series = pd.to_numeric(self.parent.pivot_data[self.col_name], errors='coerce')
-            self.is_numeric_col = test_series.notna().any() and self.col_name != 'Solution Label'
+            self.stats = self.parent.column_stats.get(self.parent.pivot_data, self.col_name)
+            self.is_numeric_col = self.stats.is_numeric
             logger.debug(f"Column {col_name} is_numeric after coercion: {self.is_numeric_col}")
         except Exception as e:
+            self.stats = None
             self.is_numeric_col = False
             logger.error(f"Error checking numeric type for {col_name}: {str(e)}")
 
-        unique_values = self.parent.pivot_data[self.col_name].dropna().unique()
-        if self.is_numeric_col:
-            sorted_unique = sorted(unique_values, key=lambda x: float(x) if self.is_numeric(str(x)) else float('inf'))
-        else:
-            sorted_unique = sorted(unique_values, key=str)
+        sorted_unique = self.stats.sorted_unique if self.stats is not None else []
 
         layout = QVBoxLayout(self)
         self.setMinimumSize(400, 400)  # Ensure dialog is large enough to show tabs
@@ -87,38 +87,10 @@ class ColumnFilterDialog(QDialog):
     def setup_list_tab(self, widget, sorted_unique):
         list_layout = QVBoxLayout(widget)
 
-        self.search_edit = QLineEdit()
-        self.search_edit.setPlaceholderText("Search...")
-        self.search_edit.textChanged.connect(self.filter_checkboxes)
-        list_layout.addWidget(self.search_edit)
-
-        scroll = QScrollArea()
-        scroll_widget = QWidget()
-        scroll_layout = QVBoxLayout(scroll_widget)
-        scroll.setWidget(scroll_widget)
-        scroll.setWidgetResizable(True)
-        list_layout.addWidget(scroll)
-
         curr_filter = self.parent.filters.get(self.col_name, {})
-        selected_values = curr_filter.get('selected_values', set(sorted_unique))  # Default to all selected
-
-        for val in sorted_unique:
-            cb = QCheckBox(str(val))
-            cb.setChecked(val in selected_values)
-            cb.stateChanged.connect(lambda state, v=val: self.update_filter(v, state))
-            self.checkboxes[val] = cb
-            scroll_layout.addWidget(cb)
-
-        buttons = QHBoxLayout()
-        select_all_btn = QPushButton("Select All")
-        select_all_btn.clicked.connect(lambda: self.toggle_all(True))
-        buttons.addWidget(select_all_btn)
-
-        deselect_all_btn = QPushButton("Deselect All")
-        deselect_all_btn.clicked.connect(lambda: self.toggle_all(False))
-        buttons.addWidget(deselect_all_btn)
-
-        list_layout.addLayout(buttons)
+        selected_values = curr_filter.get('selected_values')  # Default to all selected
+        self.value_list = CheckableValueList(sorted_unique, selected_values)
+        list_layout.addWidget(self.value_list)
 
     def setup_number_tab(self, widget):
         number_layout = QVBoxLayout(widget)
@@ -147,10 +119,9 @@ class ColumnFilterDialog(QDialog):
 
         # Add info label showing current data range
         try:
-            data_range = pd.to_numeric(self.parent.pivot_data[self.col_name], errors='coerce').dropna()
-            if not data_range.empty:
-                min_val = data_range.min()
-                max_val = data_range.max()
+            if self.stats.has_range():
+                min_val = self.stats.min_val
+                max_val = self.stats.max_val
                 range_label = QLabel(f"Data Range: {min_val:.2f} to {max_val:.2f}")
                 range_label.setStyleSheet("color: blue; font-size: 10px;")
                 number_layout.addWidget(range_label)
@@ -167,25 +138,6 @@ class ColumnFilterDialog(QDialog):
         if 'max_val' in curr_filter and curr_filter['max_val'] is not None:
             self.max_edit.setText(str(curr_filter['max_val']))
 
-    def filter_checkboxes(self, text):
-        text = text.lower()
-        for val, cb in self.checkboxes.items():
-            if text == '' or text in str(val).lower():
-                cb.setVisible(True)
-                # Comment out automatic check to preserve previous selections
-                # cb.setChecked(True)  # Automatically check matching items
-            else:
-                cb.setVisible(False)
-                cb.setChecked(False)
-
-    def update_filter(self, value, state):
-        self.checkboxes[value].setChecked(state == Qt.CheckState.Checked.value)
-
-    def toggle_all(self, checked):
-        for cb in self.checkboxes.values():
-            if cb.isVisible():
-                cb.setChecked(checked)
-
     def is_numeric(self, value):
         try:
             float(value)
@@ -194,7 +146,7 @@ class ColumnFilterDialog(QDialog):
             return False
 
     def apply_filters(self):
-        selected_values = {val for val, cb in self.checkboxes.items() if cb.isChecked()}
+        selected_values = self.value_list.checked_values()
         if not selected_values and not self.is_numeric_col:
             QMessageBox.warning(self, "Warning", "No values selected. Please select at least one value.")
             return
@@ -211,9 +163,8 @@ class ColumnFilterDialog(QDialog):
                     logger.debug(f"Max filter set for {self.col_name}: {max_val}")
                 # Validate min/max against data range
                 if min_val is not None or max_val is not None:
-                    data_range = pd.to_numeric(self.parent.pivot_data[self.col_name], errors='coerce').dropna()
-                    if not data_range.empty:
-                        min_data, max_data = data_range.min(), data_range.max()
+                    if self.stats.has_range():
+                        min_data, max_data = self.stats.min_val, self.stats.max_val
                         if (min_val is not None and min_val > max_data) or (max_val is not None and max_val < min_data):
                             QMessageBox.warning(self, "Invalid Filter", f"Filter range ({min_val}, {max_val}) is outside data range ({min_data:.2f}, {max_data:.2f})")
                             return
@@ -302,119 +253,10 @@ class PlotOptionsDialog(QDialog):
             parent.plot_all_columns(selected_item)
         self.accept()
 
-class FreezeTableWidget(QTableView):
-    """A QTableView with a frozen first column that does not scroll horizontally."""
-    def __init__(self, model, pivot_tab=None):
-        super().__init__(pivot_tab)
-        self.pivot_tab = pivot_tab
-        self.frozenTableView = QTableView(self)
-        self.setModel(model)
-        self.frozenTableView.setModel(model)
-        self.init()
-
-        self.horizontalHeader().sectionResized.connect(self.updateSectionWidth)
-        self.verticalHeader().sectionResized.connect(self.updateSectionHeight)
-        self.frozenTableView.horizontalHeader().sectionClicked.connect(self.on_frozen_header_clicked)
-        self.frozenTableView.verticalScrollBar().valueChanged.connect(self.frozenVerticalScroll)
-        self.verticalScrollBar().valueChanged.connect(self.mainVerticalScroll)
-        self.model().modelReset.connect(self.resetFrozenTable)
-
-    def init(self):
-        self.frozenTableView.setFocusPolicy(Qt.FocusPolicy.NoFocus)
-        self.frozenTableView.verticalHeader().hide()
-        self.frozenTableView.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
-        self.viewport().stackUnder(self.frozenTableView)
-        
-        self.frozenTableView.setStyleSheet("""
-            QTableView { 
-                border: none;
-                selection-background-color: #999;
-            }
-        """)
-        self.frozenTableView.setSelectionModel(self.selectionModel())
-        
-        self.updateFrozenColumns()
-        
-        self.frozenTableView.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.frozenTableView.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.frozenTableView.show()
-        self.frozenTableView.viewport().repaint()
-        
-        self.setHorizontalScrollMode(QAbstractItemView.ScrollMode.ScrollPerItem)
-        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerItem)
-        self.frozenTableView.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerItem)
-        
-        self.updateFrozenTableGeometry()
-
-    def updateFrozenColumns(self):
-        for col in range(self.model().columnCount()):
-            self.frozenTableView.setColumnHidden(col, col != 0)
-        if self.model().columnCount() > 0:
-            self.frozenTableView.setColumnWidth(0, self.columnWidth(0) or 100)
-
-    def resetFrozenTable(self):
-        self.updateFrozenColumns()
-        self.updateFrozenTableGeometry()
-
-    def updateSectionWidth(self, logicalIndex, oldSize, newSize):
-        if logicalIndex == 0:
-            self.frozenTableView.setColumnWidth(0, newSize)
-            self.updateFrozenTableGeometry()
-            self.frozenTableView.viewport().repaint()
-
-    def updateSectionHeight(self, logicalIndex, oldSize, newSize):
-        self.frozenTableView.setRowHeight(logicalIndex, newSize)
-        self.frozenTableView.viewport().repaint()
-
-    def frozenVerticalScroll(self, value):
-        self.viewport().stackUnder(self.frozenTableView)
-        self.verticalScrollBar().setValue(value)
-        self.frozenTableView.viewport().repaint()
-        self.viewport().update()
-
-    def mainVerticalScroll(self, value):
-        self.viewport().stackUnder(self.frozenTableView)
-        self.frozenTableView.verticalScrollBar().setValue(value)
-        self.frozenTableView.viewport().repaint()
-        self.viewport().update()
-
-    def updateFrozenTableGeometry(self):
-        self.frozenTableView.setGeometry(
-            self.verticalHeader().width() + self.frameWidth(),
-            self.frameWidth(),
-            self.columnWidth(0),
-            self.viewport().height() + self.horizontalHeader().height()
-        )
-        self.frozenTableView.viewport().repaint()
-
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        self.updateFrozenTableGeometry()
-        self.frozenTableView.viewport().repaint()
-
-    def moveCursor(self, cursorAction, modifiers):
-        current = super().moveCursor(cursorAction, modifiers)
-        if cursorAction == QAbstractItemView.CursorAction.MoveLeft and current.column() > 0:
-            visual_x = self.visualRect(current).topLeft().x()
-            if visual_x < self.frozenTableView.columnWidth(0):
-                new_value = self.horizontalScrollBar().value() + visual_x - self.frozenTableView.columnWidth(0)
-                self.horizontalScrollBar().setValue(int(new_value))
-        self.frozenTableView.viewport().repaint()
-        return current
-
-    def scrollTo(self, index, hint=QAbstractItemView.ScrollHint.EnsureVisible):
-        if index.column() > 0:
-            super().scrollTo(index, hint)
-        self.frozenTableView.viewport().repaint()
-
-    def on_frozen_header_clicked(self, section):
-        if section == 0 and self.pivot_tab:
-            col_name = self.model().headerData(section, Qt.Orientation.Horizontal)
-            if col_name:
-                self.pivot_tab.on_header_clicked(section)
-
 class PivotTab(QWidget):
     """PivotTab with inline duplicate rows, difference coloring, plot visualization, and editable cells."""
+    cell_edited = pyqtSignal(object, str)  # (Solution Label, column) of an in-place table edit
+
     def __init__(self, app, parent_frame):
         super().__init__(parent_frame)
         self.logger = logging.getLogger(__name__)
@@ -426,14 +268,17 @@ class PivotTab(QWidget):
         self.row_filter_values = {}
         self.column_filter_values = {}
         self.filters = {}
+        self.expression_filter = None
+        self._numeric_block = None
         self.original_df = None
         self.column_widths = {}
-        self.cached_formatted = {}
+        self.column_stats = ColumnStatsCache()
         self.current_view_df = None
         self._inline_duplicates = {}
         self._inline_duplicates_display = {}
         self.current_plot_dialog = None
         self.search_var = QLineEdit()
+        self.expression_edit = QLineEdit()
         self.row_filter_field = QComboBox()
         self.column_filter_field = QComboBox()
         self.decimal_places = QComboBox()
@@ -445,6 +290,7 @@ class PivotTab(QWidget):
         self.pivot_creator = PivotCreator(self)
         self.pivot_exporter = PivotExporter(self)
         self.setup_ui()
+        self.cell_edited.connect(self.on_cell_edited)
 
     def setup_ui(self):
         self.logger.debug("Setting up PivotTab UI")
@@ -488,6 +334,13 @@ class PivotTab(QWidget):
         self.search_var.setFixedWidth(100)
         self.search_var.textChanged.connect(self.update_pivot_display)
         subtab_layout.addWidget(self.search_var)
+
+        self.expression_edit.setPlaceholderText("Fe 238 > 1000 and label startswith 'RM'")
+        self.expression_edit.setToolTip("Filter expression: compare columns with numbers or other columns, "
+                                        "use label startswith/endswith/contains '...', combine with and/or/not")
+        self.expression_edit.setFixedWidth(260)
+        self.expression_edit.returnPressed.connect(self.apply_expression_filter)
+        subtab_layout.addWidget(self.expression_edit)
         
         row_filter_btn = QPushButton("Row Filter")
         row_filter_btn.setFixedSize(70, 30)
@@ -539,7 +392,8 @@ class PivotTab(QWidget):
         content_layout.setSpacing(0)
         content_area.setLayout(content_layout)
 
-        self.table_view = FreezeTableWidget(PivotTableModel(self), pivot_tab=self)
+        self.table_view = FreezeTableWidget(PivotTableModel(self), parent=self)
+        self.table_view.frozen_header_clicked.connect(self.on_header_clicked)
         self.table_view.setAlternatingRowColors(True)
         self.table_view.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.table_view.setSortingEnabled(True)
@@ -671,9 +525,34 @@ class PivotTab(QWidget):
         self._inline_duplicates_display.clear()
         self.update_pivot_display()
 
+    def get_numeric_block(self):
+        """Numeric view of pivot_data, rebuilt only when pivot_data is replaced or edited in place."""
+        if self._numeric_block is None or self._numeric_block.source is not self.pivot_data:
+            self._numeric_block = NumericBlock(self.pivot_data)
+        return self._numeric_block
+
+    def apply_expression_filter(self):
+        text = self.expression_edit.text().strip()
+        if not text:
+            self.expression_filter = None
+            self.update_pivot_display()
+            return
+        if self.pivot_data is None:
+            QMessageBox.warning(self, "Warning", "No data to filter!")
+            return
+        try:
+            self.expression_filter = CompiledFilter(text, self.get_numeric_block().columns)
+            self.logger.debug(f"Compiled filter expression: {text}")
+        except ExpressionError as e:
+            QMessageBox.warning(self, "Invalid Filter", str(e))
+            return
+        self.update_pivot_display()
+
     def clear_all_filters(self):
         self.logger.debug("Clearing all column filters")
         self.filters.clear()
+        self.expression_filter = None
+        self.expression_edit.clear()
         self.update_pivot_display()
         QMessageBox.information(self, "Filters Cleared", "All column filters have been cleared.")
 
@@ -683,18 +562,11 @@ class PivotTab(QWidget):
             self.logger.warning("No data loaded for pivot display")
             self.status_label.setText("No data loaded")
             self.table_view.setModel(None)
-            self.table_view.frozenTableView.setModel(None)
             return
 
-        # Convert potentially numeric columns to numeric type
-        df = self.pivot_data.copy()
-        for col in df.columns:
-            if col != 'Solution Label':
-                try:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-                    # self.logger.debug(f"Converted column {col} to numeric")
-                except Exception as e:
-                    self.logger.debug(f"Column {col} not converted to numeric: {str(e)}")
+        # Numeric columns are converted once per pivot version
+        block = self.get_numeric_block()
+        df = block.to_frame()
 
         self.logger.debug(f"Pivot data shape before filtering: {df.shape}")
 
@@ -726,6 +598,13 @@ class PivotTab(QWidget):
                     except Exception as e:
                         self.logger.error(f"Error applying selected values filter on {col}: {str(e)}")
 
+        if self.expression_filter is not None:
+            try:
+                mask &= self.expression_filter.evaluate(block)
+                self.logger.debug(f"Applied expression filter '{self.expression_filter.text}', rows left: {mask.sum()}")
+            except ExpressionError as e:
+                self.logger.error(f"Error applying expression filter: {str(e)}")
+
         # Apply combined mask
         try:
             df = df[mask]
@@ -780,10 +659,6 @@ class PivotTab(QWidget):
 
         model = PivotTableModel(self, df, combined_rows)
         self.table_view.setModel(model)
-        self.table_view.frozenTableView.setModel(model)
-        self.table_view.updateFrozenColumns()
-        self.table_view.model().layoutChanged.emit()
-        self.table_view.frozenTableView.model().layoutChanged.emit()
         self.table_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
         for col, width in self.column_widths.items():
             if col < len(df.columns):
@@ -898,7 +773,10 @@ class PivotTab(QWidget):
         self.solution_label_order = None
         self.element_order = None
         self.column_widths.clear()
-        self.cached_formatted.clear()
+        self.column_stats.clear()
+        self._numeric_block = None
+        self.expression_filter = None
+        self.expression_edit.clear()
         self.original_df = None
         self._inline_duplicates.clear()
         self._inline_duplicates_display.clear()
@@ -986,8 +864,15 @@ class PivotTab(QWidget):
         if self.pivot_data is not None and column in self.pivot_data.columns and column not in self.original_pivot_data_backups:
             self.original_pivot_data_backups[column] = self.pivot_data[column].copy()
 
+    def on_cell_edited(self, solution_label, column):
+        """Drop caches that depend on a column edited in place from the table."""
+        self.column_stats.invalidate(column)
+        self._numeric_block = None
+
     def restore_column(self, column):
         if column in self.original_pivot_data_backups:
             self.pivot_data[column] = self.original_pivot_data_backups[column].copy()
             del self.original_pivot_data_backups[column]
+            self.column_stats.invalidate(column)
+            self._numeric_block = None
             self.update_pivot_display()
\ No newline at end of file
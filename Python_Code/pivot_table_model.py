@@ -1,18 +1,38 @@
 from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
 from PyQt6.QtGui import QColor
 import pandas as pd
+import numpy as np
 import logging
+from utils.display_format import FormattedColumnCache, format_column
+from utils.incremental_fetch import IncrementalFetchMixin
 
-class PivotTableModel(QAbstractTableModel):
-    """Custom table model for pivot table, optimized for large datasets with editable cells."""
+# Row kinds in the combined (pivot + inline) row layout
+ROW_PIVOT = 0
+ROW_INLINE = 1  # CRM or duplicate row
+ROW_DIFF = 2
+
+CRM_ROW_COLOR = QColor("#FFF5E4")
+IN_RANGE_COLOR = QColor("#ECFFC4")
+OUT_RANGE_COLOR = QColor("#FFCCCC")
+DIFF_ROW_COLOR = QColor("#E6E6FA")
+EVEN_ROW_COLOR = QColor("#f9f9f9")
+ODD_ROW_COLOR = QColor("white")
+
+class PivotTableModel(IncrementalFetchMixin, QAbstractTableModel):
+    """Custom table model for pivot table, optimized for large datasets with editable cells.
+
+    Row layout, label lookup, cell values and the decimal setting are precomputed when the
+    model is built, so data() does only array indexing. Rows are handed to the view in batches.
+    """
     def __init__(self, pivot_tab, df=None, crm_rows=None):
         super().__init__()
         self.logger = logging.getLogger(__name__)
         self.pivot_tab = pivot_tab
         self._df = df if df is not None else pd.DataFrame()
         self._crm_rows = crm_rows if crm_rows is not None else []
-        self._row_info = []
         self._column_widths = {}
+        self._version = 0
+        self._formatted = FormattedColumnCache()
         self._build_row_info()
 
     def set_data(self, df, crm_rows=None):
@@ -23,145 +43,228 @@ class PivotTableModel(QAbstractTableModel):
         self._build_row_info()
         self.endResetModel()
 
+    def _read_decimals(self):
+        results_frame = getattr(self.pivot_tab, 'results_frame', None)
+        combo = getattr(results_frame, 'decimal_combo', None)
+        if combo is None:
+            combo = getattr(self.pivot_tab, 'decimal_places', None)
+        try:
+            return int(combo.currentText())
+        except (AttributeError, ValueError):
+            self.logger.warning("decimal_combo not available or invalid, using default decimal places (1)")
+            return 1
+
     def _build_row_info(self):
-        self._row_info = []
-        for row_idx in range(len(self._df)):
-            self._row_info.append({'type': 'pivot', 'index': row_idx})
-            sol_label = self._df.iloc[row_idx]['Solution Label']
-            for grp_idx, (sl, cdata) in enumerate(self._crm_rows):
-                if sl == sol_label:
-                    for sub in range(len(cdata)):
-                        self._row_info.append({'type': 'crm', 'group': grp_idx, 'sub': sub})
-                    break
+        df = self._df
+        n = len(df)
+        self._columns = list(df.columns)
+        self._label_col = self._columns.index('Solution Label') if 'Solution Label' in self._columns else -1
+        self._decimals = self._read_decimals()
+        self._version += 1
+        self._formatted.bind((self._version, self._decimals))
+
+        # Raw values plus a float view of the same cells (NaN where not numeric)
+        self._values = df.to_numpy(dtype=object)
+        self._numeric = df.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float) if n else np.empty((0, len(self._columns)))
+
+        labels = self._values[:, self._label_col] if self._label_col >= 0 else np.full(n, None, dtype=object)
+        self._labels = labels
+        self._label_to_row = {}
+        for row_idx, label in enumerate(labels):
+            self._label_to_row.setdefault(label, row_idx)
+
+        # First inline group per label, then one vectorized expansion into the combined row layout
+        group_by_label = {}
+        for grp_idx, (sl, _) in enumerate(self._crm_rows):
+            group_by_label.setdefault(sl, grp_idx)
+        self._group_by_label = group_by_label
+        row_group = np.fromiter((group_by_label.get(label, -1) for label in labels), dtype=np.int64, count=n)
+        group_sizes = np.array([len(cdata) for _, cdata in self._crm_rows] + [0], dtype=np.int64)
+        sizes = 1 + group_sizes[row_group]  # index -1 picks the trailing 0
+
+        total = int(sizes.sum())
+        starts = np.cumsum(sizes) - sizes
+        self._row_pivot = np.repeat(np.arange(n, dtype=np.int64), sizes)
+        self._row_group = np.repeat(row_group, sizes)
+        offset = np.arange(total, dtype=np.int64) - np.repeat(starts, sizes)
+        self._row_sub = offset - 1
+        self._row_kind = np.where(offset == 0, ROW_PIVOT, np.where(self._row_sub % 2 == 0, ROW_INLINE, ROW_DIFF)).astype(np.int8)
+        self.reset_fetch(total)
+
+        # Per inline row: display strings and background tags aligned to column positions
+        self._inline_cells = []
+        self._inline_tags = []
+        for _, cdata in self._crm_rows:
+            cells = []
+            tags = []
+            for row_data, row_tags in cdata:
+                cells.append(list(row_data))
+                tags.append(self._align_tags(row_tags))
+            self._inline_cells.append(cells)
+            self._inline_tags.append(tags)
+
+    def replace_inline_rows(self, label, cdata):
+        """Swap in recomputed inline rows for label and repaint them.
+
+        Returns False when label has no inline group or the number of rows differs, since that
+        changes the row layout and needs a rebuild.
+        """
+        grp_idx = self._group_by_label.get(label)
+        if grp_idx is None or len(cdata) != len(self._inline_cells[grp_idx]):
+            return False
+        self._crm_rows[grp_idx] = (label, cdata)
+        self._inline_cells[grp_idx] = [list(row_data) for row_data, _ in cdata]
+        self._inline_tags[grp_idx] = [self._align_tags(row_tags) for _, row_tags in cdata]
+
+        rows = np.flatnonzero((self._row_group[:self._fetched] == grp_idx) & (self._row_kind[:self._fetched] != ROW_PIVOT))
+        if len(rows) and self._columns:
+            roles = [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole, Qt.ItemDataRole.BackgroundRole]
+            last_col = len(self._columns) - 1
+            for run in np.split(rows, np.flatnonzero(np.diff(rows) > 1) + 1):
+                self.dataChanged.emit(self.index(int(run[0]), 0), self.index(int(run[-1]), last_col), roles)
+        return True
+
+    def _align_tags(self, tags):
+        if isinstance(tags, dict):
+            return [tags.get(col, "") for col in self._columns]
+        if isinstance(tags, (list, tuple)):
+            return list(tags)
+        return None
 
     def rowCount(self, parent=QModelIndex()):
-        return len(self._row_info)
+        return self._fetched
 
     def columnCount(self, parent=QModelIndex()):
-        return self._df.shape[1]
+        return len(self._columns)
 
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
-        if not index.isValid() or index.row() >= len(self._row_info):
+        if not index.isValid():
             return None
-
         row = index.row()
+        if row >= self._fetched:
+            return None
         col = index.column()
-        col_name = self._df.columns[col]
-        info = self._row_info[row]
-
-        is_crm_row = False
-        is_diff_row = False
-        crm_row_data = None
-        tags = None
-        pivot_row = row
-
-        if info['type'] == 'pivot':
-            pivot_row = info['index']
-        else:
-            grp = info['group']
-            sub = info['sub']
-            _, crm_data = self._crm_rows[grp]
-            if sub == 0:
-                is_crm_row = True
-                crm_row_data = crm_data[0][0]
-                tags = crm_data[0][1]
-            elif sub == 1:
-                is_diff_row = True
-                crm_row_data = crm_data[1][0]
-                tags = crm_data[1][1]
-            pivot_row = self._df.index[self._df['Solution Label'] == self._crm_rows[grp][0]].tolist()[0]
+        kind = self._row_kind[row]
 
         if role == Qt.ItemDataRole.DisplayRole or role == Qt.ItemDataRole.EditRole:
-            # استفاده از self.pivot_tab.results_frame.decimal_combo برای تعداد اعشار
-            try:
-                dec = int(self.pivot_tab.results_frame.decimal_combo.currentText())
-            except (AttributeError, ValueError):
-                self.logger.warning("decimal_combo not available or invalid, using default decimal places (1)")
-                dec = 1  # مقدار پیش‌فرض در صورت عدم وجود decimal_combo
-
-            if is_crm_row or is_diff_row:
-                value = crm_row_data[col]
+            if kind != ROW_PIVOT:
+                value = self._inline_cells[self._row_group[row]][self._row_sub[row]][col]
                 return str(value) if value else ""
-            else:
-                value = self._df.iloc[pivot_row, col]
-                if col_name != "Solution Label" and pd.notna(value):
-                    try:
-                        return f"{float(value):.{dec}f}"
-                    except (ValueError, TypeError):
-                        return "" if pd.isna(value) else str(value)
-                return str(value) if pd.notna(value) else ""
+            return self._formatted.get(col, self._format_column)[self._row_pivot[row]]
 
         elif role == Qt.ItemDataRole.BackgroundRole:
-            if is_crm_row:
-                return QColor("#FFF5E4")
-            elif is_diff_row and tags:
-                if tags[col] == "in_range":
-                    return QColor("#ECFFC4")
-                elif tags[col] == "out_range":
-                    return QColor("#FFCCCC")
-                return QColor("#E6E6FA")
-            return QColor("#f9f9f9") if pivot_row % 2 == 0 else QColor("white")
+            if kind == ROW_INLINE:
+                return CRM_ROW_COLOR
+            elif kind == ROW_DIFF:
+                tags = self._inline_tags[self._row_group[row]][self._row_sub[row]]
+                if tags:
+                    if tags[col] == "in_range":
+                        return IN_RANGE_COLOR
+                    elif tags[col] == "out_range":
+                        return OUT_RANGE_COLOR
+                    return DIFF_ROW_COLOR
+            return EVEN_ROW_COLOR if self._row_pivot[row] % 2 == 0 else ODD_ROW_COLOR
 
         elif role == Qt.ItemDataRole.TextAlignmentRole:
-            return Qt.AlignmentFlag.AlignLeft if col_name == "Solution Label" else Qt.AlignmentFlag.AlignCenter
+            return Qt.AlignmentFlag.AlignLeft if col == self._label_col else Qt.AlignmentFlag.AlignCenter
 
         return None
 
+    def _format_column(self, col):
+        if col == self._label_col:
+            return format_column(self._values[:, col], self._decimals, numeric=np.full(len(self._values), np.nan))
+        return format_column(self._values[:, col], self._decimals, numeric=self._numeric[:, col])
+
+    def row_for_label(self, label):
+        """View row of the first pivot row with this Solution Label (fetched into the view), or None."""
+        pivot_row = self._label_to_row.get(label)
+        if pivot_row is None:
+            return None
+        row = int(np.searchsorted(self._row_pivot, pivot_row))
+        self.fetch_to(row)
+        return row
+
     def flags(self, index):
         """Make all cells editable."""
         if not index.isValid():
             return Qt.ItemFlag.NoItemFlags
         return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEditable
 
+    def _backing_frame(self):
+        """Frame the table was built from: ResultsFrame's filtered data for CrmCheck, pivot_data for PivotTab."""
+        results_frame = getattr(self.pivot_tab, 'results_frame', None)
+        if results_frame is not None:
+            return results_frame.last_filtered_data
+        return getattr(self.pivot_tab, 'pivot_data', None)
+
+    def _backing_row(self, full_df, pivot_row, solution_label):
+        """Index label of the edited row in full_df; the model keeps the source index, so this is normally O(1)."""
+        row_key = self._df.index[pivot_row]
+        if row_key in full_df.index and full_df.at[row_key, 'Solution Label'] == solution_label:
+            return row_key
+        matches = full_df.index[full_df['Solution Label'] == solution_label]
+        return matches[0] if not matches.empty else None
+
     def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
-        """Update the underlying DataFrame with edited values."""
+        """Write one edited cell to the backing frame and the model arrays, then repaint only that cell.
+
+        Dependents are told which (label, column) changed through the owner's cell_edited signal.
+        Editing a Solution Label changes row grouping, so it still triggers a full redisplay.
+        """
         if not index.isValid() or role != Qt.ItemDataRole.EditRole:
             self.logger.debug(f"Invalid index or role: {index}, {role}")
             return False
 
         row = index.row()
         col = index.column()
-        col_name = self._df.columns[col]
-        info = self._row_info[row]
+        col_name = self._columns[col]
         self.logger.debug(f"setData called for row {row}, col {col} ({col_name}), value: '{value}'")
 
+        if self._row_kind[row] != ROW_PIVOT:
+            self.logger.warning("Editing CRM rows is not allowed")
+            return False
+
         try:
-            if info['type'] == 'pivot':
-                # Get the solution label from the view
-                solution_label = self._df.iloc[info['index']]['Solution Label']
-                # Find the row in the full pivot_data
-                full_df = self.pivot_tab.results_frame.last_filtered_data
-                full_row_idx = full_df[full_df['Solution Label'] == solution_label].index
-                if full_row_idx.empty:
-                    self.logger.warning(f"Solution Label '{solution_label}' not found in last_filtered_data")
+            pivot_row = self._row_pivot[row]
+            solution_label = self._labels[pivot_row]
+            full_df = self._backing_frame()
+            if full_df is None:
+                self.logger.warning("No backing data for pivot table edit")
+                return False
+            full_row_idx = self._backing_row(full_df, pivot_row, solution_label)
+            if full_row_idx is None:
+                self.logger.warning(f"Solution Label '{solution_label}' not found in backing data")
+                return False
+
+            text = str(value).strip()
+            if text == "":
+                new_value = pd.NA
+                number = np.nan
+            elif col_name == 'Solution Label':
+                new_value = text
+                number = np.nan
+            else:
+                try:
+                    new_value = number = float(text)
+                except ValueError:
+                    self.logger.warning(f"Invalid numeric value '{value}' for column {col_name}")
                     return False
-                full_row_idx = full_row_idx[0]
-
-                if value.strip() == "":
-                    full_df.at[full_row_idx, col_name] = pd.NA
-                    self.logger.debug(f"Set value at {full_row_idx}, {col_name} to NA")
-                else:
-                    if col_name == 'Solution Label':
-                        full_df.at[full_row_idx, col_name] = str(value).strip()
-                        self.logger.debug(f"Updated Solution Label at {full_row_idx} to '{value}'")
-                    else:
-                        try:
-                            full_df.at[full_row_idx, col_name] = float(value)
-                            self.logger.debug(f"Updated numeric value at {full_row_idx}, {col_name} to {value}")
-                        except ValueError:
-                            self.logger.warning(f"Invalid numeric value '{value}' for column {col_name}")
-                            return False
+
+            full_df.at[full_row_idx, col_name] = new_value
+            if self._df is not full_df:
+                self._df.iat[pivot_row, col] = new_value if col == self._label_col else number
+            self.logger.debug(f"Set value at {full_row_idx}, {col_name} to {new_value}")
+
+            if col_name == 'Solution Label':
+                self.pivot_tab.update_pivot_display()
             else:
-                self.logger.warning("Editing CRM rows is not allowed")
-                return False
+                self._values[pivot_row, col] = new_value
+                self._numeric[pivot_row, col] = number
+                self._formatted.invalidate(col)
+                self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole])
 
-            # Emit dataChanged and refresh UI
-            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.BackgroundRole])
-            self.logger.debug("Emitted dataChanged signal")
-            self.pivot_tab.update_pivot_display()
-            # اطلاع‌رسانی تغییرات به ResultsFrame
-            self.pivot_tab.data_changed.emit()
-            self.logger.debug("Emitted pivot_tab.data_changed signal")
+            if hasattr(self.pivot_tab, 'cell_edited'):
+                self.pivot_tab.cell_edited.emit(solution_label, col_name)
             return True
         except Exception as e:
             self.logger.error(f"Failed to set data at row {row}, col {col}: {str(e)}")
@@ -170,9 +273,9 @@ class PivotTableModel(QAbstractTableModel):
     def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
         if role == Qt.ItemDataRole.DisplayRole:
             if orientation == Qt.Orientation.Horizontal:
-                return str(self._df.columns[section])
+                return str(self._columns[section])
             return str(section + 1)
         return None
 
     def set_column_width(self, col, width):
-        self._column_widths[col] = width
\ No newline at end of file
+        self._column_widths[col] = width
@@ -79,11 +79,11 @@ def save_project(app):
             'rm_check': [
                 'rm_df', 'positions_df', 'original_df', 'corrected_df', 'pivot_df',
                 'initial_rm_df', 'empty_rows_from_check', 'corrected_drift',
-                'undo_stack', 'navigation_list', 'current_nav_index',
+                'navigation_list', 'current_nav_index',
                 'selected_element', 'current_label', 'elements', 'solution_labels',
                 'selected_row', 'original_rm_values', 'display_rm_values',
                 'current_valid_row_ids', 'current_slope', 'keyword',
-                'stepwise_state'
+                'stepwise_state', 'drift_models'
             ],
             'results': [
                 'search_var', 'filter_field', 'filter_values', 'column_filters',
@@ -305,13 +305,6 @@ def load_project(app):
                         tab_obj.stepwise_checkbox.setChecked(state['stepwise_state'])
                     if 'keyword' in state and hasattr(tab_obj, 'keyword_entry') and hasattr(tab_obj.keyword_entry, 'setText'):
                         tab_obj.keyword_entry.setText(state['keyword'])
-                    if 'undo_stack' in state:
-                        restored = []
-                        for cdf, rdf, cdrift in state['undo_stack']:
-                            restored.append((cdf.copy(deep=True), rdf.copy(deep=True), cdrift.copy()))
-                        tab_obj.undo_stack = restored
-                        tab_obj.undo_button.setEnabled(len(restored) > 0)
-
                     if 'elements' in state and 'solution_labels' in state:
                         tab_obj.elements = state['elements']
                         tab_obj.solution_labels = state['solution_labels']
@@ -351,6 +344,11 @@ def load_project(app):
                         tab_obj.auto_optimize_flat_button.setEnabled(False)
                         tab_obj.auto_optimize_zero_button.setEnabled(False)
 
+        # Undo history is not stored in projects; corrections made before loading cannot be undone
+        app.correction_journal.clear()
+        app.data_generation += 1
+        app.update_undo_buttons()
+
         # Final refresh
         app.notify_data_changed()
 
@@ -4,7 +4,7 @@ from PyQt6.QtWidgets import (
     QTabWidget, QScrollArea, QCheckBox
 )
 from PyQt6.QtCore import Qt, QAbstractTableModel, QTimer, QThread, pyqtSignal,pyqtSlot
-from PyQt6.QtGui import QStandardItemModel, QStandardItem, QFont, QColor
+from PyQt6.QtGui import QStandardItemModel, QStandardItem, QFont, QColor, QBrush
 import pandas as pd
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
@@ -19,11 +19,18 @@ import logging
 
 from .changeReport import ChangesReportDialog
 from .column_filter import ColumnFilterDialog, FilterDialog
+from utils.column_stats import ColumnStatsCache
+from utils.display_format import FormattedColumnCache, format_column, estimate_text_width
+from utils.incremental_fetch import IncrementalFetchMixin
+from ..pivot.freeze_table_widget import FreezeTableWidget
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+# Columns of the app data the results pivot is built from; changes to other columns (Act Wgt, Act Vol, DF) leave it as is
+PIVOT_SOURCE_COLUMNS = {'Solution Label', 'Element', 'Type', 'Corr Con', 'row_id', 'original_index'}
+
 # Global stylesheet
 global_style = """
     QWidget {
@@ -115,189 +122,130 @@ global_style = """
     }
 """
 
-class FreezeTableWidget(QTableView):
-    def __init__(self, model, parent=None):
-        super().__init__(parent)
-        self.frozenTableView = QTableView(self)
-        self.frozen_columns = 2  # NEW: Default to freeze two columns (checkbox + Solution Label)
-        self.setModel(model)
-        self.frozenTableView.setModel(model)
-        self._is_dialog_open = False  # Flag to prevent multiple dialogs
-        self.init()
-
-        self.horizontalHeader().sectionResized.connect(self.updateSectionWidth)
-        self.verticalHeader().sectionResized.connect(self.updateSectionHeight)
-        self.frozenTableView.verticalScrollBar().valueChanged.connect(self.frozenVerticalScroll)
-        self.verticalScrollBar().valueChanged.connect(self.mainVerticalScroll)
-
-    def init(self):
-        self.frozenTableView.setFocusPolicy(Qt.FocusPolicy.NoFocus)
-        self.frozenTableView.verticalHeader().hide()
-        self.frozenTableView.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
-        self.viewport().stackUnder(self.frozenTableView)
-        self.frozenTableView.setStyleSheet(global_style)
-        self.frozenTableView.setSelectionModel(self.selectionModel())
-        self.setHorizontalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
-        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
-        self.frozenTableView.setHorizontalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
-        self.frozenTableView.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
-        self.update_frozen_columns()
-        self.frozenTableView.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.frozenTableView.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.frozenTableView.horizontalHeader().sectionClicked.connect(self.on_frozen_header_clicked)
-        self.updateFrozenTableGeometry()
-        self.frozenTableView.show()
-
-    def update_frozen_columns(self):
-        if self.model() is None or self.model().columnCount() < self.frozen_columns:
-            self.frozenTableView.hide()
-            logger.debug("Hiding frozen table due to insufficient columns")
-            return
-        for col in range(self.model().columnCount()):
-            self.frozenTableView.setColumnHidden(col, col >= self.frozen_columns)
-        for col in range(self.frozen_columns):
-            column_width = self.columnWidth(col) if self.model().columnCount() > col else 100
-            self.frozenTableView.setColumnWidth(col, column_width)
-        self.frozenTableView.show()
-        self.updateFrozenTableGeometry()
-        logger.debug(f"Updated frozen columns: {self.frozen_columns}")
-
-    def updateSectionWidth(self, logicalIndex, oldSize, newSize):
-        if logicalIndex < self.frozen_columns:
-            self.frozenTableView.setColumnWidth(logicalIndex, newSize)
-            self.updateFrozenTableGeometry()
-            self.frozenTableView.viewport().update()
-        logger.debug(f"Section width updated for index {logicalIndex}: {newSize}")
-
-    def updateSectionHeight(self, logicalIndex, oldSize, newSize):
-        self.frozenTableView.setRowHeight(logicalIndex, newSize)
-
-    def frozenVerticalScroll(self, value):
-        self.viewport().stackUnder(self.frozenTableView)
-        self.verticalScrollBar().setValue(value)
-        self.frozenTableView.viewport().update()
-        self.viewport().update()
-
-    def mainVerticalScroll(self, value):
-        self.viewport().stackUnder(self.frozenTableView)
-        self.frozenTableView.verticalScrollBar().setValue(value)
-        self.frozenTableView.viewport().update()
-        self.viewport().update()
-
-    def updateFrozenTableGeometry(self):
-        if self.model() is None or self.model().columnCount() < self.frozen_columns:
-            return
-        total_width = sum(self.columnWidth(col) for col in range(self.frozen_columns))
-        self.frozenTableView.setGeometry(
-            self.verticalHeader().width() + self.frameWidth(),
-            self.frameWidth(),
-            total_width,
-            self.viewport().height() + self.horizontalHeader().height()
-        )
-        self.frozenTableView.setFixedWidth(total_width)
-        self.frozenTableView.viewport().update()
-        logger.debug(f"Updated frozen table geometry with width: {total_width}")
-
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        self.updateFrozenTableGeometry()
-        self.frozenTableView.viewport().update()
-
-    def moveCursor(self, cursorAction, modifiers):
-        current = super().moveCursor(cursorAction, modifiers)
-        if cursorAction == QAbstractItemView.CursorAction.MoveLeft and current.column() >= self.frozen_columns:
-            visual_x = self.visualRect(current).topLeft().x()
-            frozen_width = sum(self.columnWidth(col) for col in range(self.frozen_columns))
-            if visual_x < frozen_width:
-                new_value = self.horizontalScrollBar().value() + visual_x - frozen_width
-                self.horizontalScrollBar().setValue(int(new_value))
-        return current
-
-    def scrollTo(self, index, hint=QAbstractItemView.ScrollHint.EnsureVisible):
-        if index.column() >= self.frozen_columns:
-            super().scrollTo(index, hint)
-        self.frozenTableView.viewport().update()
-
-    def on_frozen_header_clicked(self, section):
-        """Redirect frozen header click to ResultsFrame's header click handler"""
-        logger.debug(f"Frozen header clicked for section: {section}")
-        if self.model() is None:
-            logger.warning("No model set for frozen table")
-            QMessageBox.warning(self, "Error", "Table model not initialized.")
-            return
-        parent = self.parent().parent() if self.parent() else None
-        logger.debug(f"ResultsFrame parent: {parent}, type: {type(parent).__name__ if parent else 'None'}")
-        if section < self.frozen_columns and not self._is_dialog_open:
-            if parent is not None and hasattr(parent, 'on_header_clicked'):
-                self._is_dialog_open = True
-                col_name = "Select" if section == 0 else "Solution Label"
-                logger.debug(f"Calling ResultsFrame on_header_clicked for {col_name}")
-                try:
-                    parent.on_header_clicked(section, col_name=col_name)
-                finally:
-                    self._is_dialog_open = False
-            else:
-                logger.warning(f"Cannot call on_header_clicked. Parent: {parent}, has_method: {hasattr(parent, 'on_header_clicked') if parent else False}")
-                QMessageBox.warning(self, "Error", "Cannot open filter dialog: ResultsFrame not found.")
-        else:
-            if section >= self.frozen_columns:
-                logger.warning(f"Unexpected section {section} clicked in frozen table")
-            if self._is_dialog_open:
-                logger.debug("Dialog already open, ignoring click")
-
-    def setModel(self, model):
-        super().setModel(model)
-        if self.frozenTableView is not None:
-            self.frozenTableView.setModel(model)
-            self.update_frozen_columns()
-            self.updateFrozenTableGeometry()
-
-class PandasModel(QAbstractTableModel):
-    """Custom model to display pandas DataFrame in QTableView"""
-    def __init__(self, data=pd.DataFrame(), format_value=None):
+CHECKED_ROW_BRUSH = QBrush(QColor("#E6F3FA"))  # Light blue for checked rows
+ODD_ROW_BRUSH = QBrush(QColor("#F9FAFB"))
+EVEN_ROW_BRUSH = QBrush(QColor("white"))
+
+class PandasModel(IncrementalFetchMixin, QAbstractTableModel):
+    """Custom model to display pandas DataFrame in QTableView.
+
+    Cells are read from per-column NumPy arrays; checkbox state is a boolean array indexed by
+    source row and view rows map to source rows through _order, so sorting is one argsort.
+    Rows are handed to the view in batches through fetchMore.
+    When decimals is given, display strings are formatted a whole column at a time on first
+    paint and cached; otherwise format_value is called per cell.
+    """
+    def __init__(self, data=pd.DataFrame(), format_value=None, decimals=None):
         super().__init__()
         self._data = data
         self._format_value = format_value
-        self._checkboxes = [False] * len(data)  # List to track checkbox states
+        self._decimals = decimals
+        self._formatted = FormattedColumnCache()
+        self._formatted.bind(decimals)
+        self._columns = list(data.columns)
+        self._arrays = [data.iloc[:, i].to_numpy() for i in range(len(self._columns))]
+        self._row_labels = data.index
+        self._order = np.arange(len(data))
+        self._checked = np.zeros(len(data), dtype=bool)
+        self.reset_fetch(len(data))
+
+    def _format_column(self, df_col):
+        values = self._arrays[df_col].astype(object)
+        return format_column(values, self._decimals, strip_zeros=True, blank_missing=False)
 
     def rowCount(self, parent=None):
-        return len(self._data)
+        return self._fetched
 
     def columnCount(self, parent=None):
-        return len(self._data.columns) + 1  # +1 for checkbox column
+        return len(self._columns) + 1  # +1 for checkbox column
 
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
         if not index.isValid():
             return None
         col = index.column()
         row = index.row()
-        if col == 0:  # Checkbox column
-            if role == Qt.ItemDataRole.CheckStateRole:
-                return Qt.CheckState.Checked if self._checkboxes[row] else Qt.CheckState.Unchecked
-            return None
-        else:  # Data columns
-            value = self._data.iloc[row, col - 1]  # Shift by 1 for checkbox
-            if role == Qt.ItemDataRole.DisplayRole:
-                if self._format_value is not None:
-                    return self._format_value(value)
-                return str(value)
-            elif role == Qt.ItemDataRole.BackgroundRole:
-                if self._checkboxes[row]:  # Highlight checked rows
-                    return QColor("#E6F3FA")  # Light blue for checked rows
-                return QColor("#F9FAFB") if row % 2 else Qt.GlobalColor.white
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == 0:
+                return None
+            src = self._order[row]
+            if self._decimals is not None:
+                return self._formatted.get(col - 1, self._format_column)[src]
+            value = self._arrays[col - 1][src]  # Shift by 1 for checkbox
+            if self._format_value is not None:
+                return self._format_value(value)
+            return str(value)
+
+        if role == Qt.ItemDataRole.BackgroundRole:
+            if col == 0:
+                return None
+            if self._checked[self._order[row]]:  # Highlight checked rows
+                return CHECKED_ROW_BRUSH
+            return ODD_ROW_BRUSH if row % 2 else EVEN_ROW_BRUSH
+
+        if role == Qt.ItemDataRole.CheckStateRole and col == 0:
+            return Qt.CheckState.Checked if self._checked[self._order[row]] else Qt.CheckState.Unchecked
+
         return None
 
+    def checked_rows(self):
+        """Source row positions of checked rows, in DataFrame order."""
+        return np.flatnonzero(self._checked).tolist()
+
+    def find_row(self, col, text):
+        """View row whose display text in col equals text, fetched into the view; -1 if absent."""
+        if col <= 0 or col > len(self._columns):
+            return -1
+        if self._decimals is not None:
+            shown = self._formatted.get(col - 1, self._format_column)
+        else:
+            format_value = self._format_value or str
+            shown = np.array([format_value(v) for v in self._arrays[col - 1]], dtype=object)
+        matches = np.flatnonzero(shown[self._order] == text)
+        if len(matches) == 0:
+            return -1
+        row = int(matches[0])
+        self.fetch_to(row)
+        return row
+
+    def source_row(self, row):
+        return int(self._order[row])
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Reorder view rows by one argsort over the column array; missing values stay last."""
+        if column < 0 or column > len(self._columns):
+            return
+        self.layoutAboutToBeChanged.emit()
+        if column == 0:
+            keys = self._checked.astype(float)
+        else:
+            values = self._arrays[column - 1]
+            keys = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+            if np.isnan(keys).all():
+                keys = None
+        if keys is not None:
+            valid = np.flatnonzero(~np.isnan(keys))
+            missing = np.flatnonzero(np.isnan(keys))
+            sorted_keys = keys[valid] if order == Qt.SortOrder.AscendingOrder else -keys[valid]
+            self._order = np.concatenate([valid[np.argsort(sorted_keys, kind='stable')], missing])
+        else:
+            labels = pd.Series(values).astype(str).to_numpy(dtype=str)
+            self._order = np.argsort(labels, kind='stable')
+            if order == Qt.SortOrder.DescendingOrder:
+                self._order = self._order[::-1]
+        self.layoutChanged.emit()
+
     def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
         if not index.isValid():
             return False
 
         row = index.row()
         col = index.column()
+        src = self._order[row]
 
         # 1. چک‌باکس (ستون 0)
         if col == 0 and role == Qt.ItemDataRole.CheckStateRole:
-            self._checkboxes[row] = (value == Qt.CheckState.Checked.value)
-            self.dataChanged.emit(index, index)
+            self._checked[src] = (value == Qt.CheckState.Checked.value)
             # به‌روزرسانی رنگ ردیف
             row_start = self.index(row, 0)
             row_end = self.index(row, self.columnCount() - 1)
@@ -311,12 +259,14 @@ class PandasModel(QAbstractTableModel):
                 numeric_value = float(value)
                 # ستون واقعی در DataFrame (چون ستون 0 = چک‌باکس)
                 df_col_index = col - 1
-                if df_col_index >= len(self._data.columns):
-                    logger.warning(f"Column index {df_col_index} out of range for DataFrame with {len(self._data.columns)} columns.")
+                if df_col_index >= len(self._columns):
+                    logger.warning(f"Column index {df_col_index} out of range for DataFrame with {len(self._columns)} columns.")
                     return False
 
-                # به‌روزرسانی DataFrame
-                self._data.iloc[row, df_col_index] = numeric_value
+                # به‌روزرسانی DataFrame و آرایه ستون
+                self._data.iloc[src, df_col_index] = numeric_value
+                self._store(src, df_col_index, numeric_value)
+                self._formatted.invalidate(df_col_index)
 
                 # اطلاع‌رسانی به Qt
                 self.dataChanged.emit(index, index)
@@ -329,6 +279,30 @@ class PandasModel(QAbstractTableModel):
 
         return False
 
+    def _store(self, src, df_col, value):
+        column_values = self._arrays[df_col]
+        if column_values.dtype.kind not in 'fO' or not column_values.flags.writeable:
+            column_values = column_values.astype(object if column_values.dtype.kind != 'f' else float)
+            self._arrays[df_col] = column_values
+        column_values[src] = value
+
+    def refresh_cell(self, label, column):
+        """Re-read cells of column for rows with this Solution Label from the DataFrame and repaint them.
+
+        Returns False when the column or label column is not in the model.
+        """
+        if column not in self._columns or 'Solution Label' not in self._columns:
+            return False
+        df_col = self._columns.index(column)
+        sources = np.flatnonzero(self._arrays[self._columns.index('Solution Label')] == label)
+        for src in sources:
+            self._store(src, df_col, self._data.iat[src, df_col])
+        self._formatted.invalidate(df_col)
+        for row in np.flatnonzero(np.isin(self._order[:self._fetched], sources)):
+            index = self.index(int(row), df_col + 1)
+            self.dataChanged.emit(index, index)
+        return True
+
     def flags(self, index):
         flags = super().flags(index)
         if index.column() == 0:
@@ -340,8 +314,8 @@ class PandasModel(QAbstractTableModel):
             if orientation == Qt.Orientation.Horizontal:
                 if section == 0:
                     return "Select"  # Checkbox header
-                return str(self._data.columns[section - 1]) if section - 1 < len(self._data.columns) else ""
-            return str(self._data.index[section]) if section < len(self._data.index) else ""
+                return str(self._columns[section - 1]) if section - 1 < len(self._columns) else ""
+            return str(self._row_labels[self._order[section]]) if section < self._fetched else ""
         return None
 
 class DataWorker(QThread):
@@ -365,6 +339,8 @@ class DataWorker(QThread):
             self.error_occurred.emit(str(e))
 
 class ResultsFrame(QWidget):
+    pivot_rebuilt = pyqtSignal()  # the pivot view was redrawn; not a data change, so not published on the change bus
+
     def __init__(self, app, parent=None):
         super().__init__(parent)
         self.app = app
@@ -379,15 +355,16 @@ class ResultsFrame(QWidget):
         self.last_filtered_data = None
         self.last_pivot_data = None
         self._last_cache_key = None
+        self.column_stats = ColumnStatsCache()
         self.solution_label_order = None
         self.element_order = None
         self.decimal_places = "1"
         self.data_hash = None
+        self._pivot_has_repeats = False
         self.worker = None
         self.instance_id = id(self)
         logger.debug(f"ResultsFrame initialized with instance_id: {self.instance_id}")
         self.setup_ui()
-        self.app.notify_data_changed = self.on_data_changed
         df = self.app.get_data()
         logger.debug(f"Initial data from app.get_data(): {df.shape if df is not None else 'None'}")
         self.show_processed_data()
@@ -480,7 +457,10 @@ class ResultsFrame(QWidget):
         table_layout = QVBoxLayout(table_group)
         table_layout.setContentsMargins(0, 0, 0, 0)
 
-        self.processed_table = FreezeTableWidget(PandasModel(), parent=self)
+        self.processed_table = FreezeTableWidget(PandasModel(), parent=self, frozen_columns=2)  # checkbox + Solution Label
+        self.processed_table.set_scroll_mode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.processed_table.frozenTableView.setStyleSheet(global_style)
+        self.processed_table.frozen_header_clicked.connect(self.on_header_clicked)
         self.processed_table.setStyleSheet(global_style)
         self.processed_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.processed_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
@@ -499,8 +479,9 @@ class ResultsFrame(QWidget):
         model = self.processed_table.model()
         if model is None:
             return []
-        selected_rows = [i for i in range(model.rowCount()) if model._checkboxes[i]]
-        return selected_rows
+        if not hasattr(model, 'checked_rows'):
+            return []
+        return model.checked_rows()
 
     def compare_with_oreas(self):
         selected_rows = self.get_selected_checkbox_rows()
@@ -549,6 +530,15 @@ class ResultsFrame(QWidget):
         logger.debug(f"Connecting CrmCheck to ResultsFrame instance_id: {self.instance_id}")
         crm_check.data_changed.connect(self.on_crm_data_changed)
 
+    def on_cell_edited(self, solution_label, column):
+        """Patch one edited cell of last_filtered_data into the table instead of rebuilding it."""
+        logger.debug(f"Cell edited elsewhere: {solution_label}, {column}")
+        self.column_stats.invalidate(column)
+        model = self.processed_table.model()
+        if (column == 'Solution Label' or not isinstance(model, PandasModel)
+                or model._data is not self.last_filtered_data or not model.refresh_cell(solution_label, column)):
+            self.update_table(self.last_filtered_data)
+
     def on_crm_data_changed(self):
         logger.debug(f"Data changed in CrmCheck, updating ResultsFrame table instance_id: {self.instance_id}")
         self.update_table(self.last_filtered_data)
@@ -561,7 +551,9 @@ class ResultsFrame(QWidget):
         try:
             value = float(x)
             decimal_places = int(self.decimal_combo.currentText())
-            formatted = f"{value:.{decimal_places}f}".rstrip('0').rstrip('.')
+            formatted = f"{value:.{decimal_places}f}"
+            if decimal_places > 0:
+                formatted = formatted.rstrip('0').rstrip('.')
             return formatted
         except (ValueError, TypeError):
             return str(x)
@@ -587,12 +579,196 @@ class ResultsFrame(QWidget):
         self.last_pivot_data = None
         self.show_processed_data()
 
+    def on_data_change(self, change):
+        """Change-bus handler: skip changes the pivot does not depend on, and rebuild only the rows
+        of the changed labels when just their Corr Con values moved; anything else is a full rebuild."""
+        if not change.touches(PIVOT_SOURCE_COLUMNS):
+            logger.debug(f"Results unaffected by {change}")
+            return
+        if (change.labels is not None and change.columns is not None and change.columns <= {'Corr Con'}
+                and self.patch_pivot(change.labels, change.elements)):
+            self.show_processed_data()
+            return
+        self.data_changed()
+
+    def patch_pivot(self, labels, elements=None):
+        """Rebuild the cached pivot rows of the given Solution Labels in place, keeping the filters.
+
+        Only the columns of `elements` (None = all) are written. Only valid when no row or column of
+        the pivot comes or goes, so the labels' new rows must line up one for one with their old
+        rows; returns False (nothing changed) otherwise.
+        """
+        pivot = self.last_pivot_data
+        df = self.app.get_data()
+        if pivot is None or df is None or (self.worker is not None and self.worker.isRunning()):
+            return False
+        old_rows = np.flatnonzero(pivot['Solution Label'].isin(labels).to_numpy())
+        new_rows, has_repeats = self.build_pivot(df[df['Solution Label'].isin(labels)])
+        if new_rows is None:
+            return len(old_rows) == 0
+        if (has_repeats != self._pivot_has_repeats or len(new_rows) != len(old_rows)
+                or not new_rows.columns.isin(pivot.columns).all()
+                or not (new_rows['Solution Label'].to_numpy() == pivot['Solution Label'].to_numpy()[old_rows]).all()):
+            return False
+        bases = None if elements is None else {str(element).split('_')[0] for element in elements}
+        for col in pivot.columns:
+            if col == 'Solution Label' or (bases is not None and str(col).split('_')[0] not in bases):
+                continue
+            values = new_rows[col].to_numpy() if col in new_rows.columns else np.nan
+            pivot.iloc[old_rows, pivot.columns.get_loc(col)] = values
+        self.data_hash = self.data_signature(df)
+        self.last_filtered_data = None
+        self._last_cache_key = None
+        logger.debug(f"Patched {len(old_rows)} pivot rows of {len(set(labels))} labels")
+        return True
+
+    def data_signature(self, df):
+        """Hash of the columns the pivot cache is checked against."""
+        hash_columns = ['Solution Label', 'Element', 'Corr Con']
+        if 'row_id' in df.columns:
+            hash_columns += ['row_id', 'original_index']
+        return str(pd.util.hash_pandas_object(df[hash_columns]).sum())
+
     def on_data_changed(self):
         logger.debug(f"on_data_changed triggered for instance_id: {self.instance_id}")
         self.reset_filter_cache()
         self.last_pivot_data = None
         self.show_processed_data()
 
+    def build_pivot(self, df):
+        """Results pivot of the sample rows of df: one row per sample set, one column per element.
+
+        Returns (pivot_data, has_repeats); pivot_data is None when no sample rows are left.
+        """
+        df_filtered = df[df['Type'].isin(['Samp', 'Sample'])].copy()
+        logger.debug(f"After Type filter, df_filtered shape: {df_filtered.shape}")
+        df_filtered = df_filtered[
+            (~df_filtered['Solution Label'].isin(self.app.get_excluded_samples())) &
+            (~df_filtered['Solution Label'].isin(self.app.get_excluded_volumes())) &
+            (~df_filtered['Solution Label'].isin(self.app.get_excluded_dfs()))
+        ]
+        logger.debug(f"After exclusion filters, df_filtered shape: {df_filtered.shape}")
+
+        if df_filtered.empty:
+            logger.warning("No data after initial filtering")
+            return None, False
+
+        if 'original_index' not in df_filtered.columns:
+            df_filtered['original_index'] = df_filtered.index
+        df_filtered['Element'] = df_filtered['Element'].str.split('_').str[0]
+        df_filtered = df_filtered.reset_index(drop=True)
+
+        most_common_sizes = {}
+        for solution_label in df_filtered['Solution Label'].unique():
+            df_subset = df_filtered[df_filtered['Solution Label'] == solution_label]
+            counts = df_subset['Element'].value_counts().values
+            total_rows = len(df_subset)
+            g = reduce(math.gcd, counts) if len(counts) > 0 else 1
+            most_common_sizes[solution_label] = total_rows // g if g > 0 and total_rows % g == 0 else total_rows
+
+        df_filtered['set_size'] = df_filtered['Solution Label'].map(most_common_sizes)
+
+        group_counts = df_filtered.groupby(['Solution Label', df_filtered.groupby('Solution Label').cumcount() // df_filtered['set_size'], 'Element']).size()
+        has_repeats = (group_counts > 1).any()
+        logger.debug(f"Has repeated elements: {has_repeats}")
+
+        def clean_label(label):
+            m = re.search(r'(\d+)', str(label).replace(' ', ''))
+            return f"{label.split()[0]} {m.group(1)}" if m else label
+
+        if self.solution_label_order is None or not self.solution_label_order:
+            self.solution_label_order = sorted(df_filtered['Solution Label'].drop_duplicates().apply(clean_label).tolist())
+
+        value_column = 'Corr Con'
+        if value_column not in df_filtered.columns:
+            logger.error(f"Column '{value_column}' not found in data")
+            return None, False
+
+        if not has_repeats:
+            df_filtered['unique_id'] = df_filtered.groupby(['Solution Label', 'Element']).cumcount()
+            if self.element_order is None or not self.element_order:
+                self.element_order = df_filtered['Element'].drop_duplicates().tolist()
+
+            pivot_data = df_filtered.pivot_table(
+                index=['Solution Label', 'unique_id'],
+                columns='Element',
+                values=value_column,
+                aggfunc='first',
+                sort=False
+            ).reset_index()
+
+            pivot_data = pivot_data.merge(
+                df_filtered[['Solution Label', 'unique_id', 'original_index']].drop_duplicates(),
+                on=['Solution Label', 'unique_id'],
+                how='left'
+            ).sort_values('original_index').drop(columns=['unique_id', 'original_index'])
+
+        else:
+            df_filtered['group_id'] = df_filtered.groupby('Solution Label').cumcount() // df_filtered['set_size']
+
+            element_counts = df_filtered.groupby(['Solution Label', 'group_id', 'Element']).size().reset_index(name='count')
+            df_filtered = df_filtered.merge(
+                element_counts[['Solution Label', 'group_id', 'Element', 'count']],
+                on=['Solution Label', 'group_id', 'Element'],
+                how='left'
+            )
+            df_filtered['count'] = df_filtered['count'].fillna(1).astype(int)
+            df_filtered['element_count'] = df_filtered.groupby(['Solution Label', 'group_id', 'Element']).cumcount() + 1
+            df_filtered['Element_with_id'] = df_filtered.apply(
+                lambda x: f"{x['Element']}_{x['element_count']}" if x['count'] > 1 else x['Element'],
+                axis=1
+            )
+
+            expected_columns_dict = {}
+            for solution_label in df_filtered['Solution Label'].unique():
+                expected_size = most_common_sizes.get(solution_label, 1)
+                set_sizes_subset = df_filtered[df_filtered['Solution Label'] == solution_label].groupby('group_id').size().reset_index(name='set_size')
+                valid_groups = set_sizes_subset[set_sizes_subset['set_size'] == expected_size]['group_id']
+                if not valid_groups.empty:
+                    first_group_id = valid_groups.min()
+                    first_set_elements = df_filtered[
+                        (df_filtered['Solution Label'] == solution_label) & 
+                        (df_filtered['group_id'] == first_group_id)
+                    ]['Element_with_id'].unique().tolist()
+                    expected_columns_dict[solution_label] = first_set_elements
+                else:
+                    expected_columns_dict[solution_label] = []
+
+            if self.element_order is None or not self.element_order:
+                self.element_order = list(set().union(*[set(cols) for cols in expected_columns_dict.values()]))
+
+            pivot_dfs = []
+            min_index_per_group = {}
+            for solution_label, expected_columns in expected_columns_dict.items():
+                if not expected_columns:
+                    logger.debug(f"No valid columns for Solution Label: {solution_label}")
+                    continue
+                df_subset = df_filtered[df_filtered['Solution Label'] == solution_label].copy()
+                min_index_per_group[solution_label] = df_subset.groupby('group_id')['original_index'].min().to_dict()
+                pivot_subset = df_subset.pivot_table(
+                    index=['Solution Label', 'group_id'],
+                    columns='Element_with_id',
+                    values=value_column,
+                    aggfunc='first',
+                    sort=False
+                ).reset_index()
+                pivot_subset = pivot_subset.reindex(columns=['Solution Label', 'group_id'] + expected_columns)
+                pivot_subset['min_original_index'] = pivot_subset['group_id'].map(min_index_per_group[solution_label])
+                pivot_dfs.append(pivot_subset)
+
+            if not pivot_dfs:
+                logger.error("No valid pivot tables created")
+                return None, False
+            
+            pivot_data = pd.concat(pivot_dfs, ignore_index=True)
+            if 'min_original_index' in pivot_data.columns:
+                pivot_data = pivot_data.sort_values(by='min_original_index').reset_index(drop=True)
+            columns_to_drop = [col for col in ['group_id', 'min_original_index'] if col in pivot_data.columns]
+            if columns_to_drop:
+                pivot_data = pivot_data.drop(columns=columns_to_drop)
+
+        return pivot_data, has_repeats
+
     def compute_filtered_data(self):
         logger.debug(f"Starting compute_filtered_data for instance_id: {self.instance_id}")
         
@@ -608,8 +784,7 @@ class ResultsFrame(QWidget):
             self.last_pivot_data = None
             return pd.DataFrame()
 
-        hash_columns = required_columns + ['row_id', 'original_index'] if 'row_id' in df.columns else required_columns
-        new_hash = str(pd.util.hash_pandas_object(df[hash_columns]).sum())
+        new_hash = self.data_signature(df)
         logger.debug(f"Computed data hash: {new_hash}")
 
         logger.debug(f"Current column_filters: {self.column_filters}")
@@ -617,141 +792,15 @@ class ResultsFrame(QWidget):
 
         if new_hash != self.data_hash or self.last_pivot_data is None:
             logger.debug("Data changed or no pivot data, recomputing pivot")
-            df_filtered = df[df['Type'].isin(['Samp', 'Sample'])].copy()
-            logger.debug(f"After Type filter, df_filtered shape: {df_filtered.shape}")
-            df_filtered = df_filtered[
-                (~df_filtered['Solution Label'].isin(self.app.get_excluded_samples())) &
-                (~df_filtered['Solution Label'].isin(self.app.get_excluded_volumes())) &
-                (~df_filtered['Solution Label'].isin(self.app.get_excluded_dfs()))
-            ]
-            logger.debug(f"After exclusion filters, df_filtered shape: {df_filtered.shape}")
-
-            if df_filtered.empty:
-                logger.warning("No data after initial filtering")
-                self.last_pivot_data = None
-                return pd.DataFrame()
-
-            if 'original_index' not in df_filtered.columns:
-                df_filtered['original_index'] = df_filtered.index
-            df_filtered['Element'] = df_filtered['Element'].str.split('_').str[0]
-            df_filtered = df_filtered.reset_index(drop=True)
-
-            most_common_sizes = {}
-            for solution_label in df_filtered['Solution Label'].unique():
-                df_subset = df_filtered[df_filtered['Solution Label'] == solution_label]
-                counts = df_subset['Element'].value_counts().values
-                total_rows = len(df_subset)
-                g = reduce(math.gcd, counts) if len(counts) > 0 else 1
-                most_common_sizes[solution_label] = total_rows // g if g > 0 and total_rows % g == 0 else total_rows
-
-            df_filtered['set_size'] = df_filtered['Solution Label'].map(most_common_sizes)
-
-            group_counts = df_filtered.groupby(['Solution Label', df_filtered.groupby('Solution Label').cumcount() // df_filtered['set_size'], 'Element']).size()
-            has_repeats = (group_counts > 1).any()
-            logger.debug(f"Has repeated elements: {has_repeats}")
-
-            def clean_label(label):
-                m = re.search(r'(\d+)', str(label).replace(' ', ''))
-                return f"{label.split()[0]} {m.group(1)}" if m else label
-
-            if self.solution_label_order is None or not self.solution_label_order:
-                self.solution_label_order = sorted(df_filtered['Solution Label'].drop_duplicates().apply(clean_label).tolist())
-
-            value_column = 'Corr Con'
-            if value_column not in df_filtered.columns:
-                logger.error(f"Column '{value_column}' not found in data")
+            pivot_data, self._pivot_has_repeats = self.build_pivot(df)
+            if pivot_data is None:
                 self.last_pivot_data = None
                 return pd.DataFrame()
-
-            if not has_repeats:
-                df_filtered['unique_id'] = df_filtered.groupby(['Solution Label', 'Element']).cumcount()
-                if self.element_order is None or not self.element_order:
-                    self.element_order = df_filtered['Element'].drop_duplicates().tolist()
-
-                pivot_data = df_filtered.pivot_table(
-                    index=['Solution Label', 'unique_id'],
-                    columns='Element',
-                    values=value_column,
-                    aggfunc='first',
-                    sort=False
-                ).reset_index()
-
-                pivot_data = pivot_data.merge(
-                    df_filtered[['Solution Label', 'unique_id', 'original_index']].drop_duplicates(),
-                    on=['Solution Label', 'unique_id'],
-                    how='left'
-                ).sort_values('original_index').drop(columns=['unique_id', 'original_index'])
-
-            else:
-                df_filtered['group_id'] = df_filtered.groupby('Solution Label').cumcount() // df_filtered['set_size']
-
-                element_counts = df_filtered.groupby(['Solution Label', 'group_id', 'Element']).size().reset_index(name='count')
-                df_filtered = df_filtered.merge(
-                    element_counts[['Solution Label', 'group_id', 'Element', 'count']],
-                    on=['Solution Label', 'group_id', 'Element'],
-                    how='left'
-                )
-                df_filtered['count'] = df_filtered['count'].fillna(1).astype(int)
-                df_filtered['element_count'] = df_filtered.groupby(['Solution Label', 'group_id', 'Element']).cumcount() + 1
-                df_filtered['Element_with_id'] = df_filtered.apply(
-                    lambda x: f"{x['Element']}_{x['element_count']}" if x['count'] > 1 else x['Element'],
-                    axis=1
-                )
-
-                expected_columns_dict = {}
-                for solution_label in df_filtered['Solution Label'].unique():
-                    expected_size = most_common_sizes.get(solution_label, 1)
-                    set_sizes_subset = df_filtered[df_filtered['Solution Label'] == solution_label].groupby('group_id').size().reset_index(name='set_size')
-                    valid_groups = set_sizes_subset[set_sizes_subset['set_size'] == expected_size]['group_id']
-                    if not valid_groups.empty:
-                        first_group_id = valid_groups.min()
-                        first_set_elements = df_filtered[
-                            (df_filtered['Solution Label'] == solution_label) & 
-                            (df_filtered['group_id'] == first_group_id)
-                        ]['Element_with_id'].unique().tolist()
-                        expected_columns_dict[solution_label] = first_set_elements
-                    else:
-                        expected_columns_dict[solution_label] = []
-
-                if self.element_order is None or not self.element_order:
-                    self.element_order = list(set().union(*[set(cols) for cols in expected_columns_dict.values()]))
-
-                pivot_dfs = []
-                min_index_per_group = {}
-                for solution_label, expected_columns in expected_columns_dict.items():
-                    if not expected_columns:
-                        logger.debug(f"No valid columns for Solution Label: {solution_label}")
-                        continue
-                    df_subset = df_filtered[df_filtered['Solution Label'] == solution_label].copy()
-                    min_index_per_group[solution_label] = df_subset.groupby('group_id')['original_index'].min().to_dict()
-                    pivot_subset = df_subset.pivot_table(
-                        index=['Solution Label', 'group_id'],
-                        columns='Element_with_id',
-                        values=value_column,
-                        aggfunc='first',
-                        sort=False
-                    ).reset_index()
-                    pivot_subset = pivot_subset.reindex(columns=['Solution Label', 'group_id'] + expected_columns)
-                    pivot_subset['min_original_index'] = pivot_subset['group_id'].map(min_index_per_group[solution_label])
-                    pivot_dfs.append(pivot_subset)
-
-                if not pivot_dfs:
-                    logger.error("No valid pivot tables created")
-                    self.last_pivot_data = None
-                    return pd.DataFrame()
-                
-                pivot_data = pd.concat(pivot_dfs, ignore_index=True)
-                if 'min_original_index' in pivot_data.columns:
-                    pivot_data = pivot_data.sort_values(by='min_original_index').reset_index(drop=True)
-                columns_to_drop = [col for col in ['group_id', 'min_original_index'] if col in pivot_data.columns]
-                if columns_to_drop:
-                    pivot_data = pivot_data.drop(columns=columns_to_drop)
-
-                self.last_pivot_data = pivot_data
-                self.data_hash = new_hash
-                self.last_filtered_data = None
-                self._last_cache_key = None
-                logger.debug(f"Pivot data shape: {pivot_data.shape}")
+            self.last_pivot_data = pivot_data
+            self.data_hash = new_hash
+            self.last_filtered_data = None
+            self._last_cache_key = None
+            logger.debug(f"Pivot data shape: {pivot_data.shape}")
         else:
             pivot_data = self.last_pivot_data
             logger.debug("Using cached pivot data")
@@ -865,14 +914,7 @@ class ResultsFrame(QWidget):
         for control_id, col_updates in updates.items():
             # ستون SAMPLE ID = ستون 1 (چون ستون 0 = چک‌باکس)
             sample_id_col = 1
-            found_row = -1
-
-            for row in range(model.rowCount()):
-                index = model.index(row, sample_id_col)
-                current_id = model.data(index, Qt.ItemDataRole.DisplayRole)
-                if current_id == control_id:
-                    found_row = row
-                    break
+            found_row = model.find_row(sample_id_col, control_id)
 
             if found_row == -1:
                 logger.warning(f"Control ID {control_id} not found in Results table.")
@@ -902,6 +944,7 @@ class ResultsFrame(QWidget):
                     logger.warning(f"Failed to set data at row {found_row}, col {col_idx}")
 
         if updated > 0:
+            self.column_stats.invalidate()
             logger.debug(f"Results table updated: {updated} cell(s) changed via PandasModel.")
             # اختیاری: به‌روزرسانی UI
             self.processed_table.viewport().update()
@@ -927,8 +970,7 @@ class ResultsFrame(QWidget):
     def on_worker_finished(self):
         self.progress_bar.setVisible(False)
         self.search_entry.setEnabled(True)
-        if hasattr(self.app, 'notify_data_changed'):
-            self.app.notify_data_changed()
+        self.pivot_rebuilt.emit()
         logger.debug(f"Worker finished for instance_id: {self.instance_id}")
 
     def update_table(self, df):
@@ -940,8 +982,6 @@ class ResultsFrame(QWidget):
             self.processed_table.setModel(model)
             self.processed_table.setColumnWidth(0, 150)
             self.column_widths = {"Status": 150}
-            self.processed_table.frozenTableView.setModel(model)
-            self.processed_table.update_frozen_columns()
             self.processed_table.setEnabled(False)
             logger.warning("Table updated with no data due to filtering")
             return
@@ -956,25 +996,14 @@ class ResultsFrame(QWidget):
         for col_idx, col in enumerate(columns, 1):
             if col == 'Solution Label':
                 continue
-            sample_data = df[col].dropna().astype(str)
-            max_width = max([len(str(col))] + [len(str(self.format_value(x))) for x in sample_data], default=10)
+            max_width = estimate_text_width(df[col].dropna().to_numpy(dtype=object), col, formatter=self.format_value)
             pixel_width = min(max_width * 10, 300)
             self.column_widths[col] = pixel_width
             self.processed_table.setColumnWidth(col_idx, pixel_width)
 
-        model = PandasModel(df, format_value=self.format_value)
+        model = PandasModel(df, format_value=self.format_value, decimals=int(self.decimal_combo.currentText()))
         self.processed_table.setModel(model)
-        self.processed_table.frozenTableView.setModel(model)
-        self.processed_table.update_frozen_columns()
-        
-        self.processed_table.model().layoutChanged.emit()
-        self.processed_table.frozenTableView.model().layoutChanged.emit()
-        self.processed_table.viewport().update()
-        self.processed_table.frozenTableView.viewport().update()
         self.processed_table.setEnabled(True)
-        
-        if hasattr(self.app, 'notify_data_changed'):
-            self.app.notify_data_changed()
 
     def show_error(self, message):
         self.progress_bar.setVisible(False)
@@ -1269,6 +1298,7 @@ class ResultsFrame(QWidget):
         self.column_filters = {}
         self.search_var = ""
         self.data_hash = None
+        self.column_stats.clear()
         logger.debug(f"Reset cache for instance_id: {self.instance_id}, last_pivot_data preserved")
 
     def reset_state(self):
@@ -1286,6 +1316,7 @@ class ResultsFrame(QWidget):
         self.element_order = None
         self.decimal_places = "1"
         self.data_hash = None
+        self.column_stats.clear()
 
         if hasattr(self, 'search_entry'):
             self.search_entry.setText("")
@@ -1299,8 +1330,6 @@ class ResultsFrame(QWidget):
             model.appendRow([QStandardItem("No data available after filtering")])
             self.processed_table.setModel(model)
             self.processed_table.setColumnWidth(0, 150)
-            self.processed_table.frozenTableView.setModel(model)
-            self.processed_table.update_frozen_columns()
             self.processed_table.setEnabled(False)
             logger.debug("Processed table reset with 'No data' message")
 
@@ -1311,8 +1340,6 @@ class ResultsFrame(QWidget):
             self.search_entry.setEnabled(True)
             logger.debug("Terminated running worker thread")
 
-        if hasattr(self.app, 'notify_data_changed'):
-            self.app.notify_data_changed()
-            logger.debug("Notified data change")
+        self.pivot_rebuilt.emit()
 
         logger.debug(f"ResultsFrame state reset completed for instance_id: {self.instance_id}")
\ No newline at end of file
@@ -0,0 +1,105 @@
+import pandas as pd
+import numpy as np
+import logging
+from utils.undo_journal import CellChanges
+
+logger = logging.getLogger(__name__)
+
+def sample_rows(df, labels):
+    """Row positions of the 'Samp' rows whose Solution Label is one of labels."""
+    return np.flatnonzero((df['Solution Label'].isin(list(labels)) & (df['Type'] == 'Samp')).to_numpy())
+
+def first_rows_per_label(df, mask):
+    """Row positions of the first row of each Solution Label where mask holds, in row order.
+
+    Same rows as df[mask].drop_duplicates(subset=['Solution Label']) without building df[mask].
+    """
+    rows = np.flatnonzero(np.asarray(mask, dtype=bool))
+    codes, _ = pd.factorize(df['Solution Label'].to_numpy()[rows])
+    _, first = np.unique(codes, return_index=True)
+    return rows[np.sort(first)]
+
+def apply_values(df, rows, values):
+    """Write {column: values} into df at the given row positions, one bulk assignment per column."""
+    if len(rows) == 0:
+        return 0
+    for column, column_values in values.items():
+        df.iloc[rows, df.columns.get_loc(column)] = column_values
+    logger.debug(f"Corrected {len(rows)} rows in {list(values)}")
+    return len(rows)
+
+class CorrectionTransaction:
+    """Corrections queued against one frame and written to it in a single pass by commit().
+
+    Steps run in queue order on working copies of the columns they touch, so a volume fix queued
+    after a weight fix rescales the already weight-corrected Corr Con. Nothing touches the frame
+    until commit(), which writes each column once and returns one CellChanges holding the old
+    values of every changed cell, i.e. a single undo entry for the whole batch.
+
+    Label steps (rescale, set_value) act on the 'Samp' rows of the given Solution Labels; row
+    steps (scale, assign) take row positions, e.g. a drift patch or a CRM blank/scale fix.
+    """
+    def __init__(self, df):
+        self.df = df
+        self._steps = []
+
+    def rescale(self, labels, column, new_value):
+        """Set `column` (Act Wgt / Act Vol) to new_value and scale Corr Con by new_value / old value.
+
+        Rows whose old value is 0 keep their Corr Con.
+        """
+        self._steps.append(('rescale', sample_rows(self.df, labels), column, float(new_value)))
+        return self
+
+    def set_value(self, labels, column, value):
+        """Set `column` (e.g. DF) to value."""
+        self._steps.append(('assign', sample_rows(self.df, labels), column, float(value)))
+        return self
+
+    def scale(self, rows, column, factor=1.0, offset=0.0):
+        """column = column * factor + offset at rows; factor and offset may be per-row arrays."""
+        self._steps.append(('scale', np.asarray(rows, dtype=np.int64), column, (factor, offset)))
+        return self
+
+    def assign(self, rows, column, values):
+        """column = values at rows."""
+        self._steps.append(('assign', np.asarray(rows, dtype=np.int64), column, values))
+        return self
+
+    def __len__(self):
+        return len(self._steps)
+
+    def commit(self):
+        """Apply every queued step; returns (CellChanges of the old values, number of rows changed)."""
+        working = {}
+        touched = {}
+
+        def column_values(column):
+            if column not in working:
+                working[column] = pd.to_numeric(self.df[column], errors='coerce').to_numpy(dtype=float, copy=True)
+                touched[column] = np.zeros(len(self.df), dtype=bool)
+            return working[column]
+
+        for kind, rows, column, arg in self._steps:
+            values = column_values(column)
+            if kind == 'rescale':
+                corr_con = column_values('Corr Con')
+                current = values[rows]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    corr_con[rows] = np.where(current != 0, arg / current * corr_con[rows], corr_con[rows])
+                touched['Corr Con'][rows] = True
+                values[rows] = arg
+            elif kind == 'scale':
+                factor, offset = arg
+                values[rows] = values[rows] * factor + offset
+            else:
+                values[rows] = arg
+            touched[column][rows] = True
+
+        changed = {column: np.flatnonzero(mask) for column, mask in touched.items()}
+        changes = CellChanges({column: (rows, self.df[column].to_numpy()[rows].copy()) for column, rows in changed.items()},
+                              len(self.df))
+        for column, rows in changed.items():
+            apply_values(self.df, rows, {column: working[column][rows]})
+        self._steps = []
+        return changes, len(changes.rows)
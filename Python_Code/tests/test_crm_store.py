@@ -0,0 +1,67 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.crm_store import CRMStore
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'CRM ID': ['OREAS 258', 'oreas 45e', 'OREAS 258', 'GBM 908', 'OREAS 258'],
+        'Solution Label': ['a', 'b', 'c', 'd', 'e'],
+        'Analysis Method': ['4-Acid', '4-Acid', 'Aqua Regia', '4-Acid', '4-Acid'],
+        'Type': [''] * 5,
+        'Cu_ppm': ['10', '20', '30', '40', ''],
+        'Cu_pct': [np.nan, np.nan, np.nan, np.nan, 0.5],
+        'Fe_pct': [' 1.5 ', 'n/a', '3', None, '4'],
+    })
+
+
+def test_columns_sharing_a_symbol_last_non_empty_wins(frame):
+    store = CRMStore(frame)
+    assert store.symbols == ['Cu', 'Fe']
+    assert store.values[:, 0].tolist() == [10.0, 20.0, 30.0, 40.0, 0.5]
+    assert np.isnan(store.values[1, 1]) and np.isnan(store.values[3, 1])
+
+
+def test_later_records_override_earlier_ones(frame):
+    store = CRMStore(frame)
+    positions = store.records('OREAS 258', '4-Acid')
+    assert positions == [0, 4]
+    assert store.grades(positions) == {'Cu': 0.5, 'Fe': 4.0}
+    assert store.grades([4, 0]) == {'Cu': 10.0, 'Fe': 1.5}
+
+
+def test_missing_values_do_not_override(frame):
+    store = CRMStore(frame)
+    assert store.grades([0, 1]) == {'Cu': 20.0, 'Fe': 1.5}
+
+
+def test_prefix_lookup_is_case_insensitive_in_table_order(frame):
+    store = CRMStore(frame)
+    assert store.with_prefix('Oreas').tolist() == [0, 1, 2, 4]
+    assert store.crm_ids_with_prefix('oreas 2') == ['OREAS 258']
+    assert store.with_prefix('xyz').tolist() == []
+
+
+def test_methods_and_records(frame):
+    store = CRMStore(frame)
+    assert store.methods_of('OREAS 258') == ['4-Acid', 'Aqua Regia']
+    assert store.methods_of('missing') == []
+    assert store.records('GBM 908', 'Aqua Regia') == []
+
+
+def test_missing_required_columns(frame):
+    with pytest.raises(ValueError):
+        CRMStore(frame.drop(columns=['Analysis Method']))
+
+
+def test_load_reads_pivot_crm_table(frame):
+    conn = sqlite3.connect(':memory:')
+    frame.to_sql('pivot_crm', conn, index=False)
+    store = CRMStore.load(conn)
+    assert len(store) == 5
+    assert store.grades(store.records('oreas 45e', '4-Acid')) == {'Cu': 20.0}
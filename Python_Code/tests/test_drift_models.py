@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+
+from utils import drift_models
+from utils.drift_models import drift_factors, drift_pass, run_drift_factors, segment_drift_factors
+
+
+def test_flat_factors_take_the_interval_ratio():
+    assert drift_factors([1.1, 0.8], [0, 0, 1], stepwise=False).tolist() == [1.1, 1.1, 0.8]
+
+
+def test_stepwise_ramps_up_to_the_ratio_in_each_interval():
+    factors = drift_factors([1.3, 0.9], [0, 0, 0, 1, 1], stepwise=True)
+    np.testing.assert_allclose(factors, [1.1, 1.2, 1.3, 0.95, 0.9])
+
+
+def test_empty_intervals():
+    assert drift_factors([1.2], [], stepwise=True).tolist() == []
+
+
+def segment():
+    # RMs at positions 0 (reference), 10 and 20; one element
+    mins = np.array([0.0, 10.0])
+    maxs = np.array([10.0, 20.0])
+    ratios = np.array([[1.2], [1.5]])
+    return mins, maxs, ratios
+
+
+def test_samples_are_assigned_strictly_inside_their_interval():
+    pos = np.array([-1.0, 0.0, 5.0, 10.0, 15.0, 20.0, 25.0])
+    picked, factors = segment_drift_factors(pos, np.zeros(len(pos), dtype=np.int64), *segment(),
+                                            stepwise=False, models=['interval'])
+    assert picked.tolist() == [2, 4]  # RM positions and samples outside the RMs are left alone
+    assert factors.tolist() == [1.2, 1.5]
+
+
+def test_intervals_are_matched_by_upper_bound_whatever_their_order():
+    mins, maxs, ratios = segment()
+    pos = np.array([5.0, 15.0])
+    picked, factors = segment_drift_factors(pos, np.zeros(2, dtype=np.int64), mins[::-1], maxs[::-1], ratios[::-1],
+                                            stepwise=False, models=['interval'])
+    assert picked.tolist() == [0, 1]
+    assert factors.tolist() == [1.2, 1.5]
+
+
+def test_unusable_ratios_skip_their_samples():
+    mins, maxs, _ = segment()
+    ratios = np.array([[np.nan], [0.0]])
+    picked, _ = segment_drift_factors(np.array([5.0, 15.0]), np.zeros(2, dtype=np.int64), mins, maxs, ratios,
+                                      stepwise=False, models=['interval'])
+    assert picked.tolist() == []
+
+
+def test_linear_model_runs_from_the_reference_through_every_rm():
+    pos = np.array([5.0, 15.0])
+    _, factors = segment_drift_factors(pos, np.zeros(2, dtype=np.int64), *segment(), stepwise=False, models=['linear'])
+    np.testing.assert_allclose(factors, [1.1, 1.35])
+
+
+def test_stepwise_ramp_is_counted_per_element():
+    mins, maxs, _ = segment()
+    ratios = np.array([[1.2, 2.0], [1.5, 1.0]])
+    pos = np.array([2.0, 2.0, 6.0, 6.0])
+    codes = np.array([0, 1, 0, 1])
+    picked, factors = segment_drift_factors(pos, codes, mins, maxs, ratios, stepwise=True, models=['interval'] * 2)
+    assert picked.tolist() == [0, 2, 1, 3]
+    np.testing.assert_allclose(factors, [1.1, 1.2, 1.5, 2.0])
+
+
+def run_blocks(n_elements=3, n_samples=400, seed=0):
+    rng = np.random.default_rng(seed)
+    pos = np.repeat(np.arange(n_samples, dtype=float), n_elements)
+    codes = np.tile(np.arange(n_elements), n_samples)
+    blocks = []
+    for start in (0, 200):
+        maxs = np.arange(start + 20, start + 200, 20, dtype=float)
+        blocks.append((maxs - 20, maxs, 1 + 0.05 * rng.standard_normal((len(maxs), n_elements))))
+    return pos, codes, blocks
+
+
+def test_serial_pass_orders_results_by_block_then_sample():
+    pos, codes, blocks = run_blocks()
+    picked, factors, block_ids = drift_pass(pos, codes, blocks, True, ['interval', 'linear', 'interval'], workers=1)
+    assert np.all(np.diff(block_ids) >= 0)
+    for block_id in (0, 1):
+        assert np.all(np.diff(picked[block_ids == block_id]) > 0)
+    assert len(picked) == len(run_drift_factors(pos, codes, blocks, True, ['interval', 'linear', 'interval'])[0])
+
+
+def test_pooled_pass_matches_serial(monkeypatch):
+    pos, codes, blocks = run_blocks()
+    models = ['interval', 'linear', 'interval']
+    serial = drift_pass(pos, codes, blocks, True, models, workers=1)
+    monkeypatch.setattr(drift_models, 'DRIFT_WORKERS', 2)
+    monkeypatch.setattr(drift_models, 'PARALLEL_MIN_COST', 0.0)
+    assert drift_models.start_drift_pool() is not None
+    try:
+        pooled = drift_pass(pos, codes, blocks, True, models)
+    finally:
+        drift_models.shutdown_drift_pool()
+    for a, b in zip(serial, pooled):
+        np.testing.assert_array_equal(a, b)
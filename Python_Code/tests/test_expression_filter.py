@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import expression_filter
+from utils.expression_filter import CompiledFilter, ExpressionError, NumericBlock
+
+
+@pytest.fixture(params=['numpy', 'numexpr'])
+def engine(request, monkeypatch):
+    if request.param == 'numpy':
+        monkeypatch.setattr(expression_filter, 'numexpr', None)
+    elif expression_filter.numexpr is None:
+        pytest.skip("numexpr not installed")
+    return request.param
+
+
+@pytest.fixture
+def block():
+    return NumericBlock(pd.DataFrame({
+        'Solution Label': ['RM1', 'S1', 'S2', 'S3', 'Blank'],
+        'Cu 324.754': [2.0, 0.5, np.nan, 3.0, 0.0],
+        'Fe 238.204': [0.0, 2.0, 2.0, np.nan, 5.0],
+        'Zn': [2.0, 2.0, 0.0, 2.0, np.nan],
+    }))
+
+
+def mask(block, text):
+    return CompiledFilter(text, block.columns).evaluate(block).tolist()
+
+
+def test_and_binds_tighter_than_or(engine, block):
+    expected = [True, True, False, True, False]  # Cu > 1 or (Fe > 1 and Zn > 1)
+    assert mask(block, "Cu > 1 or Fe > 1 and Zn > 1") == expected
+    assert mask(block, "Cu > 1 or (Fe > 1 and Zn > 1)") == expected
+
+
+def test_parentheses_override_precedence(engine, block):
+    assert mask(block, "(Cu > 1 or Fe > 1) and Zn > 1") == [True, True, False, True, False]
+
+
+def test_not_binds_tighter_than_and(engine, block):
+    # (not Cu > 1) and Fe > 1; a NaN Cu is not > 1, so its negation holds
+    assert mask(block, "not Cu > 1 and Fe > 1") == [False, True, True, False, True]
+
+
+def test_nan_fails_every_comparison_but_not_equal(engine, block):
+    for op in ('>', '<', '>=', '<=', '=='):
+        assert mask(block, f"`Cu 324.754` {op} 1")[2] is False
+    assert mask(block, "`Cu 324.754` != 1")[2] is True
+    assert mask(block, "Fe 238.204 >= 0") == [True, True, True, False, True]
+
+
+def test_label_predicates(engine, block):
+    assert mask(block, "label startswith 'S' and Zn > 1") == [False, True, False, True, False]
+    assert mask(block, "label == 'Blank' or label contains 'M'") == [True, False, False, False, True]
+
+
+@pytest.mark.parametrize('text', ["Cu >", "Mn > 1", "label > 1", "1 > 2", "(Cu > 1", "Cu > 1 Fe"])
+def test_invalid_expressions_raise(block, text):
+    with pytest.raises(ExpressionError):
+        CompiledFilter(text, block.columns)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.sample_correction import CorrectionTransaction, first_rows_per_label, sample_rows
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'Solution Label': ['S1', 'S1', 'S2', 'S2', 'Blk'],
+        'Type': ['Samp', 'Samp', 'Samp', 'Std', 'Samp'],
+        'Act Wgt': [0.25, 0.25, 0.0, 0.25, 0.25],
+        'Act Vol': [50.0, 50.0, 50.0, 50.0, 50.0],
+        'DF': [1.0, 1.0, 1.0, 1.0, 1.0],
+        'Corr Con': [10.0, 20.0, 30.0, 40.0, 50.0],
+    })
+
+
+def test_sample_rows_skip_non_samp(df):
+    assert sample_rows(df, {'S1', 'S2'}).tolist() == [0, 1, 2]
+
+
+def test_first_rows_per_label(df):
+    assert first_rows_per_label(df, df['Type'] == 'Samp').tolist() == [0, 2, 4]
+
+
+def test_steps_apply_in_queue_order(df):
+    changes, n_rows = (CorrectionTransaction(df)
+                       .rescale(['S1'], 'Act Wgt', 0.5)
+                       .rescale(['S1'], 'Act Vol', 100.0)
+                       .commit())
+    assert df['Corr Con'].tolist()[:2] == [40.0, 80.0]  # x2 for weight, then x2 for volume
+    assert df['Act Wgt'].tolist()[:2] == [0.5, 0.5]
+    assert n_rows == 2
+    assert set(changes.columns) == {'Act Wgt', 'Act Vol', 'Corr Con'}
+
+
+def test_rescale_keeps_corr_con_when_old_value_is_zero(df):
+    CorrectionTransaction(df).rescale(['S2'], 'Act Wgt', 0.5).commit()
+    assert df.loc[2, 'Corr Con'] == 30.0
+    assert df.loc[2, 'Act Wgt'] == 0.5
+    assert df.loc[3, 'Act Wgt'] == 0.25  # Std row untouched
+
+
+def test_row_steps_and_coerced_columns(df):
+    df['DF'] = pd.Series([1.0, '2', 'x', 1.0, 1.0], dtype=object)  # as read from a sheet with text cells
+    changes, n_rows = (CorrectionTransaction(df)
+                       .scale([0, 4], 'Corr Con', factor=np.array([2.0, 0.5]), offset=1.0)
+                       .assign([2], 'DF', 4.0)
+                       .commit())
+    assert df['Corr Con'].tolist() == [21.0, 20.0, 30.0, 40.0, 26.0]
+    assert df.loc[2, 'DF'] == 4.0
+    assert n_rows == 3
+    assert changes.rows.tolist() == [0, 2, 4]
+
+
+def test_commit_returns_a_restorable_undo_entry(df):
+    original = df.copy()
+    transaction = CorrectionTransaction(df).rescale(['S1', 'S2'], 'Act Wgt', 0.5).set_value(['S1'], 'DF', 10.0)
+    assert len(transaction) == 2
+    changes, _ = transaction.commit()
+    assert len(transaction) == 0
+    assert not df.equals(original)
+    changes.restore(df)
+    pd.testing.assert_frame_equal(df, original)
+
+
+def test_empty_commit_changes_nothing(df):
+    original = df.copy()
+    changes, n_rows = CorrectionTransaction(df).commit()
+    assert n_rows == 0 and changes.nbytes == 0
+    pd.testing.assert_frame_equal(df, original)
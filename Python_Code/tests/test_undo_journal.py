@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.undo_journal import CellChanges, UndoJournal
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'Solution Label': ['S1', 'S2', 'S3', 'S4'],
+        'Corr Con': [1.0, 2.0, np.nan, 4.0],
+        'DF': [1.0, 1.0, 1.0, 1.0],
+    })
+
+
+def test_capture_and_restore_round_trip(df):
+    original = df.copy()
+    changes = CellChanges.capture(df, [1, 2], ['Corr Con', 'DF', 'Missing'])
+    df.iloc[[1, 2], 1] = [20.0, 30.0]
+    df.iloc[[1, 2], 2] = 5.0
+    changes.restore(df)
+    pd.testing.assert_frame_equal(df, original)
+    assert set(changes.columns) == {'Corr Con', 'DF'}
+
+
+def test_restore_into_replaced_frame(df):
+    changes = CellChanges.capture(df, [0], ['Corr Con'])
+    replaced = df.copy()
+    replaced.iloc[0, 1] = 99.0
+    changes.restore(replaced)
+    assert replaced['Corr Con'].iloc[0] == 1.0
+
+
+def test_restore_rejects_other_row_count(df):
+    changes = CellChanges.capture(df, [0], ['Corr Con'])
+    with pytest.raises(ValueError):
+        changes.restore(df.iloc[:3].copy())
+
+
+def entry(n_rows):
+    return {'data': CellChanges({'Corr Con': (np.arange(n_rows, dtype=np.int64), np.zeros(n_rows))}, n_rows)}
+
+
+def test_journal_drops_oldest_entries_over_budget():
+    size = entry(10)['data'].nbytes
+    journal = UndoJournal(budget_bytes=2 * size)
+    for payload in range(3):
+        journal.push(entry(10), payload=payload)
+    assert len(journal) == 2
+    assert journal.nbytes == 2 * size
+    assert journal.peek()[1] == 2 and len(journal) == 2
+    assert journal.pop()[1] == 2
+    assert journal.pop()[1] == 1
+    assert journal.pop() is None and journal.peek() is None
+    assert journal.nbytes == 0
+
+
+def test_journal_keeps_latest_entry_above_budget():
+    journal = UndoJournal(budget_bytes=1)
+    journal.push(entry(5), payload='old')
+    journal.push(entry(100), payload='new')
+    assert len(journal) == 1
+    assert journal.pop()[1] == 'new'
@@ -0,0 +1,90 @@
+import numpy as np
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Total size of old values kept for undo, per journal
+UNDO_BUDGET_BYTES = 64 * 1024 * 1024
+
+class CellChanges:
+    """Old values of some cells of one DataFrame, kept per column as (row positions, values) arrays.
+
+    Rows are positional, so restore() expects a frame with the same row order and length as the
+    one the changes were recorded on; the frame object itself may have been replaced meanwhile.
+    """
+    def __init__(self, columns, n_rows):
+        self.columns = columns  # {column: (rows, old_values)}
+        self.n_rows = n_rows
+
+    @classmethod
+    def capture(cls, df, rows, columns):
+        """Remember df's current values at the given row positions before they are overwritten."""
+        rows = np.asarray(rows, dtype=np.int64)
+        changes = {col: (rows, df[col].to_numpy()[rows].copy()) for col in columns if col in df.columns}
+        return cls(changes, len(df))
+
+    @property
+    def nbytes(self):
+        return sum(rows.nbytes + values.nbytes for rows, values in self.columns.values())
+
+    @property
+    def rows(self):
+        """Sorted positions of the rows with at least one changed cell."""
+        if not self.columns:
+            return np.array([], dtype=np.int64)
+        return np.unique(np.concatenate([rows for rows, _ in self.columns.values()]))
+
+    def restore(self, df):
+        """Write the old values back into df in place."""
+        if len(df) != self.n_rows:
+            raise ValueError(f"Frame has {len(df)} rows, changes were recorded on {self.n_rows}")
+        for col, (rows, values) in self.columns.items():
+            df.iloc[rows, df.columns.get_loc(col)] = values
+
+class UndoJournal:
+    """Undo stack of CellChanges entries whose total size is bounded by budget_bytes.
+
+    Each entry maps a frame name to its CellChanges, plus an optional small payload that is handed
+    back unchanged on pop(). When the budget is exceeded the oldest entries are dropped; the most
+    recent entry is always kept.
+    """
+    def __init__(self, budget_bytes=UNDO_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self._entries = deque()
+        self._nbytes = 0
+
+    def push(self, changes, payload=None):
+        size = sum(change.nbytes for change in changes.values())
+        self._entries.append((changes, payload, size))
+        self._nbytes += size
+        while len(self._entries) > 1 and self._nbytes > self.budget_bytes:
+            _, _, dropped = self._entries.popleft()
+            self._nbytes -= dropped
+            logger.debug(f"Undo budget exceeded, dropped oldest entry ({dropped} bytes)")
+
+    def pop(self):
+        """Latest (changes, payload), or None when there is nothing to undo."""
+        if not self._entries:
+            return None
+        changes, payload, size = self._entries.pop()
+        self._nbytes -= size
+        return changes, payload
+
+    def peek(self):
+        """Latest (changes, payload) without removing it, or None."""
+        if not self._entries:
+            return None
+        changes, payload, _ = self._entries[-1]
+        return changes, payload
+
+    def clear(self):
+        self._entries.clear()
+        self._nbytes = 0
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,51 +1,18 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel, QLineEdit, QPushButton, QTableView, QHeaderView, QGroupBox, QMessageBox, QProgressDialog, QCheckBox
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QItemSelectionModel, QItemSelection, QItemSelectionRange
-from PyQt6.QtGui import QStandardItemModel, QStandardItem, QColor
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel, QLineEdit, QPushButton, QTableView, QHeaderView, QGroupBox, QMessageBox, QCheckBox
+from PyQt6.QtCore import Qt, QItemSelectionModel, QItemSelection, QItemSelectionRange
+from PyQt6.QtGui import QStandardItemModel, QColor
+from utils.array_table_model import ArrayTableModel, ArrayColumn
+from utils.sample_correction import first_rows_per_label
 import pandas as pd
 import numpy as np
 import time
 import logging
-from collections import deque
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-class VolumeCorrectionThread(QThread):
-    """Thread for applying volume corrections in the background."""
-    progress = pyqtSignal(int)
-    finished = pyqtSignal(str, int)
-    error = pyqtSignal(str)
-
-    def __init__(self, df, solution_labels, new_volume):
-        super().__init__()
-        self.df = df.copy()
-        self.solution_labels = solution_labels
-        self.new_volume = new_volume
-
-    def run(self):
-        try:
-            corrected_rows = 0
-            total_rows = len(self.solution_labels)
-            for i, solution_label in enumerate(self.solution_labels):
-                mask = (self.df['Solution Label'] == solution_label) & (self.df['Type'] == 'Samp')
-                matching_rows = self.df[mask]
-                if not matching_rows.empty:
-                    for idx in matching_rows.index:
-                        current_volume = float(self.df.loc[idx, 'Act Vol'])
-                        current_corr_con = float(self.df.loc[idx, 'Corr Con'])
-                        corrected_corr_con = (self.new_volume / current_volume) * current_corr_con if current_volume != 0 else current_corr_con
-                        self.df.loc[idx, 'Corr Con'] = corrected_corr_con
-                        self.df.loc[idx, 'Act Vol'] = self.new_volume
-                    corrected_rows += len(matching_rows)
-                if total_rows > 10:
-                    self.progress.emit(int((i + 1) / total_rows * 100))
-            self.finished.emit(self.df.to_json(), corrected_rows)
-        except Exception as e:
-            self.error.emit(str(e))
-
 class VolumeCheckFrame(QWidget):
-    data_changed = pyqtSignal()  # Signal to notify data changes
 
     def __init__(self, app, results_frame, parent=None):
         super().__init__(parent)
@@ -61,7 +28,6 @@ class VolumeCheckFrame(QWidget):
         self.included_samples = set()
         self.volume_value = 50.0
         self.new_volume = 50.0
-        self.undo_stack = deque()
         self.is_select_all_processing = False
         self.setup_ui()
 
@@ -171,10 +137,11 @@ class VolumeCheckFrame(QWidget):
         check_button.clicked.connect(self.check_volumes)
         input_layout.addWidget(check_button)
 
-        undo_button = QPushButton("Undo Last Change")
-        undo_button.setToolTip("Undo the last volume correction")
-        undo_button.clicked.connect(self.undo_last_change)
-        input_layout.addWidget(undo_button)
+        self.undo_button = QPushButton("Undo Last Change")
+        self.undo_button.setToolTip("Undo the last correction (weight, volume, DF or drift)")
+        self.undo_button.clicked.connect(self.undo_last_change)
+        self.undo_button.setEnabled(False)
+        input_layout.addWidget(self.undo_button)
 
         input_layout.addStretch()
         main_layout.addWidget(input_group)
@@ -261,28 +228,22 @@ class VolumeCheckFrame(QWidget):
         selection = QItemSelection()
         deselection = QItemSelection()
 
+        labels = [str(label) for label in model.column_values(1)] if isinstance(model, ArrayTableModel) else []
+        all_rows = QItemSelectionRange(model.index(0, 0), model.index(model.rowCount() - 1, model.columnCount() - 1)) if labels else None
         if state == 2:  # Qt.CheckState.Checked
             logger.debug(f"Processing Select All: Checking all rows")
-            for row in range(model.rowCount()):
-                index = model.index(row, 0)
-                selection.append(QItemSelectionRange(index, model.index(row, model.columnCount() - 1)))
-                include_item = model.item(row, 0)
-                if include_item:
-                    include_item.setCheckState(Qt.CheckState.Checked)
-                    solution_label = model.data(model.index(row, 1))
-                    self.included_samples.add(solution_label)
-            self.selected_solution_labels = [model.data(model.index(row, 1)) for row in range(model.rowCount())]
-            logger.debug(f"Select All: Selected {len(self.selected_solution_labels)} rows, included: {self.included_samples}")
+            if all_rows is not None:
+                selection.append(all_rows)
+                model.set_all_checked(True)
+            self.included_samples.update(labels)
+            self.selected_solution_labels = labels
+            logger.debug(f"Select All: Selected {len(self.selected_solution_labels)} rows, included: {len(self.included_samples)}")
         else:  # Qt.CheckState.Unchecked
             logger.debug(f"Processing Select All: Unchecking all rows")
-            for row in range(model.rowCount()):
-                index = model.index(row, 0)
-                deselection.append(QItemSelectionRange(index, model.index(row, model.columnCount() - 1)))
-                include_item = model.item(row, 0)
-                if include_item:
-                    include_item.setCheckState(Qt.CheckState.Unchecked)
-                    solution_label = model.data(model.index(row, 1))
-                    self.included_samples.discard(solution_label)
+            if all_rows is not None:
+                deselection.append(all_rows)
+                model.set_all_checked(False)
+            self.included_samples.difference_update(labels)
             self.selected_solution_labels = []
             logger.debug("Select All: Cleared selections and checkboxes")
 
@@ -314,14 +275,10 @@ class VolumeCheckFrame(QWidget):
             return
 
         df['Corr Con'] = pd.to_numeric(df['Corr Con'], errors='coerce')
-        self.df_cache = df[df['Corr Con'].notna()].copy()
-        df = self.df_cache
+        self.reload_data()
 
         data_filter_start = time.time()
-        sample_data = df[df['Type'] == 'Samp']
-        self.bad_volumes = sample_data[
-            (sample_data['Act Vol'] != self.volume_value)
-        ][['Solution Label', 'Act Vol', 'Corr Con']].drop_duplicates(subset=['Solution Label'])
+        self.recalculate_bad_volumes()
         
         # Always update initial_bad_volumes and original_bad_volumes to include new data
         self.initial_bad_volumes = self.bad_volumes.copy()
@@ -334,49 +291,51 @@ class VolumeCheckFrame(QWidget):
             QMessageBox.information(self, "Info", "No issues found with volumes.")
         logger.debug(f"Check volumes took {time.time() - start_time:.3f} seconds")
 
+    def reload_data(self):
+        """Re-read the app data into df_cache, keeping the rows with a numeric Corr Con."""
+        df = self.app.get_data().copy()
+        df['Corr Con'] = pd.to_numeric(df['Corr Con'], errors='coerce')
+        self.df_cache = df[df['Corr Con'].notna()]
+
+    def recalculate_bad_volumes(self):
+        """Recalculate bad_volumes: the first sample row of each Solution Label whose volume differs from the expected one."""
+        df = self.df_cache
+        bad = (df['Type'] == 'Samp') & (df['Act Vol'] != self.volume_value)
+        self.bad_volumes = df.iloc[first_rows_per_label(df, bad.to_numpy())][['Solution Label', 'Act Vol', 'Corr Con']]
+
     def update_correction_table(self):
         """Update the correction table with bad volumes and preserve corrected volumes."""
         start_time = time.time()
-        model = QStandardItemModel()
-        model.setHorizontalHeaderLabels(["Include", "Solution Label", "Old Volume", "Old Corr Con", "New Volume", "New Corr Con"])
+        headers = ["Include", "Solution Label", "Old Volume", "Old Corr Con", "New Volume", "New Corr Con"]
+        columns = [ArrayColumn(header, []) for header in headers]
+        checked = None
 
         if self.bad_volumes is not None and not self.bad_volumes.empty:
-            self.correction_volume = {}
-            for _, row in self.bad_volumes.iterrows():
-                solution_label = row['Solution Label']
-                old_volume = float(row['Act Vol'])
-                old_corr_con = float(row['Corr Con'])
-
-                include_item = QStandardItem()
-                include_item.setCheckable(True)
-                include_item.setCheckState(Qt.CheckState.Checked if solution_label in self.included_samples else Qt.CheckState.Unchecked)
-
-                label_item = QStandardItem(str(solution_label))
-                label_item.setEditable(False)
-
-                old_volume_item = QStandardItem(f"{old_volume:.3f}")
-                old_volume_item.setEditable(False)
-                old_volume_item.setBackground(QColor("#FFE0B2"))
-
-                old_corr_con_item = QStandardItem(f"{old_corr_con:.3f}")
-                old_corr_con_item.setEditable(False)
-                old_corr_con_item.setBackground(QColor("#BBDEFB"))
-
-                new_volume = self.corrected_volumes.get(solution_label, {}).get('new_volume', old_volume)
-                new_corr_con = self.corrected_volumes.get(solution_label, {}).get('new_corr_con', old_corr_con)
-                new_volume_item = QStandardItem(f"{new_volume:.3f}")
-                new_volume_item.setEditable(False)
-                new_volume_item.setBackground(QColor("#C8E6C9"))
-
-                new_corr_con_item = QStandardItem(f"{new_corr_con:.3f}")
-                new_corr_con_item.setEditable(False)
-                new_corr_con_item.setBackground(QColor("#A5D6A7"))
-
-                model.appendRow([include_item, label_item, old_volume_item, old_corr_con_item, new_volume_item, new_corr_con_item])
-                self.correction_volume[solution_label] = old_volume
-
-            model.itemChanged.connect(self.toggle_include)
-
+            labels = self.bad_volumes['Solution Label'].to_numpy(dtype=object)
+            old_volumes = self.bad_volumes['Act Vol'].astype(float).to_numpy()
+            old_corr_cons = self.bad_volumes['Corr Con'].astype(float).to_numpy()
+            # Use corrected volumes if available, otherwise use original volumes
+            corrected = pd.DataFrame.from_dict(self.corrected_volumes, orient='index')
+            label_series = pd.Series(labels)
+            new_volumes = old_volumes.copy()
+            new_corr_cons = old_corr_cons.copy()
+            if not corrected.empty:
+                new_volumes = label_series.map(corrected['new_volume']).fillna(pd.Series(old_volumes)).to_numpy(dtype=float)
+                new_corr_cons = label_series.map(corrected['new_corr_con']).fillna(pd.Series(old_corr_cons)).to_numpy(dtype=float)
+            checked = label_series.isin(self.included_samples).to_numpy()
+            self.correction_volume = dict(zip(labels, old_volumes))
+
+            columns = [
+                ArrayColumn("Include", np.full(len(labels), "", dtype=object)),
+                ArrayColumn("Solution Label", labels),
+                ArrayColumn("Old Volume", old_volumes, decimals=3, background=QColor("#FFE0B2")),
+                ArrayColumn("Old Corr Con", old_corr_cons, decimals=3, background=QColor("#BBDEFB")),
+                ArrayColumn("New Volume", new_volumes, decimals=3, background=QColor("#C8E6C9")),
+                ArrayColumn("New Corr Con", new_corr_cons, decimals=3, background=QColor("#A5D6A7")),
+            ]
+
+        model = ArrayTableModel(columns, check_column=0, checked=checked)
+        model.check_toggled.connect(self.toggle_include)
         self.correction_table.setModel(model)
         self.correction_table.selectionModel().selectionChanged.connect(self.on_selection_changed)
 
@@ -390,28 +349,22 @@ class VolumeCheckFrame(QWidget):
 
         logger.debug(f"Updating correction table took {time.time() - start_time:.3f} seconds")
 
-    def toggle_include(self, item):
+    def toggle_include(self, row, checked):
         """Toggle inclusion of a sample and select/deselect the row."""
-        if item.column() == 0:
-            model = self.correction_table.model()
-            solution_label = model.data(model.index(item.row(), 1))
-            new_state = item.checkState()
-            selection_model = self.correction_table.selectionModel()
-            row_index = model.index(item.row(), 0)
-
-            if new_state == Qt.CheckState.Checked:
-                self.included_samples.add(solution_label)
-                selection = QItemSelection(row_index, model.index(item.row(), model.columnCount() - 1))
-                selection_model.select(selection, QItemSelectionModel.SelectionFlag.Select | QItemSelectionModel.SelectionFlag.Rows)
-                self.selected_solution_labels.append(solution_label)
-            else:
-                self.included_samples.discard(solution_label)
-                deselection = QItemSelection(row_index, model.index(item.row(), model.columnCount() - 1))
-                selection_model.select(deselection, QItemSelectionModel.SelectionFlag.Deselect | QItemSelectionModel.SelectionFlag.Rows)
-                if solution_label in self.selected_solution_labels:
-                    self.selected_solution_labels.remove(solution_label)
-
-            logger.debug(f"Toggled include for {solution_label} to {'Checked' if new_state == Qt.CheckState.Checked else 'Unchecked'}, selected labels: {self.selected_solution_labels}")
+        model = self.correction_table.model()
+        solution_label = model.data(model.index(row, 1))
+        selection_model = self.correction_table.selectionModel()
+        row_selection = QItemSelection(model.index(row, 0), model.index(row, model.columnCount() - 1))
+
+        if checked:
+            self.included_samples.add(solution_label)
+            selection_model.select(row_selection, QItemSelectionModel.SelectionFlag.Select | QItemSelectionModel.SelectionFlag.Rows)
+            self.selected_solution_labels.append(solution_label)
+        else:
+            self.included_samples.discard(solution_label)
+            selection_model.select(row_selection, QItemSelectionModel.SelectionFlag.Deselect | QItemSelectionModel.SelectionFlag.Rows)
+            if solution_label in self.selected_solution_labels:
+                self.selected_solution_labels.remove(solution_label)
 
     def apply_volume_correction(self):
         """Apply volume correction to the included samples and update table."""
@@ -445,8 +398,6 @@ class VolumeCheckFrame(QWidget):
             QMessageBox.warning(self, "Warning", "No samples included! Check 'Include' checkboxes.")
             return
 
-        self.undo_stack.append(df.copy().to_json())
-
         # Update corrected volumes dictionary
         if self.bad_volumes is not None:
             bad_volumes_dict = self.bad_volumes.set_index('Solution Label')[['Act Vol', 'Corr Con']].to_dict('index')
@@ -462,89 +413,47 @@ class VolumeCheckFrame(QWidget):
                     }
                     logger.debug(f"Stored corrected volumes for {solution_label}: Old Volume={old_volume:.3f}, New Volume={self.new_volume:.3f}, New Corr Con={new_corr_con:.3f}")
 
-        if len(valid_labels) <= 10:
-            try:
-                corrected_rows = 0
-                for solution_label in valid_labels:
-                    mask = (df['Solution Label'] == solution_label) & (df['Type'] == 'Samp')
-                    matching_rows = df[mask]
-                    if not matching_rows.empty:
-                        for idx in matching_rows.index:
-                            current_volume = float(df.loc[idx, 'Act Vol'])
-                            current_corr_con = float(df.loc[idx, 'Corr Con'])
-                            corrected_corr_con = (self.new_volume / current_volume) * current_corr_con if current_volume != 0 else current_corr_con
-                            df.loc[idx, 'Corr Con'] = corrected_corr_con
-                            df.loc[idx, 'Act Vol'] = self.new_volume
-                        corrected_rows += len(matching_rows)
-                self.df_cache = df
-                self.app.set_data(self.df_cache)
-                self.data_changed.emit()
-                self.app.notify_data_changed()
-                sample_data = self.df_cache[self.df_cache['Type'] == 'Samp']
-                self.bad_volumes = sample_data[
-                    (sample_data['Act Vol'] != self.volume_value)
-                ][['Solution Label', 'Act Vol', 'Corr Con']].drop_duplicates(subset=['Solution Label'])
-                self.update_correction_table()
-                self.correction_table.clearSelection()
-                self.selected_solution_labels = []
-                self.included_samples.clear()
-                self.select_all_checkbox.setCheckState(Qt.CheckState.Unchecked)
-                QMessageBox.information(self, "Success", f"Corrected {corrected_rows} rows")
-                if self.bad_volumes.empty:
-                    QMessageBox.information(self, "Info", "All volumes are now within the valid range!")
-                logger.debug(f"Apply volume correction took {time.time() - start_time:.3f} seconds")
-            except Exception as e:
-                QMessageBox.warning(self, "Error", f"Failed: {str(e)}")
-                logger.error(f"Error in apply_volume_correction: {str(e)}")
+        try:
+            self.app.begin_corrections().rescale(valid_labels, 'Act Vol', self.new_volume)
+            corrected_rows = self.app.commit_corrections(on_undo=self.on_correction_undone)
+        except Exception as e:
+            self.app.discard_corrections()
+            QMessageBox.warning(self, "Error", f"Failed: {str(e)}")
+            logger.error(f"Error in apply_volume_correction: {str(e)}")
             return
-
-        self.thread = VolumeCorrectionThread(df, valid_labels, self.new_volume)
-        self.progress_dialog = QProgressDialog("Applying volume correction...", "Cancel", 0, 100, self)
-        self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
-        self.progress_dialog.setAutoClose(True)
-        self.progress_dialog.setMinimumDuration(0)
-        self.progress_dialog.canceled.connect(self.thread.terminate)
-        self.thread.progress.connect(self.progress_dialog.setValue)
-        self.thread.finished.connect(self.on_correction_finished)
-        self.thread.error.connect(self.on_correction_error)
-        self.thread.start()
-
-        logger.debug(f"Starting apply_volume_correction took {time.time() - start_time:.3f} seconds")
+        self.on_correction_finished(corrected_rows)
+        logger.debug(f"Apply volume correction took {time.time() - start_time:.3f} seconds")
 
     def undo_last_change(self):
-        """Undo the last volume correction."""
-        if not self.undo_stack:
+        """Undo the last correction batch (weight, volume, DF or drift)."""
+        try:
+            undone = self.app.undo_corrections()
+        except (ValueError, TypeError) as e:
+            logger.error(f"Undo failed: {str(e)}")
+            QMessageBox.warning(self, "Warning", "Data changed since the last correction; it cannot be undone.")
+            return
+        if not undone:
             QMessageBox.information(self, "Info", "No changes to undo!")
             return
-        prev_json = self.undo_stack.pop()
-        self.df_cache = pd.read_json(prev_json)
-        self.app.set_data(self.df_cache)
-        self.data_changed.emit()  # Emit signal to notify ResultsFrame
-        self.app.notify_data_changed()
-        sample_data = self.df_cache[self.df_cache['Type'] == 'Samp']
-        self.bad_volumes = sample_data[
-            (sample_data['Act Vol'] != self.volume_value)
-        ][['Solution Label', 'Act Vol', 'Corr Con']].drop_duplicates(subset=['Solution Label'])
+        QMessageBox.information(self, "Success", "Last change undone")
+        if self.bad_volumes is not None and self.bad_volumes.empty:
+            QMessageBox.information(self, "Info", "No issues found with volumes after undo.")
+
+    def on_correction_undone(self, changes):
+        """Refresh the bad-volume table once a volume correction has been undone."""
+        self.reload_data()
+        self.recalculate_bad_volumes()
         self.corrected_volumes.clear()
         self.included_samples.clear()
         self.correction_table.clearSelection()
         self.selected_solution_labels = []
         self.select_all_checkbox.setCheckState(Qt.CheckState.Unchecked)
         self.update_correction_table()
-        QMessageBox.information(self, "Success", "Last change undone")
-        if self.bad_volumes.empty:
-            QMessageBox.information(self, "Info", "No issues found with volumes after undo.")
 
-    def on_correction_finished(self, df_json, corrected_rows):
-        """Handle thread completion."""
-        self.df_cache = pd.read_json(df_json)
-        self.app.set_data(self.df_cache)
-        self.data_changed.emit()  # Emit signal to notify ResultsFrame
-        self.app.notify_data_changed()
-        sample_data = self.df_cache[self.df_cache['Type'] == 'Samp']
-        self.bad_volumes = sample_data[
-            (sample_data['Act Vol'] != self.volume_value)
-        ][['Solution Label', 'Act Vol', 'Corr Con']].drop_duplicates(subset=['Solution Label'])
+    def on_correction_finished(self, corrected_rows):
+        """Refresh the bad-volume table from the corrected data."""
+        self.reload_data()
+        self.recalculate_bad_volumes()
         self.update_correction_table()
         self.correction_table.clearSelection()
         self.selected_solution_labels = []
@@ -553,12 +462,6 @@ class VolumeCheckFrame(QWidget):
         QMessageBox.information(self, "Success", f"Corrected volumes and Corr Con values for {corrected_rows} rows")
         if self.bad_volumes.empty:
             QMessageBox.information(self, "Info", "All volumes are now within the valid range!")
-        self.progress_dialog.close()
-
-    def on_correction_error(self, error_msg):
-        """Handle thread errors."""
-        QMessageBox.warning(self, "Error", f"Failed to apply corrections: {error_msg}")
-        self.progress_dialog.close()
 
     def reset_state(self):
         """Reset all internal state and UI."""
@@ -575,7 +478,6 @@ class VolumeCheckFrame(QWidget):
         self.included_samples = set()
         self.volume_value = 50.0
         self.new_volume = 50.0
-        self.undo_stack = deque()
         self.is_select_all_processing = False
         
         # Reset UI elements
@@ -1,51 +1,18 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel, QLineEdit, QPushButton, QTableView, QHeaderView, QGroupBox, QMessageBox, QProgressDialog, QCheckBox
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QItemSelectionModel, QItemSelection, QItemSelectionRange
-from PyQt6.QtGui import QStandardItemModel, QStandardItem, QColor
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel, QLineEdit, QPushButton, QTableView, QHeaderView, QGroupBox, QMessageBox, QCheckBox
+from PyQt6.QtCore import Qt, QItemSelectionModel, QItemSelection, QItemSelectionRange
+from PyQt6.QtGui import QStandardItemModel, QColor
+from utils.array_table_model import ArrayTableModel, ArrayColumn
+from utils.sample_correction import first_rows_per_label
 import pandas as pd
 import numpy as np
 import time
 import logging
-from collections import deque
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-class WeightCorrectionThread(QThread):
-    """Thread for applying weight corrections in the background."""
-    progress = pyqtSignal(int)
-    finished = pyqtSignal(str, int)
-    error = pyqtSignal(str)
-
-    def __init__(self, df, solution_labels, new_weight):
-        super().__init__()
-        self.df = df.copy()
-        self.solution_labels = solution_labels
-        self.new_weight = new_weight
-
-    def run(self):
-        try:
-            corrected_rows = 0
-            total_rows = len(self.solution_labels)
-            for i, solution_label in enumerate(self.solution_labels):
-                mask = (self.df['Solution Label'] == solution_label) & (self.df['Type'] == 'Samp')
-                matching_rows = self.df[mask]
-                if not matching_rows.empty:
-                    for idx in matching_rows.index:
-                        current_weight = float(self.df.loc[idx, 'Act Wgt'])
-                        current_corr_con = float(self.df.loc[idx, 'Corr Con'])
-                        corrected_corr_con = (self.new_weight / current_weight) * current_corr_con if current_weight != 0 else current_corr_con
-                        self.df.loc[idx, 'Corr Con'] = corrected_corr_con
-                        self.df.loc[idx, 'Act Wgt'] = self.new_weight
-                    corrected_rows += len(matching_rows)
-                if total_rows > 10:
-                    self.progress.emit(int((i + 1) / total_rows * 100))
-            self.finished.emit(self.df.to_json(), corrected_rows)
-        except Exception as e:
-            self.error.emit(str(e))
-
 class WeightCheckFrame(QWidget):
-    data_changed = pyqtSignal()
     def __init__(self, app, parent=None):
         super().__init__(parent)
         self.app = app
@@ -59,7 +26,6 @@ class WeightCheckFrame(QWidget):
         self.weight_min = 0.190
         self.weight_max = 0.210
         self.new_weight = 0.2
-        self.undo_stack = deque()
         self.is_select_all_processing = False
         self.setup_ui()
 
@@ -175,10 +141,11 @@ class WeightCheckFrame(QWidget):
         check_button.clicked.connect(self.check_weights)
         input_layout.addWidget(check_button)
 
-        undo_button = QPushButton("Undo Last Change")
-        undo_button.setToolTip("Undo the last weight correction")
-        undo_button.clicked.connect(self.undo_last_change)
-        input_layout.addWidget(undo_button)
+        self.undo_button = QPushButton("Undo Last Change")
+        self.undo_button.setToolTip("Undo the last correction (weight, volume, DF or drift)")
+        self.undo_button.clicked.connect(self.undo_last_change)
+        self.undo_button.setEnabled(False)
+        input_layout.addWidget(self.undo_button)
 
         input_layout.addStretch()
         main_layout.addWidget(input_group)
@@ -264,28 +231,22 @@ class WeightCheckFrame(QWidget):
         selection = QItemSelection()
         deselection = QItemSelection()
 
+        labels = [str(label) for label in model.column_values(1)] if isinstance(model, ArrayTableModel) else []
+        all_rows = QItemSelectionRange(model.index(0, 0), model.index(model.rowCount() - 1, model.columnCount() - 1)) if labels else None
         if state == 2:  # Qt.CheckState.Checked
             logger.debug(f"Processing Select All: Checking all rows")
-            for row in range(model.rowCount()):
-                index = model.index(row, 0)
-                selection.append(QItemSelectionRange(index, model.index(row, model.columnCount() - 1)))
-                include_item = model.item(row, 0)
-                if include_item:
-                    include_item.setCheckState(Qt.CheckState.Checked)
-                    solution_label = model.data(model.index(row, 1))
-                    self.included_samples.add(solution_label)
-            self.selected_solution_labels = [model.data(model.index(row, 1)) for row in range(model.rowCount())]
-            logger.debug(f"Select All: Selected {len(self.selected_solution_labels)} rows, included: {self.included_samples}")
+            if all_rows is not None:
+                selection.append(all_rows)
+                model.set_all_checked(True)
+            self.included_samples.update(labels)
+            self.selected_solution_labels = labels
+            logger.debug(f"Select All: Selected {len(self.selected_solution_labels)} rows, included: {len(self.included_samples)}")
         else:  # Qt.CheckState.Unchecked
             logger.debug(f"Processing Select All: Unchecking all rows")
-            for row in range(model.rowCount()):
-                index = model.index(row, 0)
-                deselection.append(QItemSelectionRange(index, model.index(row, model.columnCount() - 1)))
-                include_item = model.item(row, 0)
-                if include_item:
-                    include_item.setCheckState(Qt.CheckState.Unchecked)
-                    solution_label = model.data(model.index(row, 1))
-                    self.included_samples.discard(solution_label)
+            if all_rows is not None:
+                deselection.append(all_rows)
+                model.set_all_checked(False)
+            self.included_samples.difference_update(labels)
             self.selected_solution_labels = []
             logger.debug("Select All: Cleared selections and checkboxes")
 
@@ -318,14 +279,10 @@ class WeightCheckFrame(QWidget):
             return
 
         df['Corr Con'] = pd.to_numeric(df['Corr Con'], errors='coerce')
-        self.df_cache = df[df['Corr Con'].notna()].copy()
-        df = self.df_cache
+        self.reload_data()
 
         data_filter_start = time.time()
-        sample_data = df[df['Type'] == 'Samp']
-        self.bad_weights = sample_data[
-            (sample_data['Act Wgt'] < self.weight_min) | (sample_data['Act Wgt'] > self.weight_max)
-        ][['Solution Label', 'Act Wgt', 'Corr Con']].drop_duplicates(subset=['Solution Label'])
+        self.recalculate_bad_weights()
         
         # Always reset original_bad_weights to include new data
         self.original_bad_weights = self.bad_weights.copy()  # Update original_bad_weights
@@ -336,50 +293,51 @@ class WeightCheckFrame(QWidget):
             QMessageBox.information(self, "Info", "No issues found with weights.")
         logger.debug(f"Check weights took {time.time() - start_time:.3f} seconds")
 
+    def reload_data(self):
+        """Re-read the app data into df_cache, keeping the rows with a numeric Corr Con."""
+        df = self.app.get_data().copy()
+        df['Corr Con'] = pd.to_numeric(df['Corr Con'], errors='coerce')
+        self.df_cache = df[df['Corr Con'].notna()]
+
+    def recalculate_bad_weights(self):
+        """Recalculate bad_weights: the first out-of-range sample row of each Solution Label."""
+        df = self.df_cache
+        bad = (df['Type'] == 'Samp') & ((df['Act Wgt'] < self.weight_min) | (df['Act Wgt'] > self.weight_max))
+        self.bad_weights = df.iloc[first_rows_per_label(df, bad.to_numpy())][['Solution Label', 'Act Wgt', 'Corr Con']]
+
     def update_correction_table(self):
         """Update the correction table with bad weights and preserve corrected weights."""
         start_time = time.time()
-        model = QStandardItemModel()
-        model.setHorizontalHeaderLabels(["Include", "Solution Label", "Old Weight", "Old Corr Con", "New Weight", "New Corr Con"])
+        headers = ["Include", "Solution Label", "Old Weight", "Old Corr Con", "New Weight", "New Corr Con"]
+        columns = [ArrayColumn(header, []) for header in headers]
+        checked = None
 
         if self.bad_weights is not None and not self.bad_weights.empty:
-            self.correction_weight = {}
-            for _, row in self.bad_weights.iterrows():  # Use bad_weights instead of original_bad_weights
-                solution_label = row['Solution Label']
-                old_weight = float(row['Act Wgt'])
-                old_corr_con = float(row['Corr Con'])
-
-                include_item = QStandardItem()
-                include_item.setCheckable(True)
-                include_item.setCheckState(Qt.CheckState.Checked if solution_label in self.included_samples else Qt.CheckState.Unchecked)
-
-                label_item = QStandardItem(str(solution_label))
-                label_item.setEditable(False)
-
-                old_weight_item = QStandardItem(f"{old_weight:.3f}")
-                old_weight_item.setEditable(False)
-                old_weight_item.setBackground(QColor("#FFE0B2"))
-
-                old_corr_con_item = QStandardItem(f"{old_corr_con:.3f}")
-                old_corr_con_item.setEditable(False)
-                old_corr_con_item.setBackground(QColor("#BBDEFB"))
-
-                # Use corrected weights if available, otherwise use original weights
-                new_weight = self.corrected_weights.get(solution_label, {}).get('new_weight', old_weight)
-                new_corr_con = self.corrected_weights.get(solution_label, {}).get('new_corr_con', old_corr_con)
-                new_weight_item = QStandardItem(f"{new_weight:.3f}")
-                new_weight_item.setEditable(False)
-                new_weight_item.setBackground(QColor("#C8E6C9"))
-
-                new_corr_con_item = QStandardItem(f"{new_corr_con:.3f}")
-                new_corr_con_item.setEditable(False)
-                new_corr_con_item.setBackground(QColor("#A5D6A7"))
-
-                model.appendRow([include_item, label_item, old_weight_item, old_corr_con_item, new_weight_item, new_corr_con_item])
-                self.correction_weight[solution_label] = old_weight
-
-                model.itemChanged.connect(self.toggle_include)
-
+            labels = self.bad_weights['Solution Label'].to_numpy(dtype=object)
+            old_weights = self.bad_weights['Act Wgt'].astype(float).to_numpy()
+            old_corr_cons = self.bad_weights['Corr Con'].astype(float).to_numpy()
+            # Use corrected weights if available, otherwise use original weights
+            corrected = pd.DataFrame.from_dict(self.corrected_weights, orient='index')
+            label_series = pd.Series(labels)
+            new_weights = old_weights.copy()
+            new_corr_cons = old_corr_cons.copy()
+            if not corrected.empty:
+                new_weights = label_series.map(corrected['new_weight']).fillna(pd.Series(old_weights)).to_numpy(dtype=float)
+                new_corr_cons = label_series.map(corrected['new_corr_con']).fillna(pd.Series(old_corr_cons)).to_numpy(dtype=float)
+            checked = label_series.isin(self.included_samples).to_numpy()
+            self.correction_weight = dict(zip(labels, old_weights))
+
+            columns = [
+                ArrayColumn("Include", np.full(len(labels), "", dtype=object)),
+                ArrayColumn("Solution Label", labels),
+                ArrayColumn("Old Weight", old_weights, decimals=3, background=QColor("#FFE0B2")),
+                ArrayColumn("Old Corr Con", old_corr_cons, decimals=3, background=QColor("#BBDEFB")),
+                ArrayColumn("New Weight", new_weights, decimals=3, background=QColor("#C8E6C9")),
+                ArrayColumn("New Corr Con", new_corr_cons, decimals=3, background=QColor("#A5D6A7")),
+            ]
+
+        model = ArrayTableModel(columns, check_column=0, checked=checked)
+        model.check_toggled.connect(self.toggle_include)
         self.correction_table.setModel(model)
         self.correction_table.selectionModel().selectionChanged.connect(self.on_selection_changed)
 
@@ -393,28 +351,22 @@ class WeightCheckFrame(QWidget):
 
         logger.debug(f"Updating correction table took {time.time() - start_time:.3f} seconds")
 
-    def toggle_include(self, item):
+    def toggle_include(self, row, checked):
         """Toggle inclusion of a sample and select/deselect the row."""
-        if item.column() == 0:
-            model = self.correction_table.model()
-            solution_label = model.data(model.index(item.row(), 1))
-            new_state = item.checkState()
-            selection_model = self.correction_table.selectionModel()
-            row_index = model.index(item.row(), 0)
-
-            if new_state == Qt.CheckState.Checked:
-                self.included_samples.add(solution_label)
-                selection = QItemSelection(row_index, model.index(item.row(), model.columnCount() - 1))
-                selection_model.select(selection, QItemSelectionModel.SelectionFlag.Select | QItemSelectionModel.SelectionFlag.Rows)
-                self.selected_solution_labels.append(solution_label)
-            else:
-                self.included_samples.discard(solution_label)
-                deselection = QItemSelection(row_index, model.index(item.row(), model.columnCount() - 1))
-                selection_model.select(deselection, QItemSelectionModel.SelectionFlag.Deselect | QItemSelectionModel.SelectionFlag.Rows)
-                if solution_label in self.selected_solution_labels:
-                    self.selected_solution_labels.remove(solution_label)
-
-            # logger.debug(f"Toggled include for {solution_label} to {'Checked' if new_state == Qt.CheckState.Checked else 'Unchecked'}, selected labels: {self.selected_solution_labels}")
+        model = self.correction_table.model()
+        solution_label = model.data(model.index(row, 1))
+        selection_model = self.correction_table.selectionModel()
+        row_selection = QItemSelection(model.index(row, 0), model.index(row, model.columnCount() - 1))
+
+        if checked:
+            self.included_samples.add(solution_label)
+            selection_model.select(row_selection, QItemSelectionModel.SelectionFlag.Select | QItemSelectionModel.SelectionFlag.Rows)
+            self.selected_solution_labels.append(solution_label)
+        else:
+            self.included_samples.discard(solution_label)
+            selection_model.select(row_selection, QItemSelectionModel.SelectionFlag.Deselect | QItemSelectionModel.SelectionFlag.Rows)
+            if solution_label in self.selected_solution_labels:
+                self.selected_solution_labels.remove(solution_label)
 
     def apply_weight_correction(self):
             start_time = time.time()
@@ -445,8 +397,6 @@ class WeightCheckFrame(QWidget):
                 QMessageBox.warning(self, "Warning", "No samples included! Check 'Include' checkboxes.")
                 return
 
-            self.undo_stack.append(df.copy().to_json())
-
             if self.original_bad_weights is not None:
                 bad_weights_dict = self.original_bad_weights.set_index('Solution Label')[['Act Wgt', 'Corr Con']].to_dict('index')
                 for solution_label in valid_labels:
@@ -461,73 +411,38 @@ class WeightCheckFrame(QWidget):
                         }
                         logger.debug(f"Stored corrected weights for {solution_label}: Old Weight={old_weight:.3f}, New Weight={new_weight:.3f}, New Corr Con={new_corr_con:.3f}")
 
-            if len(valid_labels) <= 10:
-                try:
-                    corrected_rows = 0
-                    for solution_label in valid_labels:
-                        mask = (df['Solution Label'] == solution_label) & (df['Type'] == 'Samp')
-                        matching_rows = df[mask]
-                        if not matching_rows.empty:
-                            for idx in matching_rows.index:
-                                current_weight = float(df.loc[idx, 'Act Wgt'])
-                                current_corr_con = float(df.loc[idx, 'Corr Con'])
-                                corrected_corr_con = (new_weight / current_weight) * current_corr_con if current_weight != 0 else current_corr_con
-                                df.loc[idx, 'Corr Con'] = corrected_corr_con
-                                df.loc[idx, 'Act Wgt'] = new_weight
-                            corrected_rows += len(matching_rows)
-                    self.df_cache = df
-                    self.app.set_data(self.df_cache)
-                    self.data_changed.emit()
-                    sample_data = self.df_cache[self.df_cache['Type'] == 'Samp']
-                    self.bad_weights = sample_data[
-                        (sample_data['Act Wgt'] < self.weight_min) | (sample_data['Act Wgt'] > self.weight_max)
-                    ][['Solution Label', 'Act Wgt', 'Corr Con']].drop_duplicates(subset=['Solution Label'])
-                    logger.debug(f"Updated bad_weights shape: {self.bad_weights.shape}")
-                    logger.debug(f"Updated bad_weights Solution Labels: {self.bad_weights['Solution Label'].tolist()}")
-                    self.update_correction_table()
-                    self.correction_table.clearSelection()
-                    self.selected_solution_labels = []
-                    self.included_samples.clear()
-                    self.select_all_checkbox.setCheckState(Qt.CheckState.Unchecked)
-                    self.app.notify_data_changed()  # Notify all tabs of data change
-                    QMessageBox.information(self, "Success", f"Corrected {corrected_rows} rows")
-                    if self.bad_weights.empty:
-                        QMessageBox.information(self, "Info", "All weights are now within the valid range!")
-                    logger.debug(f"Updating correction table took {time.time() - start_time:.3f} seconds")
-                    return
-                except Exception as e:
-                    QMessageBox.warning(self, "Error", f"Failed: {str(e)}")
-                    return
-
-            self.thread = WeightCorrectionThread(df, valid_labels, new_weight)
-            self.progress_dialog = QProgressDialog("Applying...", "Cancel", 0, 100, self)
-            self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
-            self.progress_dialog.setAutoClose(True)
-            self.progress_dialog.setMinimumDuration(0)
-            self.progress_dialog.canceled.connect(self.thread.terminate)
-            self.thread.progress.connect(self.progress_dialog.setValue)
-            self.thread.finished.connect(self.on_correction_finished)
-            self.thread.error.connect(self.on_correction_error)
-            self.thread.start()
+            try:
+                self.app.begin_corrections().rescale(valid_labels, 'Act Wgt', new_weight)
+                corrected_rows = self.app.commit_corrections(on_undo=self.on_correction_undone)
+            except Exception as e:
+                self.app.discard_corrections()
+                QMessageBox.warning(self, "Error", f"Failed: {str(e)}")
+                return
+            self.on_correction_finished(corrected_rows)
+            logger.debug(f"Apply weight correction took {time.time() - start_time:.3f} seconds")
 
     def undo_last_change(self):
-        """Undo the last weight correction and update the table."""
-        if not self.undo_stack:
+        """Undo the last correction batch (weight, volume, DF or drift) and update the table."""
+        try:
+            undone = self.app.undo_corrections()
+        except (ValueError, TypeError) as e:
+            logger.error(f"Undo failed: {str(e)}")
+            QMessageBox.warning(self, "Warning", "Data changed since the last correction; it cannot be undone.")
+            return
+        if not undone:
             QMessageBox.information(self, "Info", "No changes to undo!")
             return
         
-        # Restore previous data from undo stack
-        prev_json = self.undo_stack.pop()
-        self.df_cache = pd.read_json(prev_json)
-        self.app.set_data(self.df_cache)
-        self.data_changed.emit()
-        self.app.notify_data_changed()  # Notify all tabs of data change
+        QMessageBox.information(self, "Success", "Last change undone")
+        if self.bad_weights is not None and self.bad_weights.empty:
+            QMessageBox.information(self, "Info", "No issues found with weights after undo.")
+
+    def on_correction_undone(self, changes):
+        """Refresh the bad-weight table once a weight correction has been undone."""
+        self.reload_data()
         
         # Recalculate bad_weights based on restored data
-        sample_data = self.df_cache[self.df_cache['Type'] == 'Samp']
-        self.bad_weights = sample_data[
-            (sample_data['Act Wgt'] < self.weight_min) | (sample_data['Act Wgt'] > self.weight_max)
-        ][['Solution Label', 'Act Wgt', 'Corr Con']].drop_duplicates(subset=['Solution Label'])
+        self.recalculate_bad_weights()
 
         # Clear corrected weights since we're reverting to previous state
         self.corrected_weights.clear()
@@ -538,19 +453,11 @@ class WeightCheckFrame(QWidget):
         self.selected_solution_labels = []
         self.included_samples.clear()
         self.select_all_checkbox.setCheckState(Qt.CheckState.Unchecked)
-        
-        QMessageBox.information(self, "Success", "Last change undone")
-        if self.bad_weights.empty:
-            QMessageBox.information(self, "Info", "No issues found with weights after undo.")
 
-    def on_correction_finished(self, df_json, corrected_rows):
-        self.df_cache = pd.read_json(df_json)
-        self.app.set_data(self.df_cache)
-        self.data_changed.emit()
-        sample_data = self.df_cache[self.df_cache['Type'] == 'Samp']
-        self.bad_weights = sample_data[
-            (sample_data['Act Wgt'] < self.weight_min) | (sample_data['Act Wgt'] > self.weight_max)
-        ][['Solution Label', 'Act Wgt', 'Corr Con']].drop_duplicates(subset=['Solution Label'])
+    def on_correction_finished(self, corrected_rows):
+        """Refresh the bad-weight table from the corrected data."""
+        self.reload_data()
+        self.recalculate_bad_weights()
         logger.debug(f"Updated bad_weights shape: {self.bad_weights.shape}")
         logger.debug(f"Updated bad_weights Solution Labels: {self.bad_weights['Solution Label'].tolist()}")
         self.update_correction_table()
@@ -558,16 +465,9 @@ class WeightCheckFrame(QWidget):
         self.selected_solution_labels = []
         self.included_samples.clear()
         self.select_all_checkbox.setCheckState(Qt.CheckState.Unchecked)
-        self.app.notify_data_changed()  # Notify all tabs of data change
         QMessageBox.information(self, "Success", f"Corrected {corrected_rows} rows")
         if self.bad_weights.empty:
             QMessageBox.information(self, "Info", "All weights are now within the valid range!")
-        self.progress_dialog.close()
-
-    def on_correction_error(self, error_msg):
-        """Handle thread errors."""
-        QMessageBox.warning(self, "Error", f"Failed: {error_msg}")
-        self.progress_dialog.close()
 
     def reset_state(self):
         """Reset all internal state and UI."""
@@ -581,7 +481,6 @@ class WeightCheckFrame(QWidget):
         self.weight_min = 0.190
         self.weight_max = 0.210
         self.new_weight = 0.2
-        self.undo_stack = deque()
         self.is_select_all_processing = False
         
         # Reset UI elements